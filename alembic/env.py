@@ -22,6 +22,17 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 from simplefin_archiver.models import reg # noqa: E402
 target_metadata = reg.metadata
+from simplefin_archiver.search import PG_INDEX, SEARCH_TABLE  # noqa: E402
+
+
+def include_name(name, type_, parent_names):
+    # the full-text index (FTS5 tables / GIN expression index) is managed by
+    # the search migrations, not the models; keep autogenerate away from it
+    if type_ == "table" and name and name.startswith(SEARCH_TABLE):
+        return False
+    if type_ == "index" and name == PG_INDEX:
+        return False
+    return True
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -45,6 +56,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -68,7 +80,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
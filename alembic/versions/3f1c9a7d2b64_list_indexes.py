@@ -0,0 +1,38 @@
+"""list indexes
+
+Revision ID: 3f1c9a7d2b64
+Revises: e550ae45ff11
+Create Date: 2026-10-18 09:12:41.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b64'
+down_revision: Union[str, Sequence[str], None] = 'e550ae45ff11'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # trailing id lets the keyset ORDER BY (date, id) be served straight from the index
+    op.create_index('ix_transaction_account_id_transacted_at', 'transaction',
+                    ['account_id', 'transacted_at', 'id'], unique=False)
+    op.create_index('ix_transaction_transacted_at_id', 'transaction',
+                    ['transacted_at', 'id'], unique=False)
+    op.create_index('ix_balance_account_id_balance_date', 'balance',
+                    ['account_id', 'balance_date', 'id'], unique=False)
+    op.create_index('ix_balance_balance_date_id', 'balance',
+                    ['balance_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_balance_balance_date_id', table_name='balance')
+    op.drop_index('ix_balance_account_id_balance_date', table_name='balance')
+    op.drop_index('ix_transaction_transacted_at_id', table_name='transaction')
+    op.drop_index('ix_transaction_account_id_transacted_at', table_name='transaction')
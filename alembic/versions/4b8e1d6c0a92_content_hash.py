@@ -0,0 +1,31 @@
+"""content hash
+
+Revision ID: 4b8e1d6c0a92
+Revises: 6a1f0b8d2c57
+Create Date: 2026-10-18 19:02:11.415306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8e1d6c0a92'
+down_revision: Union[str, Sequence[str], None] = '6a1f0b8d2c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing rows start out NULL and are rewritten once, on their next sighting
+    op.add_column('account', sa.Column('content_hash', sa.String(), nullable=True))
+    op.add_column('balance', sa.Column('content_hash', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('balance', 'content_hash')
+    op.drop_column('account', 'content_hash')
@@ -0,0 +1,34 @@
+"""backfill checkpoints
+
+Revision ID: 5d8e2b7c1a46
+Revises: c41e6f8a9d03
+Create Date: 2026-10-18 13:40:52.662091
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8e2b7c1a46'
+down_revision: Union[str, Sequence[str], None] = 'c41e6f8a9d03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('backfill_window',
+    sa.Column('window_start', sa.DateTime(), nullable=False),
+    sa.Column('window_end', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=False),
+    sa.Column('n_transactions', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('window_start', 'window_end')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('backfill_window')
@@ -0,0 +1,47 @@
+"""backfill key identity
+
+Revision ID: 7e2c6b9d4f15
+Revises: b5e8c3f1a027
+Create Date: 2026-10-18 22:51:09.647302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2c6b9d4f15'
+down_revision: Union[str, Sequence[str], None] = 'b5e8c3f1a027'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('query_log', sa.Column('backfill', sa.Boolean(), nullable=False, server_default=sa.false()))
+    # existing checkpoints can't be attributed to a token; dropping them only
+    # means those windows are fetched (and upserted) once more
+    op.drop_table('backfill_window')
+    op.create_table('backfill_window',
+    sa.Column('key_id', sa.String(), nullable=False),
+    sa.Column('window_start', sa.DateTime(), nullable=False),
+    sa.Column('window_end', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=False),
+    sa.Column('n_transactions', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('key_id', 'window_start', 'window_end')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('backfill_window')
+    op.create_table('backfill_window',
+    sa.Column('window_start', sa.DateTime(), nullable=False),
+    sa.Column('window_end', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=False),
+    sa.Column('n_transactions', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('window_start', 'window_end')
+    )
+    op.drop_column('query_log', 'backfill')
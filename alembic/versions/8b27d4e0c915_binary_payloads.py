@@ -0,0 +1,119 @@
+"""binary payloads
+
+Revision ID: 8b27d4e0c915
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-18 11:03:27.904412
+
+"""
+import gzip
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b27d4e0c915'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, primary key, payload column) as of this revision
+PAYLOAD_COLUMNS = (
+    ("query_log", "id", "raw_response"),
+    ("account", "id", "raw_json"),
+    ("balance", "id", "raw_json"),
+    ("transaction", "id", "raw_json"),
+)
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+BATCH_SIZE = 500
+
+
+def _decompress(data: bytes) -> bytes:
+    if data.startswith(GZIP_MAGIC):
+        return gzip.decompress(data)
+    if data.startswith(ZSTD_MAGIC):
+        try:
+            from compression import zstd  # python >= 3.14
+
+            return zstd.decompress(data)
+        except ImportError:
+            pass
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(
+                "zstd-compressed payloads can't be downgraded to text without "
+                "Python 3.14+ or the 'zstandard' package"
+            )
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def decompress_payloads(bind, table_name: str, pk_name: str, col_name: str) -> None:
+    """Rewrite compressed payloads as plain utf-8, in primary-key order one batch at a time."""
+    tbl = sa.table(table_name, sa.column(pk_name), sa.column(col_name, sa.LargeBinary))
+    pk, col = tbl.c[pk_name], tbl.c[col_name]
+    last_id = None
+    while True:
+        stmt = sa.select(pk, col).order_by(pk).limit(BATCH_SIZE)
+        if last_id is not None:
+            stmt = stmt.where(pk > last_id)
+        rows = bind.execute(stmt).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        changed = [
+            {"pk": row_id, "payload": _decompress(bytes(payload))}
+            for row_id, payload in rows
+            if payload is not None and bytes(payload).startswith((GZIP_MAGIC, ZSTD_MAGIC))
+        ]
+        if changed:
+            bind.execute(
+                sa.update(tbl).where(pk == sa.bindparam("pk")).values({col_name: sa.bindparam("payload")}),
+                changed,
+            )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing rows are stored as-is (uncompressed); compress them afterwards
+    # with `simplefin-archiver compress-payloads`
+    bind = op.get_bind()
+    for table_name, _, col_name in PAYLOAD_COLUMNS:
+        if bind.dialect.name == "sqlite":
+            # sqlite column types are advisory; only the stored values need converting
+            op.execute(
+                f'UPDATE "{table_name}" SET {col_name} = CAST({col_name} AS BLOB) '
+                f"WHERE typeof({col_name}) = 'text'"
+            )
+        else:
+            op.alter_column(
+                table_name, col_name,
+                existing_type=sa.String(),
+                type_=sa.LargeBinary(),
+                existing_nullable=False,
+                postgresql_using=f"convert_to({col_name}, 'UTF8')",
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    for table_name, pk_name, col_name in PAYLOAD_COLUMNS:
+        # compressed rows can't be converted in SQL; inflate them first
+        decompress_payloads(bind, table_name, pk_name, col_name)
+        if bind.dialect.name == "sqlite":
+            op.execute(
+                f'UPDATE "{table_name}" SET {col_name} = CAST({col_name} AS TEXT) '
+                f"WHERE typeof({col_name}) = 'blob'"
+            )
+        else:
+            op.alter_column(
+                table_name, col_name,
+                existing_type=sa.LargeBinary(),
+                type_=sa.String(),
+                existing_nullable=False,
+                postgresql_using=f"convert_from({col_name}, 'UTF8')",
+            )
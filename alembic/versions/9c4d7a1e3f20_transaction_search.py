@@ -0,0 +1,31 @@
+"""transaction search
+
+Revision ID: 9c4d7a1e3f20
+Revises: e2b95d4f7c18
+Create Date: 2026-10-18 17:02:11.524307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from simplefin_archiver.search import create_search_index, drop_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4d7a1e3f20'
+down_revision: Union[str, Sequence[str], None] = 'e2b95d4f7c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 table + triggers on sqlite, GIN expression index on postgres;
+    # indexes the existing transactions
+    create_search_index(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_search_index(op.get_bind())
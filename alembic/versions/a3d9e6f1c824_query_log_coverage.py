@@ -0,0 +1,32 @@
+"""query log coverage
+
+Revision ID: a3d9e6f1c824
+Revises: 7e2c6b9d4f15
+Create Date: 2026-10-19 09:12:44.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d9e6f1c824'
+down_revision: Union[str, Sequence[str], None] = '7e2c6b9d4f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing logs stay NULL: they floor no account, so the first incremental
+    # run after the upgrade goes back to each account's newest transaction
+    op.add_column('query_log', sa.Column('key_id', sa.String(), nullable=True))
+    op.add_column('query_log', sa.Column('account_ids', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('query_log', 'account_ids')
+    op.drop_column('query_log', 'key_id')
@@ -0,0 +1,50 @@
+"""latest balance
+
+Revision ID: a7f3c2e81b59
+Revises: 5d8e2b7c1a46
+Create Date: 2026-10-18 15:08:19.342876
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7f3c2e81b59'
+down_revision: Union[str, Sequence[str], None] = '5d8e2b7c1a46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('latest_balance',
+    sa.Column('account_id', sa.String(), nullable=False),
+    sa.Column('balance_id', sa.String(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False),
+    sa.Column('balance_date', sa.DateTime(), nullable=False),
+    sa.Column('available_balance', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['account_id'], ['account.id'], ),
+    sa.PrimaryKeyConstraint('account_id')
+    )
+    # seed from history: newest (balance_date, id) per account
+    op.execute(
+        """
+        INSERT INTO latest_balance (account_id, balance_id, balance, balance_date, available_balance)
+        SELECT b.account_id, b.id, b.balance, b.balance_date, b.available_balance
+        FROM balance b
+        WHERE b.id = (
+            SELECT b2.id FROM balance b2
+            WHERE b2.account_id = b.account_id
+            ORDER BY b2.balance_date DESC, b2.id DESC
+            LIMIT 1
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('latest_balance')
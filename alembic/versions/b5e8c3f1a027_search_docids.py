@@ -0,0 +1,88 @@
+"""key transaction search on the transaction id
+
+Revision ID: b5e8c3f1a027
+Revises: f81c2a6d4b93
+Create Date: 2026-10-18 22:14:37.208115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e8c3f1a027'
+down_revision: Union[str, Sequence[str], None] = 'f81c2a6d4b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DROP_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS transaction_fts_ai",
+    "DROP TRIGGER IF EXISTS transaction_fts_ad",
+    "DROP TRIGGER IF EXISTS transaction_fts_au",
+]
+
+# 9c4d7a1e3f20 (as published) keyed the FTS5 table on the implicit rowid of
+# "transaction", which VACUUM may renumber. This replaces it with an FTS5
+# table with its own content and the transaction id; its rowids come from
+# transaction_fts_docid, so a VACUUM can't detach the index
+UPGRADE = DROP_TRIGGERS + [
+    "DROP TABLE IF EXISTS transaction_fts",
+    "CREATE TABLE transaction_fts_docid (docid INTEGER PRIMARY KEY, id VARCHAR NOT NULL UNIQUE)",
+    "CREATE VIRTUAL TABLE transaction_fts USING fts5(id UNINDEXED, description, payee, memo, "
+    "tokenize='unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER transaction_fts_ai AFTER INSERT ON "transaction" BEGIN '
+    "INSERT INTO transaction_fts_docid (id) VALUES (new.id); "
+    "INSERT INTO transaction_fts (rowid, id, description, payee, memo) VALUES ("
+    "(SELECT docid FROM transaction_fts_docid WHERE id = new.id), "
+    "new.id, new.description, new.payee, new.memo); END",
+    'CREATE TRIGGER transaction_fts_ad AFTER DELETE ON "transaction" BEGIN '
+    "DELETE FROM transaction_fts WHERE rowid = (SELECT docid FROM transaction_fts_docid WHERE id = old.id); "
+    "DELETE FROM transaction_fts_docid WHERE id = old.id; END",
+    'CREATE TRIGGER transaction_fts_au AFTER UPDATE OF description, payee, memo ON "transaction" BEGIN '
+    "DELETE FROM transaction_fts WHERE rowid = (SELECT docid FROM transaction_fts_docid WHERE id = old.id); "
+    "INSERT INTO transaction_fts (rowid, id, description, payee, memo) VALUES ("
+    "(SELECT docid FROM transaction_fts_docid WHERE id = new.id), "
+    "new.id, new.description, new.payee, new.memo); END",
+    'INSERT INTO transaction_fts_docid (id) SELECT id FROM "transaction"',
+    "INSERT INTO transaction_fts (rowid, id, description, payee, memo) "
+    "SELECT d.docid, t.id, t.description, t.payee, t.memo "
+    'FROM "transaction" t JOIN transaction_fts_docid d ON d.id = t.id',
+]
+
+# back to the external-content table over the implicit rowid
+DOWNGRADE = DROP_TRIGGERS + [
+    "DROP TABLE IF EXISTS transaction_fts",
+    "DROP TABLE IF EXISTS transaction_fts_docid",
+    "CREATE VIRTUAL TABLE transaction_fts USING fts5(description, payee, memo, "
+    "content='transaction', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER transaction_fts_ai AFTER INSERT ON "transaction" BEGIN '
+    "INSERT INTO transaction_fts (rowid, description, payee, memo) "
+    "VALUES (new.rowid, new.description, new.payee, new.memo); END",
+    'CREATE TRIGGER transaction_fts_ad AFTER DELETE ON "transaction" BEGIN '
+    "INSERT INTO transaction_fts (transaction_fts, rowid, description, payee, memo) "
+    "VALUES ('delete', old.rowid, old.description, old.payee, old.memo); END",
+    'CREATE TRIGGER transaction_fts_au AFTER UPDATE OF description, payee, memo ON "transaction" BEGIN '
+    "INSERT INTO transaction_fts (transaction_fts, rowid, description, payee, memo) "
+    "VALUES ('delete', old.rowid, old.description, old.payee, old.memo); "
+    "INSERT INTO transaction_fts (rowid, description, payee, memo) "
+    "VALUES (new.rowid, new.description, new.payee, new.memo); END",
+    "INSERT INTO transaction_fts (transaction_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # postgres indexes the transaction row itself; nothing to re-key there.
+    # Other databases have no search index (9c4d7a1e3f20 warned and skipped it)
+    if op.get_bind().dialect.name == "sqlite":
+        for ddl in UPGRADE:
+            op.execute(sa.text(ddl))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        for ddl in DOWNGRADE:
+            op.execute(sa.text(ddl))
@@ -0,0 +1,29 @@
+"""posted watermark index
+
+Revision ID: c41e6f8a9d03
+Revises: 8b27d4e0c915
+Create Date: 2026-10-18 12:26:05.117839
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e6f8a9d03'
+down_revision: Union[str, Sequence[str], None] = '8b27d4e0c915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # serves the per-account max(posted) lookup used by incremental sync
+    op.create_index('ix_transaction_account_id_posted', 'transaction',
+                    ['account_id', 'posted'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transaction_account_id_posted', table_name='transaction')
@@ -0,0 +1,67 @@
+"""binary payload column types
+
+Revision ID: c6f2a8e1d054
+Revises: a3d9e6f1c824
+Create Date: 2026-10-19 14:06:52.417730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f2a8e1d054'
+down_revision: Union[str, Sequence[str], None] = 'a3d9e6f1c824'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, payload column) as of this revision
+PAYLOAD_COLUMNS = (
+    ("query_log", "raw_response"),
+    ("account", "raw_json"),
+    ("balance", "raw_json"),
+    ("transaction", "raw_json"),
+)
+
+
+def _retype(table_name: str, col_name: str, from_type: sa.types.TypeEngine, to_type: sa.types.TypeEngine) -> None:
+    # batch mode copies the table into a new one, which drops its triggers
+    # (the search index upkeep on "transaction"); save and recreate them
+    triggers = op.get_bind().execute(
+        sa.text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :tbl"),
+        {"tbl": table_name},
+    ).scalars().all()
+    with op.batch_alter_table(table_name) as batch_op:
+        batch_op.alter_column(col_name, existing_type=from_type, type_=to_type, existing_nullable=False)
+    for ddl in triggers:
+        op.execute(sa.text(ddl))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 8b27d4e0c915 converted the stored values on sqlite but left the columns
+    # declared VARCHAR; postgres columns were altered there already
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    inspector = sa.inspect(bind)
+    for table_name, col_name in PAYLOAD_COLUMNS:
+        declared = {col["name"]: col["type"] for col in inspector.get_columns(table_name)}[col_name]
+        if not isinstance(declared, sa.LargeBinary):
+            _retype(table_name, col_name, sa.String(), sa.LargeBinary())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for table_name, col_name in PAYLOAD_COLUMNS:
+        _retype(table_name, col_name, sa.LargeBinary(), sa.String())
+        # the copy CASTs every value to text, bytes unchanged; compressed ones
+        # aren't valid utf-8, so put them back as the blobs 8b27d4e0c915 left
+        op.execute(
+            f'UPDATE "{table_name}" SET {col_name} = CAST({col_name} AS BLOB) '
+            f"WHERE typeof({col_name}) = 'text'"
+        )
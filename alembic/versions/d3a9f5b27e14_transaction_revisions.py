@@ -0,0 +1,96 @@
+"""transaction revisions
+
+Revision ID: d3a9f5b27e14
+Revises: 4b8e1d6c0a92
+Create Date: 2026-10-18 19:41:53.280417
+
+"""
+import gzip
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a9f5b27e14'
+down_revision: Union[str, Sequence[str], None] = '4b8e1d6c0a92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+
+def _raw_json(data: bytes) -> str:
+    data = bytes(data)
+    if data.startswith(b"\x1f\x8b"):
+        data = gzip.decompress(data)
+    elif data.startswith(b"\x28\xb5\x2f\xfd"):
+        try:
+            from compression import zstd  # python >= 3.14
+
+            data = zstd.decompress(data)
+        except ImportError:
+            import zstandard
+
+            data = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data.decode("utf-8")
+
+
+def _content_hash(raw_json: str) -> str:
+    # must match how the ingest path hashes a transaction: sha256 over repr(raw_json) + NUL
+    return hashlib.sha256(repr(raw_json).encode("utf-8") + b"\x00").hexdigest()
+
+
+def backfill_hashes(bind, batch_size: int = BATCH_SIZE) -> None:
+    """Hash the archived transactions in id order, so the next ingest doesn't see them all as changed."""
+    tx = sa.table('transaction', sa.column('id'), sa.column('raw_json', sa.LargeBinary),
+                  sa.column('content_hash'))
+    last_id = None
+    while True:
+        stmt = sa.select(tx.c.id, tx.c.raw_json).order_by(tx.c.id).limit(batch_size)
+        if last_id is not None:
+            stmt = stmt.where(tx.c.id > last_id)
+        rows = bind.execute(stmt).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        bind.execute(
+            sa.update(tx).where(tx.c.id == sa.bindparam('b_id')).values(content_hash=sa.bindparam('hash')),
+            [{'b_id': tx_id, 'hash': _content_hash(_raw_json(raw_json))} for tx_id, raw_json in rows],
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('transaction_revision',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('transaction_id', sa.String(), nullable=False),
+    sa.Column('revised_at', sa.DateTime(), nullable=False),
+    sa.Column('account_id', sa.String(), nullable=False),
+    sa.Column('posted', sa.DateTime(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('description', sa.String(), nullable=False),
+    sa.Column('raw_json', sa.LargeBinary(), nullable=False),
+    sa.Column('payee', sa.String(), nullable=True),
+    sa.Column('memo', sa.String(), nullable=True),
+    sa.Column('transacted_at', sa.DateTime(), nullable=True),
+    sa.Column('extra_attrs', sa.String(), nullable=True),
+    sa.Column('content_hash', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['transaction_id'], ['transaction.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_transaction_revision_transaction_id_id', 'transaction_revision',
+                    ['transaction_id', 'id'], unique=False)
+    op.add_column('transaction', sa.Column('content_hash', sa.String(), nullable=True))
+    backfill_hashes(op.get_bind())
+    op.create_index('ix_transaction_id_content_hash', 'transaction', ['id', 'content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transaction_id_content_hash', table_name='transaction')
+    op.drop_column('transaction', 'content_hash')
+    op.drop_index('ix_transaction_revision_transaction_id_id', table_name='transaction_revision')
+    op.drop_table('transaction_revision')
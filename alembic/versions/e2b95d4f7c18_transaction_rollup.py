@@ -0,0 +1,75 @@
+"""transaction rollup
+
+Revision ID: e2b95d4f7c18
+Revises: a7f3c2e81b59
+Create Date: 2026-10-18 16:21:44.180935
+
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b95d4f7c18'
+down_revision: Union[str, Sequence[str], None] = 'a7f3c2e81b59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+GRANULARITIES = ("day", "week", "month")
+BATCH_SIZE = 1000
+
+
+def _bucket_start(ts: datetime, granularity: str) -> datetime:
+    day = datetime(ts.year, ts.month, ts.day)
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def populate_rollups(bind) -> None:
+    """Sum the existing transactions per (granularity, bucket, account, category) in one streamed pass."""
+    tx = sa.table('transaction', sa.column('account_id'), sa.column('transacted_at', sa.DateTime),
+                  sa.column('category'), sa.column('amount'))
+    rollup = sa.table('transaction_rollup', sa.column('granularity'), sa.column('bucket_start', sa.DateTime),
+                      sa.column('account_id'), sa.column('category'), sa.column('total'), sa.column('tx_count'))
+    totals: dict = {}
+    stmt = sa.select(tx.c.account_id, tx.c.transacted_at, tx.c.category, tx.c.amount)
+    for account_id, transacted_at, category, amount in bind.execution_options(yield_per=BATCH_SIZE).execute(stmt):
+        for granularity in GRANULARITIES:
+            key = (granularity, _bucket_start(transacted_at, granularity), account_id, category or "")
+            total = totals.setdefault(key, [0.0, 0])
+            total[0] += amount
+            total[1] += 1
+    rows = [
+        {'granularity': granularity, 'bucket_start': start, 'account_id': account_id, 'category': category,
+         'total': round(total, 2), 'tx_count': count}
+        for (granularity, start, account_id, category), (total, count) in totals.items()
+    ]
+    for i in range(0, len(rows), BATCH_SIZE):
+        bind.execute(sa.insert(rollup), rows[i:i + BATCH_SIZE])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('transaction_rollup',
+    sa.Column('granularity', sa.String(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('account_id', sa.String(), nullable=False),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('tx_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['account.id'], ),
+    sa.PrimaryKeyConstraint('granularity', 'bucket_start', 'account_id', 'category')
+    )
+    # populate from the existing ledger
+    populate_rollups(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('transaction_rollup')
@@ -0,0 +1,47 @@
+"""venmo checkpoint
+
+Revision ID: f81c2a6d4b93
+Revises: d3a9f5b27e14
+Create Date: 2026-10-18 20:26:05.631774
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f81c2a6d4b93'
+down_revision: Union[str, Sequence[str], None] = 'd3a9f5b27e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('venmo_checkpoint',
+    sa.Column('mailbox', sa.String(), nullable=False),
+    sa.Column('uid_validity', sa.Integer(), nullable=False),
+    sa.Column('last_uid', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('mailbox')
+    )
+    op.create_table('venmo_message',
+    sa.Column('mailbox', sa.String(), nullable=False),
+    sa.Column('message_id', sa.String(), nullable=False),
+    sa.Column('uid_validity', sa.Integer(), nullable=False),
+    sa.Column('uid', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('outcome', sa.String(), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=False),
+    sa.Column('transaction_id', sa.String(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('mailbox', 'message_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('venmo_message')
+    op.drop_table('venmo_checkpoint')
@@ -0,0 +1,340 @@
+"""
+Offline benchmarks for the parse, ingest and API listing paths.
+
+Builds a synthetic /accounts payload (see payload.py) and times, per backend:
+
+    parse_transactions  SimpleFIN._get_transactions over every account
+    parse_tx_rows       SimpleFIN._get_transaction_rows (plain dicts) likewise
+    parse_balance       SimpleFIN._get_balance over every account
+    commit_cold         SimpleFIN_DB.commit_query_result into an empty DB
+    commit_warm         the same result again, into the populated DB
+    commit_cold_rows    commit_cold with plain transaction rows (as_rows=True)
+    api_transactions    paging through GET /transactions
+    api_balances        paging through GET /balances
+
+Each stage reports the best wall time of --repeat runs, rows/s and the peak
+traced memory of one extra run under tracemalloc. Results are compared with
+a stored baseline; a stage whose throughput drops (or peak memory grows) by
+more than --tolerance is reported as a regression and the exit code is 1.
+
+Absolute rows/s depend on the machine, so every run also times a fixed
+pure-Python reference workload (JSON round trips and sha256 over a payload
+transaction). Throughput is compared as a ratio to that reference: a
+machine half as fast as the one that saved the baseline is expected to
+reach half its rows/s.
+
+SQLite always runs, in a temporary file. Postgres runs with --postgres and
+uses the POSTGRES_* environment variables; point them at a scratch
+database, since its tables are dropped and recreated.
+
+    python benchmarks/bench.py [--accounts 5 --days 90 --per-day 10]
+    python benchmarks/bench.py --save-baseline
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from payload import balance_snapshots, make_payload  # noqa: E402
+from simplefin_archiver import QueryLog, QueryResult, SimpleFIN, SimpleFIN_DB  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_REPEAT = 3
+MIN_TIMED_SECONDS = 0.5
+MAX_RUNS = 100
+REFERENCE_OPS = 20_000
+API_PAGE_SIZE = 500
+API_KEY = "benchmark"
+
+
+def to_query_result(payload: dict, as_rows: bool = False) -> QueryResult:
+    client = SimpleFIN("bench:bench", as_rows=as_rows)
+    accounts, balances, transactions = [], [], []
+    for acct_raw in payload["accounts"]:
+        acct, balance, txs = client._parse_account(acct_raw)
+        accounts.append(acct)
+        balances.append(balance)
+        transactions.extend(txs)
+    client.close()
+    q_log = QueryLog(query_date=datetime.now(), days_history=0, raw_response=json.dumps(payload))
+    return QueryResult(accounts, balances, transactions, q_log)
+
+
+def measure(fn: Callable[..., int], repeat: int, setup: Callable[[], tuple] = tuple) -> dict:
+    """
+    Best timing of fn (which returns rows processed) over at least `repeat`
+    runs, plus peak memory. setup() runs untimed before each call and returns
+    fn's arguments. Short stages without a setup keep running until
+    MIN_TIMED_SECONDS have been timed, so one preempted run can't decide the
+    result; setups (a fresh DB) are too slow to repeat that often.
+    """
+    best, rows, timed, runs = None, 0, 0.0, 0
+    extend = setup is tuple
+    while runs < repeat or (extend and timed < MIN_TIMED_SECONDS and runs < MAX_RUNS):
+        args = setup()
+        start = time.perf_counter()
+        rows = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        timed += elapsed
+        runs += 1
+    args = setup()
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "seconds": round(best, 4),
+        "rows": rows,
+        "rows_per_s": round(rows / best, 1) if best else None,
+        "peak_mib": round(peak / 2**20, 2),
+    }
+
+
+def bench_reference(payload: dict, repeat: int) -> dict:
+    """Machine speed: round trips of one payload transaction through json and sha256."""
+    tx = payload["accounts"][0]["transactions"][0]
+
+    def reference() -> int:
+        for _ in range(REFERENCE_OPS):
+            hashlib.sha256(json.dumps(json.loads(json.dumps(tx))).encode("utf-8")).hexdigest()
+        return REFERENCE_OPS
+
+    result = measure(reference, repeat)
+    return {"seconds": result["seconds"], "ops_per_s": result["rows_per_s"]}
+
+
+class _patched_env:
+    def __init__(self, env: dict):
+        self.env = env
+
+    def __enter__(self):
+        self.saved = {key: os.environ.get(key) for key in self.env}
+        os.environ.update(self.env)
+
+    def __exit__(self, *exc):
+        for key, value in self.saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+class Backend:
+    """A database the stages run against, recreated from the migrations on reset()."""
+
+    def __init__(self, name: str, env: dict):
+        self.name = name
+        self.env = env
+
+    def url(self) -> str:
+        with _patched_env(self.env):
+            from simplefin_archiver.db import get_db_connection_string
+
+            return get_db_connection_string()
+
+    def reset(self) -> None:
+        if self.name == "sqlite":
+            Path(self.env["SIMPLEFIN_DB_PATH"]).unlink(missing_ok=True)
+        else:
+            from sqlalchemy import create_engine, text
+
+            engine = create_engine(self.url())
+            with engine.begin() as conn:
+                conn.execute(text("DROP SCHEMA public CASCADE"))
+                conn.execute(text("CREATE SCHEMA public"))
+            engine.dispose()
+        subprocess.run(
+            [sys.executable, "-m", "alembic", "-c", str(ROOT / "alembic.ini"), "upgrade", "head"],
+            cwd=ROOT, env={**os.environ, **self.env, "PYTHONPATH": str(ROOT / "src")},
+            check=True, capture_output=True,
+        )
+
+
+def bench_parse(payload: dict, days: int, repeat: int) -> dict:
+    accounts = payload["accounts"]
+    # one balance per account per day, so the stage runs long enough to time
+    snapshots = [acct for snapshot in balance_snapshots(payload, days) for acct in snapshot["accounts"]]
+
+    def parse_transactions() -> int:
+        return sum(len(SimpleFIN._get_transactions(acct)) for acct in accounts)
+
+    def parse_tx_rows() -> int:
+        return sum(len(SimpleFIN._get_transaction_rows(acct)) for acct in accounts)
+
+    def parse_balance() -> int:
+        for acct in accounts + snapshots:
+            SimpleFIN._get_balance(acct)
+        return len(accounts) + len(snapshots)
+
+    return {
+        "parse_transactions": measure(parse_transactions, repeat),
+        "parse_tx_rows": measure(parse_tx_rows, repeat),
+        "parse_balance": measure(parse_balance, repeat),
+    }
+
+
+def bench_backend(backend: Backend, payload: dict, days: int, repeat: int) -> dict:
+    results = {}
+    url = backend.url()
+    n_rows = sum(len(acct["transactions"]) + 1 for acct in payload["accounts"])
+
+    def commit(qr: QueryResult) -> int:
+        with SimpleFIN_DB(connection_str=url) as db:
+            db.commit_query_result(qr)
+        return n_rows
+
+    # a fresh result for every run; committed instances can't be re-added
+    def cold_setup() -> tuple:
+        backend.reset()
+        return (to_query_result(payload),)
+
+    def cold_rows_setup() -> tuple:
+        backend.reset()
+        return (to_query_result(payload, as_rows=True),)
+
+    results["commit_cold_rows"] = measure(commit, repeat, setup=cold_rows_setup)
+    results["commit_cold"] = measure(commit, repeat, setup=cold_setup)
+    results["commit_warm"] = measure(commit, repeat, setup=lambda: (to_query_result(payload),))
+
+    # build up a balance history for the listing endpoints
+    with SimpleFIN_DB(connection_str=url) as db:
+        for snapshot in balance_snapshots(payload, days):
+            db.commit_query_result(to_query_result(snapshot))
+
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:
+        logging.warning("fastapi/httpx not installed; skipping the API stages")
+        return results
+
+    with _patched_env({**backend.env, "ARCHIVER_API_KEY": API_KEY, "ARCHIVER_API_KEY_FILE": "/nonexistent"}):
+        from simplefin_archiver.api import app
+
+        with TestClient(app) as client:
+            def page_through(path: str) -> Callable[[], int]:
+                def run() -> int:
+                    n, cursor = 0, None
+                    while True:
+                        params = {"limit": API_PAGE_SIZE, **({"cursor": cursor} if cursor else {})}
+                        resp = client.get(path, params=params, headers={"X-API-Key": API_KEY})
+                        resp.raise_for_status()
+                        n += len(resp.json())
+                        cursor = resp.headers.get("X-Next-Cursor")
+                        if not cursor:
+                            return n
+                return run
+
+            results["api_transactions"] = measure(page_through("/transactions"), repeat)
+            results["api_balances"] = measure(page_through("/balances"), repeat)
+    return results
+
+
+def machine_speed(results: dict, baseline: dict) -> float:
+    """This machine's reference throughput relative to the baseline's (1.0 if either lacks one)."""
+    cur = results.get("reference", {}).get("ops_per_s")
+    base = baseline.get("reference", {}).get("ops_per_s")
+    return cur / base if cur and base else 1.0
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Human-readable regressions of `results` against `baseline`. Throughput is
+    scaled by machine_speed(), so only a change relative to the reference
+    workload counts; peak memory doesn't depend on the machine.
+    """
+    speed = machine_speed(results, baseline)
+    problems = []
+    for backend, stages in results["backends"].items():
+        for stage, cur in stages.items():
+            base = baseline.get("backends", {}).get(backend, {}).get(stage)
+            if not base:
+                continue
+            expected = base["rows_per_s"] * speed if base["rows_per_s"] else None
+            if expected and cur["rows_per_s"] < expected * (1 - tolerance):
+                problems.append(
+                    f"{backend}/{stage}: {cur['rows_per_s']:.0f} rows/s vs {expected:.0f} expected "
+                    f"(baseline {base['rows_per_s']:.0f} at machine speed {speed:.2f})"
+                )
+            if base["peak_mib"] and cur["peak_mib"] > base["peak_mib"] * (1 + tolerance) + 1:
+                problems.append(
+                    f"{backend}/{stage}: peak {cur['peak_mib']:.1f} MiB vs baseline {base['peak_mib']:.1f}"
+                )
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline parse/ingest/API benchmarks")
+    parser.add_argument("--accounts", type=int, default=5)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--per-day", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--postgres", action="store_true", help="Also run against POSTGRES_* (wiped!)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(name)s - %(message)s")
+
+    workload = {"accounts": args.accounts, "days": args.days, "per_day": args.per_day}
+    payload = make_payload(args.accounts, args.days, args.per_day)
+    results = {
+        "workload": workload,
+        "reference": bench_reference(payload, args.repeat),
+        "backends": {"parse": bench_parse(payload, args.days, args.repeat)},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [Backend("sqlite", {"SIMPLEFIN_DB_PATH": str(Path(tmp) / "bench.db"), "POSTGRES_PASSWORD": ""})]
+        if args.postgres:
+            backends.append(Backend("postgresql", {}))
+        for backend in backends:
+            results["backends"][backend.name] = bench_backend(backend, payload, args.days, args.repeat)
+    # timed again at the end, keeping the faster run, like the stages' best-of
+    again = bench_reference(payload, args.repeat)
+    if again["ops_per_s"] > results["reference"]["ops_per_s"]:
+        results["reference"] = again
+
+    print(f"{'reference':>31} {results['reference']['ops_per_s']:>41,.0f} ops/s")
+    for backend, stages in results["backends"].items():
+        for stage, res in stages.items():
+            print(
+                f"{backend:>10} {stage:<20} {res['seconds']:>8.3f} s {res['rows']:>8} rows "
+                f"{res['rows_per_s']:>12,.0f} rows/s {res['peak_mib']:>8.2f} MiB peak"
+            )
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("No baseline to compare with; run with --save-baseline")
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("workload") != workload:
+        print(f"Baseline workload {baseline.get('workload')} differs from {workload}; not comparing")
+        return 0
+    print(f"Machine speed vs baseline: {machine_speed(results, baseline):.2f}")
+    problems = compare(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Import-time budget for the simplefin-archive CLI.
+
+Imports simplefin_archiver.cli in fresh interpreters under `python -X
+importtime` and fails (exit 1) when the best cumulative time exceeds the
+budget, or when any of the heavy modules that are meant to load lazily
+shows up. Also reports the wall time of `simplefin-archive --help`.
+
+    python benchmarks/import_time.py [--budget-ms 150] [--runs 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+DEFAULT_BUDGET_MS = 150
+DEFAULT_RUNS = 5
+TARGET_MODULE = "simplefin_archiver.cli"
+# must only be imported once a command actually needs them
+LAZY_MODULES = ("sqlalchemy", "requests", "bs4", "imap_tools", "regex", "fastapi")
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_DIR), env.get("PYTHONPATH")]))
+    return env
+
+
+def measure_import(module: str) -> tuple[float, set[str]]:
+    """(cumulative import time of `module` in ms, top-level packages imported)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, env=_env(),
+    )
+    cumulative_us = None
+    imported = set()
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative_us = int(cumulative)
+    if cumulative_us is None:
+        raise RuntimeError(f"No import time reported for {module}")
+    return cumulative_us / 1000, imported
+
+
+def measure_help() -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", TARGET_MODULE, "--help"],
+        capture_output=True, check=True, env=_env(),
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    args = parser.parse_args()
+
+    timings, leaked = [], set()
+    for _ in range(args.runs):
+        ms, imported = measure_import(TARGET_MODULE)
+        timings.append(ms)
+        leaked |= imported & set(LAZY_MODULES)
+    best = min(timings)
+    help_ms = min(measure_help() for _ in range(args.runs))
+
+    print(f"import {TARGET_MODULE}: best {best:.1f} ms of {args.runs} (budget {args.budget_ms:.0f} ms)")
+    print(f"{TARGET_MODULE} --help: best {help_ms:.1f} ms wall")
+
+    ok = True
+    if best > args.budget_ms:
+        print(f"FAIL: import time over budget by {best - args.budget_ms:.1f} ms")
+        ok = False
+    if leaked:
+        print(f"FAIL: eagerly imported {', '.join(sorted(leaked))}")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
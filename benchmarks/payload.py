@@ -0,0 +1,78 @@
+"""Synthetic SimpleFIN /accounts payloads for the benchmarks."""
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+MERCHANTS = (
+    "Grocery Outlet", "Shell", "Amazon", "Trader Joe's", "Netflix", "Uber", "Starbucks",
+    "Whole Foods", "Chevron", "Costco", "PG&E", "Comcast", "Target", "Walgreens",
+)
+CATEGORIES = ("groceries", "fuel", "shopping", "dining", "utilities", "travel", None)
+
+
+def make_payload(
+    n_accounts: int = 5,
+    days: int = 90,
+    per_day: int = 10,
+    seed: int = 0,
+    now: Optional[datetime] = None,
+) -> dict:
+    """
+    An /accounts response with n_accounts accounts, each holding `per_day`
+    transactions on each of the last `days` days. Deterministic for a seed.
+    """
+    rnd = random.Random(seed)
+    now = now or datetime(2026, 1, 1)
+    accounts = []
+    for a in range(n_accounts):
+        acct_id = f"ACT-{seed:04d}-{a:04d}"
+        txs = []
+        for d in range(days):
+            for k in range(per_day):
+                ts = int((now - timedelta(days=d, minutes=7 * k)).timestamp())
+                merchant = rnd.choice(MERCHANTS)
+                tx = {
+                    "id": f"TRN-{acct_id}-{d:05d}-{k:03d}",
+                    "posted": ts,
+                    "amount": f"{rnd.uniform(-250, 80):.2f}",
+                    "description": f"{merchant.upper()} #{rnd.randint(100, 9999)}",
+                    "payee": merchant,
+                    "memo": f"POS {rnd.randint(10**5, 10**6)}",
+                    "transacted_at": ts - rnd.randint(0, 86400),
+                    "pending": False,
+                }
+                category = rnd.choice(CATEGORIES)
+                if category:
+                    tx["extra"] = {"category": category}
+                txs.append(tx)
+        accounts.append({
+            "org": {"domain": f"bank{a % 3}.example.com", "name": f"Bank {a % 3}", "sfin-url": "https://example.com"},
+            "id": acct_id,
+            "name": f"Checking {a}",
+            "currency": "USD",
+            "balance": f"{rnd.uniform(100, 20000):.2f}",
+            "available-balance": f"{rnd.uniform(100, 20000):.2f}",
+            "balance-date": int(now.timestamp()),
+            "transactions": txs,
+            "holdings": [],
+        })
+    return {"errors": [], "accounts": accounts}
+
+
+def balance_snapshots(payload: dict, days: int) -> list[dict]:
+    """
+    One transaction-less copy of `payload` per earlier day, each dated a day
+    before the last, to build up a balance history.
+    """
+    snapshots = []
+    for d in range(1, days):
+        accounts = []
+        for acct in payload["accounts"]:
+            accounts.append({
+                **acct,
+                "balance": f"{float(acct['balance']) - 13.7 * d:.2f}",
+                "balance-date": acct["balance-date"] - d * 86400,
+                "transactions": [],
+            })
+        snapshots.append({"errors": [], "accounts": accounts})
+    return snapshots
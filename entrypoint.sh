@@ -27,11 +27,21 @@ chmod 400 /etc/environment
 # --- Startup Run ---
 if [ "${QUERY_AT_STARTUP:-false}" = "true" ]; then
     echo "Running initial data fetch at startup..."
-    simplefin-archive
+    simplefin-archive --trigger cron
+fi
+
+# --- In-process scheduler ---
+# IN_PROCESS_SCHEDULER=true runs CRON_SCHEDULE inside the API process
+# instead of launching a fresh simplefin-archive per tick from crond
+if [ "${IN_PROCESS_SCHEDULER:-false}" = "true" ]; then
+    echo "Starting FastAPI server with in-process schedule: $CRON_SCHEDULE"
+    exec uvicorn simplefin_archiver.api:app --host 0.0.0.0 --port 8000
 fi
 
 # --- Create crontab entry ---
-CRON_CMD="simplefin-archive > /proc/1/fd/1 2>&1"
+# runs share the job lock with POST /trigger_update; a tick that finds an
+# archive already in flight skips itself
+CRON_CMD="simplefin-archive --trigger cron > /proc/1/fd/1 2>&1"
 echo "$CRON_SCHEDULE . /etc/environment; $CRON_CMD" > /etc/crontabs/root
 
 # --- Start FastAPI ---
@@ -1,4 +1,23 @@
-from .models import Account, Balance, Transaction, QueryLog  # noqa: F401
-from .models import QueryResult  # noqa: F401
-from .simplefin import SimpleFIN  # noqa: F401
-from .db import SimpleFIN_DB  # noqa: F401
\ No newline at end of file
+from importlib import import_module
+
+# Loaded on first access (PEP 562) so that importing the package, e.g. for
+# the CLI's `--help`, doesn't pull in SQLAlchemy and requests
+_LAZY_ATTRS = {
+    "Account": ".models",
+    "Balance": ".models",
+    "Transaction": ".models",
+    "QueryLog": ".models",
+    "QueryResult": ".models",
+    "SimpleFIN": ".simplefin",
+    "SimpleFIN_DB": ".db",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRS[name], __name__), name)
+    globals()[name] = value
+    return value
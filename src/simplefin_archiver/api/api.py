@@ -1,11 +1,22 @@
+from contextlib import asynccontextmanager
+from functools import partial
+from datetime import datetime
 from os import getenv
+from typing import Optional
 
-from fastapi import FastAPI, Depends, HTTPException, Security, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, Security, BackgroundTasks, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import APIKeyHeader
 
 from simplefin_archiver.models import Balance
-from simplefin_archiver.db import SimpleFIN_DB, get_db_connection_string
-from simplefin_archiver.cli import run_archiver_backend
+from sqlalchemy.orm import sessionmaker
+
+from simplefin_archiver.db import SimpleFIN_DB, create_db_engine, get_db_connection_string
+from simplefin_archiver.db import ARCHIVE_JOB, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor
+from simplefin_archiver.export import MEDIA_TYPES, DEFAULT_EXPORT_BATCH_SIZE, iter_export, validate_export
+from simplefin_archiver.archiver import run_archiver_backend
+from simplefin_archiver.scheduler import CronSchedule, Scheduler
+from simplefin_archiver.simplefin import build_session
 from simplefin_archiver import schemas
 
 import logging
@@ -20,14 +31,43 @@ class EndpointFilter(logging.Filter):
 # Add the filter to the uvicorn access logger
 logging.getLogger("uvicorn.access").addFilter(EndpointFilter())
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one engine (and connection pool) for the life of the process
+    engine = create_db_engine(
+        get_db_connection_string(),
+        pool_size=int(getenv("DB_POOL_SIZE", "5")),
+        pool_pre_ping=getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+    )
+    app.state.engine = engine
+    app.state.sessionmaker = sessionmaker(engine)
+
+    # optional built-in replacement for the cron container process; runs
+    # share the warm engine and one keep-alive SimpleFIN session
+    app.state.scheduler = None
+    http_session = None
+    if getenv("IN_PROCESS_SCHEDULER", "false").lower() in ("1", "true", "yes"):
+        http_session = build_session()
+        app.state.scheduler = Scheduler(
+            CronSchedule(getenv("CRON_SCHEDULE", "")),
+            partial(run_archiver_backend, trigger="cron", engine=engine, http_session=http_session),
+        )
+        app.state.scheduler.start()
+    yield
+    if app.state.scheduler is not None:
+        app.state.scheduler.stop(timeout=30)
+        http_session.close()
+    engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
-def get_db():
-    connection_str = get_db_connection_string()
-    with SimpleFIN_DB(connection_str=connection_str) as db:
-        yield db
+def get_db(request: Request):
+    with request.app.state.sessionmaker() as session:
+        with SimpleFIN_DB(session=session) as db:
+            yield db
 
 
 def get_api_token():
@@ -74,15 +114,141 @@ def list_accounts(db: SimpleFIN_DB = Depends(get_db),
 
 
 @app.get("/transactions", response_model=list[schemas.TransactionSchema])
-def list_transactions(db: SimpleFIN_DB = Depends(get_db),
+def list_transactions(response: Response,
+                      account_id: Optional[str] = None,
+                      start: Optional[datetime] = None,
+                      end: Optional[datetime] = None,
+                      cursor: Optional[str] = None,
+                      limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                      db: SimpleFIN_DB = Depends(get_db),
                       token: str = Depends(verify_token)):
-    return db.get_transactions()
+    try:
+        txs = db.get_transactions(account_id, start, end, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # a full page means there may be more; hand back the keyset cursor
+    if len(txs) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(txs[-1]["transacted_at"], txs[-1]["id"])
+    return txs
+
+
+# must be registered before /transactions/{tx_id}
+@app.get("/transactions/search", response_model=list[schemas.TransactionSearchSchema])
+def search_transactions(response: Response,
+                        q: str = Query(..., min_length=1),
+                        account_id: Optional[str] = None,
+                        start: Optional[datetime] = None,
+                        end: Optional[datetime] = None,
+                        cursor: Optional[str] = None,
+                        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                        db: SimpleFIN_DB = Depends(get_db),
+                        token: str = Depends(verify_token)):
+    try:
+        txs = db.search_transactions(q, account_id, start, end, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    if len(txs) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(txs[-1]["rank"], txs[-1]["id"])
+    return txs
+
+
+@app.get("/transactions/{tx_id}", response_model=schemas.TransactionDetailSchema)
+def get_transaction(tx_id: str,
+                    db: SimpleFIN_DB = Depends(get_db),
+                    token: str = Depends(verify_token)):
+    tx = db.get_transaction(tx_id)
+    if tx is None:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return tx
 
 
 @app.get("/balances", response_model=list[schemas.BalanceSchema])
-def list_balances(db: SimpleFIN_DB = Depends(get_db),
+def list_balances(response: Response,
+                  account_id: Optional[str] = None,
+                  start: Optional[datetime] = None,
+                  end: Optional[datetime] = None,
+                  cursor: Optional[str] = None,
+                  limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                  db: SimpleFIN_DB = Depends(get_db),
+                  token: str = Depends(verify_token)):
+    try:
+        bals = db.get_balances(account_id, start, end, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(bals) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(bals[-1]["balance_date"], bals[-1]["id"])
+    return bals
+
+
+@app.get("/balances/latest", response_model=list[schemas.LatestBalanceSchema])
+def list_latest_balances(db: SimpleFIN_DB = Depends(get_db),
+                         token: str = Depends(verify_token)):
+    return db.get_latest_balances()
+
+
+@app.get("/net_worth", response_model=list[schemas.NetWorthPointSchema])
+def net_worth(start: Optional[datetime] = None,
+              end: Optional[datetime] = None,
+              db: SimpleFIN_DB = Depends(get_db),
+              token: str = Depends(verify_token)):
+    return db.get_net_worth(start, end)
+
+
+@app.get("/balances/{balance_id}", response_model=schemas.BalanceDetailSchema)
+def get_balance(balance_id: str,
+                db: SimpleFIN_DB = Depends(get_db),
+                token: str = Depends(verify_token)):
+    bal = db.get_balance(balance_id)
+    if bal is None:
+        raise HTTPException(status_code=404, detail="Balance not found")
+    return bal
+
+
+@app.get("/reports/rollup", response_model=list[schemas.RollupSchema])
+def rollup_report(granularity: str = "month",
+                  account_id: Optional[str] = None,
+                  category: Optional[str] = None,
+                  start: Optional[datetime] = None,
+                  end: Optional[datetime] = None,
+                  db: SimpleFIN_DB = Depends(get_db),
                   token: str = Depends(verify_token)):
-    return db.get_balances()
+    try:
+        return db.get_rollups(granularity, account_id, category, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/export/{table}")
+def export(request: Request,
+           table: str,
+           format: str = "csv",
+           account_id: Optional[str] = None,
+           start: Optional[datetime] = None,
+           end: Optional[datetime] = None,
+           batch_size: int = Query(DEFAULT_EXPORT_BATCH_SIZE, ge=1, le=50000),
+           token: str = Depends(verify_token)):
+    try:
+        validate_export(table, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    engine = request.app.state.engine
+
+    # holds its own connection for as long as the response is streaming
+    def stream():
+        with engine.connect() as conn:
+            yield from iter_export(conn, table, format, account_id, start, end, batch_size)
+
+    filename = f"{table}.{format}"
+    return StreamingResponse(
+        stream(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @app.post("/balances", response_model=schemas.BalanceSchema)
@@ -93,8 +259,34 @@ def create_balance(balance_data: schemas.BalanceCreateSchema,
     new_balance = Balance(**balance_data.model_dump())
     return db.add_balance(new_balance)
 
-@app.post("/trigger_update")
-def trigger_update(background_tasks: BackgroundTasks,
+@app.post("/trigger_update", response_model=schemas.JobTriggerSchema, status_code=202)
+def trigger_update(request: Request,
+                   background_tasks: BackgroundTasks,
+                   db: SimpleFIN_DB = Depends(get_db),
                    token: str = Depends(verify_token)):
-    background_tasks.add_task(run_archiver_backend)
-    return {"message": "Archive update triggered"}
+    # at most one archive in flight: further triggers return the running job
+    job, acquired = db.acquire_job(ARCHIVE_JOB, trigger="api")
+    if acquired:
+        background_tasks.add_task(
+            run_archiver_backend, trigger="api", job_id=job.id, engine=request.app.state.engine
+        )
+    return {"job": job, "coalesced": not acquired}
+
+
+@app.get("/scheduler", response_model=schemas.SchedulerSchema)
+def scheduler_status(request: Request,
+                     token: str = Depends(verify_token)):
+    scheduler = request.app.state.scheduler
+    if scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, **scheduler.status()}
+
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobSchema)
+def get_job(job_id: str,
+            db: SimpleFIN_DB = Depends(get_db),
+            token: str = Depends(verify_token)):
+    job = db.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
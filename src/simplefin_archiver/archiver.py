@@ -0,0 +1,470 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from queue import Full, Queue
+from typing import Iterator, Optional
+
+import requests
+import typer
+from sqlalchemy import Engine
+
+from simplefin_archiver import SimpleFIN, SimpleFIN_DB, QueryResult
+from simplefin_archiver.simplefin import RateLimiter, build_session
+from simplefin_archiver.db import ARCHIVE_JOB, JOB_FAILED, JOB_SUCCEEDED, get_db_connection_string
+from simplefin_archiver.defaults import DEFAULT_BACKFILL_WORKERS, DEFAULT_DAYS_HISTORY, DEFAULT_MIN_INTERVAL
+from simplefin_archiver.defaults import DEFAULT_RETRIES, DEFAULT_TIMEOUT, DEFAULT_TOKEN_WORKERS, RESULT_QUEUE_SIZE
+from simplefin_archiver.defaults import DEFAULT_WINDOW_DAYS, DEFAULT_OVERLAP_DAYS
+
+
+def init_logging(debug: bool) -> None:
+    level = logging.DEBUG if debug else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s - %(name)s - %(message)s")
+
+
+def parse_key_file(data: str) -> list[tuple[str, str]]:
+    """
+    One token per line, optionally preceded by a label ("household-a user:pass").
+    Blank lines and lines starting with '#' are ignored.
+    """
+    keys = []
+    for line in data.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split()
+        if len(parts) == 1:
+            keys.append((f"key{len(keys) + 1}", parts[0]))
+        elif len(parts) == 2:
+            keys.append((parts[0], parts[1]))
+        else:
+            raise ValueError(f"Malformed key file line: expected '[label] token', got {len(parts)} fields")
+    return keys
+
+
+def resolve_simplefin_keys(
+    simplefin_key: Optional[str], simplefin_key_file: Optional[Path]
+) -> list[tuple[str, str]]:
+    """All (label, token) pairs to archive; a key file may hold several tokens."""
+    # default to env vars if not provided
+    if not simplefin_key:
+        simplefin_key = os.getenv("SIMPLEFIN_KEY")
+    if not simplefin_key_file:
+        simplefin_key_file_env = os.getenv("SIMPLEFIN_KEY_FILE")
+        if simplefin_key_file_env:
+            simplefin_key_file = Path(simplefin_key_file_env)
+
+    # if file provided, read it
+    if simplefin_key_file:
+        try:
+            data = Path(simplefin_key_file).read_text(encoding="utf-8").strip()
+            keys = parse_key_file(data)
+        except Exception as e:
+            typer.secho(f"Failed to read key file: {e}", fg=typer.colors.RED)
+            raise typer.Exit(code=2)
+        if not keys:
+            typer.secho("Key file is empty", fg=typer.colors.RED)
+            raise typer.Exit(code=2)
+        return keys
+
+    if simplefin_key:
+        return [("key1", simplefin_key)]
+
+    typer.secho(
+        "You must provide either --simplefin-key or --simplefin-key-file",
+        fg=typer.colors.RED,
+    )
+    raise typer.Exit(code=2)
+
+
+def resolve_simplefin_key(
+    simplefin_key: Optional[str], simplefin_key_file: Optional[Path]
+) -> str:
+    keys = resolve_simplefin_keys(simplefin_key, simplefin_key_file)
+    if len(keys) > 1:
+        logging.warning(f"Key file holds {len(keys)} tokens; using '{keys[0][0]}'")
+    return keys[0][1]
+
+
+def key_id(token: str) -> str:
+    """Stable identifier for a SimpleFIN token that doesn't reveal its credentials."""
+    return hashlib.sha256(token.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def resolve_days_history():
+    try:
+        env_val = int(os.getenv("QUERY_HISTORY_DAYS"))
+    except Exception as e:
+        typer.secho(f"Failed to QUERY_HISTORY_DAYS: {e}", fg=typer.colors.RED)
+        logging.info(f"Querying {DEFAULT_DAYS_HISTORY} days per DEFAULT_DAYS_HISTORY")
+        return DEFAULT_DAYS_HISTORY
+    if env_val:
+        logging.info(f"Querying {env_val} days per QUERY_HISTORY_DAYS")
+        return env_val
+    else:
+        logging.info(f"Querying {env_val} days per DEFAULT_DAYS_HISTORY")
+        return DEFAULT_DAYS_HISTORY
+
+
+def resolve_incremental(incremental: Optional[bool]) -> bool:
+    if incremental is not None:
+        return incremental
+    return os.getenv("QUERY_INCREMENTAL", "false").strip().lower() in ("1", "true", "yes")
+
+
+def resolve_overlap_days(overlap_days: Optional[int]) -> int:
+    if overlap_days is not None:
+        return overlap_days
+    try:
+        return int(os.getenv("QUERY_OVERLAP_DAYS", DEFAULT_OVERLAP_DAYS))
+    except ValueError as e:
+        typer.secho(f"Failed to QUERY_OVERLAP_DAYS: {e}", fg=typer.colors.RED)
+        return DEFAULT_OVERLAP_DAYS
+
+
+def resolve_incremental_window(
+    db_conn: SimpleFIN_DB, full_days: int, overlap_days: int, token_id: Optional[str] = None
+) -> tuple[int, set[str]]:
+    """
+    Days of history needed to catch up the accounts of one token (of every
+    token when token_id is None): from the oldest per-account high-water mark
+    minus the overlap. Each mark is floored at the last logged query that
+    returned the account, which covered it up to then, so a dormant account
+    doesn't widen the window for the rest. An account missing from responses
+    (its token failing, or a bank connection error) keeps its old floor and
+    is caught up once it is back; accounts last returned under another token
+    are left to that token's window. Returns the window and the known account
+    ids; an account unseen for longer than full_days isn't known, so it is
+    re-queried in full if it ever returns (see iter_token_results).
+    """
+    watermarks = db_conn.get_sync_watermarks()
+    horizon = datetime.now() - timedelta(days=full_days)
+    coverage = db_conn.get_account_coverage(since=horizon)
+    known_ids: set[str] = set()
+    marks = []
+    for acct_id, posted in watermarks.items():
+        synced, owner = coverage.get(acct_id, (None, None))
+        mark = max(posted, synced) if posted and synced else posted or synced
+        if mark is not None and mark < horizon:
+            continue
+        known_ids.add(acct_id)
+        if token_id is None or owner is None or owner == token_id:
+            marks.append(mark)
+    if not marks:
+        logging.info(f"No recently archived accounts; querying full {full_days} days")
+        return full_days, known_ids
+    if any(mark is None for mark in marks):
+        logging.info(f"No high-water mark for some accounts; querying full {full_days} days")
+        return full_days, known_ids
+
+    start = min(marks) - timedelta(days=overlap_days)
+    days = max(1, math.ceil((datetime.now() - start).total_seconds() / 86400))
+    days = min(days, full_days)
+    logging.info(f"Incremental sync from {start.isoformat(timespec='hours')}: querying {days} days")
+    return days, known_ids
+
+
+def iter_query_results(
+    conn: SimpleFIN,
+    days_history: int,
+    stream: bool = False,
+    account_ids: Optional[list[str]] = None,
+) -> Iterator[QueryResult]:
+    """One QueryResult per account when streaming, else a single full result."""
+    if stream:
+        yield from conn.stream_accounts(days_history=days_history, account_ids=account_ids)
+    else:
+        yield conn.query_accounts(days_history=days_history, account_ids=account_ids)
+
+
+def iter_token_results(
+    conn: SimpleFIN,
+    days_history: int,
+    full_days: int,
+    known_ids: set[str],
+    stream: bool = False,
+) -> Iterator[QueryResult]:
+    """Results for one token, re-querying accounts seen for the first time with full_days."""
+    acct_ids: list[str] = []
+    for part in iter_query_results(conn, days_history, stream):
+        acct_ids.extend(acct.id for acct in part.accounts)
+        yield part
+
+    new_ids = [acct_id for acct_id in acct_ids if acct_id not in known_ids]
+    if new_ids and days_history < full_days:
+        logging.info(f"Querying full {full_days} days for {len(new_ids)} new accounts")
+        yield from iter_query_results(conn, full_days, stream, account_ids=new_ids)
+
+
+def resolve_db_url(db_conn_str: Optional[str]) -> str:
+    """Resolve database URL from parameter or environment."""
+    if db_conn_str:
+        return db_conn_str
+    else:
+        return get_db_connection_string()
+
+
+def run_archiver_backend(
+    simplefin_key: Optional[str] = None,
+    simplefin_key_file: Optional[Path] = None,
+    days_history: Optional[int] = None,
+    db: Optional[str] = None,
+    timeout: int = 20,
+    debug: bool = False,
+    stream: bool = False,
+    incremental: Optional[bool] = None,
+    overlap_days: Optional[int] = None,
+    retries: int = DEFAULT_RETRIES,
+    trigger: str = "cli",
+    job_id: Optional[str] = None,
+    engine: Optional[Engine] = None,
+    http_session: Optional[requests.Session] = None,
+) -> str:
+    """
+    Core logic without Typer dependencies. Runs under the archive job lock, so
+    at most one archive is in flight across processes; pass job_id when the
+    caller already acquired it (see SimpleFIN_DB.acquire_job). A long-running
+    caller can pass its engine and HTTP session to reuse their pools.
+    """
+    init_logging(debug)
+    db_url = resolve_db_url(db)
+
+    with SimpleFIN_DB(connection_str=db_url, engine=engine) as db_conn:
+        if job_id is None:
+            job, acquired = db_conn.acquire_job(ARCHIVE_JOB, trigger)
+            if not acquired:
+                message = f"Archive job {job.id} is already running; skipping."
+                typer.secho(message, fg=typer.colors.YELLOW)
+                return message
+            job_id = job.id
+
+        acct_ids: set[str] = set()
+        n_transactions = 0
+        failures: dict[str, Exception] = {}
+        keys: list[tuple[str, str]] = []
+        try:
+            keys = resolve_simplefin_keys(simplefin_key, simplefin_key_file)
+            if not days_history:
+                days_history = resolve_days_history()
+            incremental = resolve_incremental(incremental)
+            overlap_days = resolve_overlap_days(overlap_days)
+
+            full_days = days_history
+            known_ids: set[str] = set()
+            # per token, so one token's outage doesn't shorten or widen the others' windows
+            windows: dict[str, int] = {}
+            if incremental:
+                for label, token in keys:
+                    windows[label], known_ids = resolve_incremental_window(
+                        db_conn, full_days, overlap_days, key_id(token)
+                    )
+
+            # tokens are fetched concurrently over one HTTP pool; their results
+            # are queued and committed here, on the thread that owns the session
+            session = http_session or build_session(pool_size=len(keys))
+            # bounded, so fetchers outpacing the commits block instead of
+            # piling parsed results up in memory
+            results: Queue = Queue(maxsize=RESULT_QUEUE_SIZE)
+            aborted = threading.Event()
+
+            def put(item: tuple) -> bool:
+                # give up once the consumer has stopped draining
+                while not aborted.is_set():
+                    try:
+                        results.put(item, timeout=1)
+                        return True
+                    except Full:
+                        continue
+                return False
+
+            def fetch(label: str, token: str) -> None:
+                try:
+                    # plain rows: the bulk commit path needs no ORM instances
+                    conn = SimpleFIN(
+                        token, timeout=timeout, debug=debug, retries=retries, session=session, as_rows=True
+                    )
+                    days = windows.get(label, days_history)
+                    for part in iter_token_results(conn, days, full_days, known_ids, stream):
+                        if part.querylog is not None:
+                            part.querylog.key_id = key_id(token)
+                        if not put((label, part, None)):
+                            return
+                except Exception as e:
+                    put((label, None, e))
+                put((label, None, None))  # this token is done
+
+            with ThreadPoolExecutor(max_workers=min(len(keys), DEFAULT_TOKEN_WORKERS)) as pool:
+                for label, token in keys:
+                    pool.submit(fetch, label, token)
+
+                n_running = len(keys)
+                try:
+                    while n_running:
+                        label, part, error = results.get()
+                        if error is not None:
+                            failures[label] = error
+                            logging.error(f"Archiving '{label}' failed: {error}")
+                        elif part is None:
+                            n_running -= 1
+                        elif label not in failures:
+                            try:
+                                db_conn.commit_query_result(part)
+                            except Exception as e:
+                                # keep draining so the worker isn't left blocked
+                                failures[label] = e
+                                logging.error(f"Saving results for '{label}' failed: {e}")
+                                continue
+                            acct_ids.update(acct.id for acct in part.accounts)
+                            n_transactions += len(part.transactions)
+                            try:
+                                db_conn.heartbeat_job(job_id)
+                            except Exception as e:
+                                # the results are saved; a missed refresh only risks the lock expiring
+                                logging.warning(f"Failed to refresh the archive job lock: {e}")
+                except BaseException:
+                    aborted.set()  # release fetchers blocked on the full queue
+                    raise
+            if http_session is None:
+                session.close()
+        except BaseException as e:
+            error = str(e) or type(e).__name__
+            db_conn.finish_job(job_id, JOB_FAILED, len(acct_ids), n_transactions, error)
+            raise
+
+        message = (
+            f"Saved {len(acct_ids)} accounts with "
+            f"{n_transactions} transactions."
+        )
+        if failures:
+            message += f" {len(failures)} of {len(keys)} tokens failed: {', '.join(failures)}."
+        db_conn.finish_job(
+            job_id, JOB_FAILED if failures else JOB_SUCCEEDED, len(acct_ids), n_transactions, message
+        )
+
+    if failures and len(keys) == 1:
+        raise next(iter(failures.values()))
+
+    if failures:
+        typer.secho(message, fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    typer.secho(message, fg=typer.colors.GREEN)
+    return message
+
+
+def split_windows(
+    start: datetime, end: datetime, window_days: int
+) -> list[tuple[datetime, datetime]]:
+    """Split [start, end) into windows anchored at start, so reruns line up."""
+    windows = []
+    step = timedelta(days=window_days)
+    window_start = start
+    while window_start < end:
+        windows.append((window_start, min(window_start + step, end)))
+        window_start += step
+    return windows
+
+
+def run_backfill_backend(
+    start: datetime,
+    end: Optional[datetime] = None,
+    window_days: int = DEFAULT_WINDOW_DAYS,
+    workers: int = DEFAULT_BACKFILL_WORKERS,
+    min_interval: float = DEFAULT_MIN_INTERVAL,
+    simplefin_key: Optional[str] = None,
+    simplefin_key_file: Optional[Path] = None,
+    db: Optional[str] = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    debug: bool = False,
+) -> str:
+    """
+    Fetch [start, end) in fixed windows for every token on a bounded thread pool,
+    committing each window as it finishes. Completed windows are checkpointed in
+    the DB per token and skipped on the next run, so an interrupted backfill
+    resumes where it stopped. Runs under the archive job lock, so it overlaps
+    neither another backfill nor a regular archive.
+    """
+    init_logging(debug)
+    keys = resolve_simplefin_keys(simplefin_key, simplefin_key_file)
+    db_url = resolve_db_url(db)
+    if not end:
+        end = datetime.combine(date.today(), datetime.min.time())
+
+    conns = {
+        label: SimpleFIN(token, timeout=timeout, debug=debug, pool_size=workers, as_rows=True)
+        for label, token in keys
+    }
+    token_ids = {label: key_id(token) for label, token in keys}
+    # one limiter across tokens: --min-interval spaces out every request
+    limiter = RateLimiter(min_interval)
+
+    def fetch(label: str, window: tuple[datetime, datetime]) -> QueryResult:
+        limiter.wait()
+        qr = conns[label].query_accounts(
+            days_history=(window[1] - window[0]).days,
+            start_date=window[0],
+            end_date=window[1],
+        )
+        qr.querylog.backfill = True
+        qr.querylog.key_id = token_ids[label]
+        return qr
+
+    n_windows = n_transactions = n_failed = 0
+    with SimpleFIN_DB(connection_str=db_url) as db_conn:
+        job, acquired = db_conn.acquire_job(ARCHIVE_JOB, trigger="backfill")
+        if not acquired:
+            message = f"Archive job {job.id} is already running; skipping."
+            typer.secho(message, fg=typer.colors.YELLOW)
+            return message
+
+        try:
+            pending = []
+            for label, _ in keys:
+                done = db_conn.get_completed_windows(token_ids[label])
+                pending.extend((label, w) for w in split_windows(start, end, window_days) if w not in done)
+            logging.info(f"Backfilling {len(pending)} windows of {window_days} days for {len(keys)} tokens")
+
+            # fetches run concurrently; commits stay on this thread's session
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(fetch, label, window): (label, window) for label, window in pending}
+                for future in as_completed(futures):
+                    label, (window_start, window_end) = futures[future]
+                    window_label = f"'{label}' {window_start:%Y-%m-%d}..{window_end:%Y-%m-%d}"
+                    try:
+                        qr = future.result()
+                        db_conn.commit_query_result(qr)
+                        db_conn.mark_window_complete(
+                            token_ids[label], window_start, window_end, len(qr.transactions)
+                        )
+                    except Exception as e:
+                        n_failed += 1
+                        logging.error(f"Backfill window {window_label} failed: {e}")
+                        continue
+                    try:
+                        db_conn.heartbeat_job(job.id)
+                    except Exception as e:
+                        logging.warning(f"Failed to refresh the archive job lock: {e}")
+                    n_windows += 1
+                    n_transactions += len(qr.transactions)
+                    logging.info(f"Backfill window {window_label}: {len(qr.transactions)} transactions")
+        except BaseException as e:
+            error = str(e) or type(e).__name__
+            db_conn.finish_job(job.id, JOB_FAILED, n_transactions=n_transactions, message=error)
+            raise
+
+        message = f"Backfilled {n_windows} windows with {n_transactions} transactions."
+        if n_failed:
+            message += f" {n_failed} windows failed; rerun to retry them."
+        db_conn.finish_job(
+            job.id, JOB_FAILED if n_failed else JOB_SUCCEEDED, n_transactions=n_transactions, message=message
+        )
+
+    if n_failed:
+        typer.secho(message, fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    typer.secho(message, fg=typer.colors.GREEN)
+    return message
@@ -1,110 +1,45 @@
-import logging
-import os
+import sys
+from datetime import datetime
+from importlib import import_module
 from pathlib import Path
 from typing import Optional
 
 import typer
-from simplefin_archiver import SimpleFIN, SimpleFIN_DB, QueryResult
-from simplefin_archiver.simplefin import DEFAULT_DAYS_HISTORY, DEFAULT_TIMEOUT
-from simplefin_archiver.db import get_db_connection_string
 
-app = typer.Typer(help="Query SimpleFIN and persist accounts to a SQLite DB")
+# heavy modules (SQLAlchemy, requests, the archiver itself) are imported
+# inside the commands so `--help` and cron start-up stay fast; see
+# benchmarks/import_time.py
+from simplefin_archiver.defaults import CODECS, DEFAULT_BACKFILL_WORKERS, DEFAULT_EXPORT_BATCH_SIZE
+from simplefin_archiver.defaults import DEFAULT_MIN_INTERVAL, DEFAULT_OVERLAP_DAYS, DEFAULT_RECOMPRESS_BATCH
+from simplefin_archiver.defaults import DEFAULT_RETRIES, DEFAULT_TIMEOUT, DEFAULT_WINDOW_DAYS
 
+app = typer.Typer(help="Query SimpleFIN and persist accounts to a SQLite DB")
 
-def init_logging(debug: bool) -> None:
-    level = logging.DEBUG if debug else logging.INFO
-    logging.basicConfig(level=level, format="%(levelname)s - %(name)s - %(message)s")
-
-
-def resolve_simplefin_key(
-    simplefin_key: Optional[str], simplefin_key_file: Optional[Path]
-) -> str:
-    # default to env vars if not provided
-    if not simplefin_key:
-        simplefin_key = os.getenv("SIMPLEFIN_KEY")
-    if not simplefin_key_file:
-        simplefin_key_file_env = os.getenv("SIMPLEFIN_KEY_FILE")
-        if simplefin_key_file_env:
-            simplefin_key_file = Path(simplefin_key_file_env)
-
-    # if file provided, read it
-    if simplefin_key_file:
-        try:
-            data = Path(simplefin_key_file).read_text(encoding="utf-8").strip()
-        except Exception as e:
-            typer.secho(f"Failed to read key file: {e}", fg=typer.colors.RED)
-            raise typer.Exit(code=2)
-        if not data:
-            typer.secho("Key file is empty", fg=typer.colors.RED)
-            raise typer.Exit(code=2)
-        return data
-
-    if simplefin_key:
-        return simplefin_key
-
-    typer.secho(
-        "You must provide either --simplefin-key or --simplefin-key-file",
-        fg=typer.colors.RED,
+# helpers that used to live here and moved to archiver.py; still importable
+# from this module, loaded on first access (PEP 562) like the package's
+_MOVED_ATTRS = {
+    name: ".archiver"
+    for name in (
+        "init_logging", "parse_key_file", "resolve_simplefin_keys", "resolve_simplefin_key", "key_id",
+        "resolve_days_history", "resolve_incremental", "resolve_overlap_days", "resolve_incremental_window",
+        "iter_query_results", "iter_token_results", "resolve_db_url", "run_archiver_backend",
+        "split_windows", "run_backfill_backend",
     )
-    raise typer.Exit(code=2)
+}
+_MOVED_ATTRS.update(DEFAULT_TOKEN_WORKERS=".defaults", DEFAULT_DAYS_HISTORY=".defaults")
 
 
-def resolve_days_history():
-    try:
-        env_val = int(os.getenv("QUERY_HISTORY_DAYS"))
-    except Exception as e:
-        typer.secho(f"Failed to QUERY_HISTORY_DAYS: {e}", fg=typer.colors.RED)
-        logging.info(f"Querying {DEFAULT_DAYS_HISTORY} days per DEFAULT_DAYS_HISTORY")
-        return DEFAULT_DAYS_HISTORY
-    if env_val:
-        logging.info(f"Querying {env_val} days per QUERY_HISTORY_DAYS")
-        return env_val
-    else:
-        logging.info(f"Querying {env_val} days per DEFAULT_DAYS_HISTORY")
-        return DEFAULT_DAYS_HISTORY
-
-
-def resolve_db_url(db_conn_str: Optional[str]) -> str:
-    """Resolve database URL from parameter or environment."""
-    if db_conn_str:
-        return db_conn_str
-    else:
-        return get_db_connection_string()
-
-
-def run_archiver_backend(
-    simplefin_key: Optional[str] = None,
-    simplefin_key_file: Optional[Path] = None,
-    days_history: Optional[int] = None,
-    db: Optional[str] = None,
-    timeout: int = 20,
-    debug: bool = False,
-) -> str:
-    """Core logic without Typer dependencies."""
-    init_logging(debug)
-    password = resolve_simplefin_key(simplefin_key, simplefin_key_file)
-    db_url = resolve_db_url(db)
-
-    if not days_history:
-        days_history = resolve_days_history()
-
-    conn = SimpleFIN(password, timeout=timeout, debug=debug)
-    qr: QueryResult = conn.query_accounts(days_history=days_history)
-
-    with SimpleFIN_DB(connection_str=db_url) as db_conn:
-        db_conn.commit_query_result(qr)
-
-    message = (
-        f"Saved {len(qr.accounts)} accounts with "
-        f"{len(qr.transactions)} transactions."
-    )
+def __getattr__(name: str):
+    if name not in _MOVED_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_MOVED_ATTRS[name], "simplefin_archiver"), name)
+    globals()[name] = value
+    return value
 
-    typer.secho(message, fg=typer.colors.GREEN)
-    return message
 
-
-@app.command()
+@app.callback(invoke_without_command=True)
 def run_archiver(
+    ctx: typer.Context,
     simplefin_key: Optional[str] = typer.Option(
         None,
         "--simplefin-key",
@@ -137,9 +72,247 @@ def run_archiver(
         "--debug",
         help="Enable debug logging",
     ),
+    stream: bool = typer.Option(
+        False,
+        "--stream",
+        help="Parse the SimpleFIN response incrementally and commit per account",
+    ),
+    incremental: Optional[bool] = typer.Option(
+        None,
+        "--incremental/--full",
+        help="Only query since each account's newest archived transaction\n"
+        "Env var QUERY_INCREMENTAL can also be used.",
+    ),
+    overlap_days: Optional[int] = typer.Option(
+        None,
+        "--overlap-days",
+        help="Days re-queried before the high-water mark in incremental mode\n"
+        f"Env var QUERY_OVERLAP_DAYS can also be used (default {DEFAULT_OVERLAP_DAYS}).",
+    ),
+    retries: int = typer.Option(
+        DEFAULT_RETRIES,
+        "--retries",
+        help="Retries for failed or throttled SimpleFIN requests",
+    ),
+    trigger: str = typer.Option(
+        "cli",
+        "--trigger",
+        hidden=True,
+        help="Recorded on the job row (cli, cron or api)",
+    ),
 ) -> None:
     """Query SimpleFIN and save accounts to the given DB."""
-    return run_archiver_backend(simplefin_key, simplefin_key_file, days_history, db, timeout, debug)
+    # subcommands (e.g. compress-payloads) run on their own
+    if ctx.invoked_subcommand is not None:
+        return
+    from simplefin_archiver.archiver import run_archiver_backend
+
+    run_archiver_backend(
+        simplefin_key, simplefin_key_file, days_history, db, timeout, debug, stream,
+        incremental, overlap_days, retries, trigger,
+    )
+
+
+@app.command()
+def backfill(
+    start: datetime = typer.Option(
+        ...,
+        "--start",
+        formats=["%Y-%m-%d"],
+        help="First day of history to backfill",
+    ),
+    end: Optional[datetime] = typer.Option(
+        None,
+        "--end",
+        formats=["%Y-%m-%d"],
+        help="Day to backfill up to (exclusive, default today)",
+    ),
+    window_days: int = typer.Option(
+        DEFAULT_WINDOW_DAYS,
+        "--window-days",
+        help="Days of history per SimpleFIN request",
+    ),
+    workers: int = typer.Option(
+        DEFAULT_BACKFILL_WORKERS,
+        "--workers",
+        help="Concurrent SimpleFIN requests",
+    ),
+    min_interval: float = typer.Option(
+        DEFAULT_MIN_INTERVAL,
+        "--min-interval",
+        help="Minimum seconds between SimpleFIN requests",
+    ),
+    simplefin_key: Optional[str] = typer.Option(
+        None,
+        "--simplefin-key",
+        help="SimpleFIN API key (or use SIMPLEFIN_KEY env var)",
+    ),
+    simplefin_key_file: Optional[Path] = typer.Option(
+        None,
+        "--simplefin-key-file",
+        help="Path to a key file; every token in it is backfilled (or use SIMPLEFIN_KEY_FILE env var)",
+    ),
+    db: Optional[str] = typer.Option(
+        None,
+        "--db",
+        help="SQLAlchemy DB URL (or use SIMPLEFIN_DB_PATH env var)",
+    ),
+    timeout: int = typer.Option(
+        DEFAULT_TIMEOUT,
+        "--timeout",
+        help="Connection timeout in seconds",
+    ),
+    debug: bool = typer.Option(
+        False,
+        "--debug",
+        help="Enable debug logging",
+    ),
+) -> None:
+    """Import a long range of history in resumable, concurrent windows."""
+    from simplefin_archiver.archiver import run_backfill_backend
+
+    run_backfill_backend(
+        start, end, window_days, workers, min_interval,
+        simplefin_key, simplefin_key_file, db, timeout, debug,
+    )
+
+
+@app.command()
+def compress_payloads(
+    codec: str = typer.Option(
+        "gzip",
+        "--codec",
+        help="Codec to compress existing payloads with (gzip or zstd)",
+    ),
+    db: Optional[str] = typer.Option(
+        None,
+        "--db",
+        help="SQLAlchemy DB URL (or use SIMPLEFIN_DB_PATH env var)",
+    ),
+    batch_size: int = typer.Option(
+        DEFAULT_RECOMPRESS_BATCH,
+        "--batch-size",
+        help="Rows rewritten per statement",
+    ),
+) -> None:
+    """Compress raw payloads already stored in the DB, in batches."""
+    from simplefin_archiver import SimpleFIN_DB
+    from simplefin_archiver.archiver import init_logging, resolve_db_url
+    from simplefin_archiver.compression import recompress_payloads
+
+    init_logging(False)
+    if codec not in CODECS or codec == "none":
+        typer.secho(f"Unsupported codec: {codec}", fg=typer.colors.RED)
+        raise typer.Exit(code=2)
+    with SimpleFIN_DB(connection_str=resolve_db_url(db)) as db_conn:
+        with db_conn.engine.begin() as conn:
+            n_rows = recompress_payloads(conn, codec, batch_size)
+    typer.secho(f"Compressed {n_rows} payloads with {codec}.", fg=typer.colors.GREEN)
+
+
+@app.command()
+def rebuild_rollups(
+    db: Optional[str] = typer.Option(
+        None,
+        "--db",
+        help="SQLAlchemy DB URL (or use SIMPLEFIN_DB_PATH env var)",
+    ),
+) -> None:
+    """Recompute the transaction rollup table from the full ledger."""
+    from simplefin_archiver import SimpleFIN_DB
+    from simplefin_archiver.archiver import init_logging, resolve_db_url
+
+    init_logging(False)
+    with SimpleFIN_DB(connection_str=resolve_db_url(db)) as db_conn:
+        n_rows = db_conn.rebuild_rollups()
+    typer.secho(f"Rebuilt {n_rows} rollup rows.", fg=typer.colors.GREEN)
+
+
+@app.command()
+def rebuild_search_index(
+    db: Optional[str] = typer.Option(
+        None,
+        "--db",
+        help="SQLAlchemy DB URL (or use SIMPLEFIN_DB_PATH env var)",
+    ),
+) -> None:
+    """Re-index all transactions for full-text search."""
+    from simplefin_archiver import SimpleFIN_DB
+    from simplefin_archiver.archiver import init_logging, resolve_db_url
+
+    init_logging(False)
+    with SimpleFIN_DB(connection_str=resolve_db_url(db)) as db_conn:
+        db_conn.rebuild_search_index()
+    typer.secho("Rebuilt the transaction search index.", fg=typer.colors.GREEN)
+
+
+@app.command()
+def export(
+    table: str = typer.Argument(
+        "transactions",
+        help="What to export: transactions or balances",
+    ),
+    fmt: str = typer.Option(
+        "csv",
+        "--format",
+        help="Output format: csv, ndjson or parquet",
+    ),
+    output: Optional[Path] = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="File to write (default stdout)",
+    ),
+    account_id: Optional[str] = typer.Option(
+        None,
+        "--account-id",
+        help="Only export this account",
+    ),
+    start: Optional[datetime] = typer.Option(
+        None,
+        "--start",
+        formats=["%Y-%m-%d"],
+        help="First day to export",
+    ),
+    end: Optional[datetime] = typer.Option(
+        None,
+        "--end",
+        formats=["%Y-%m-%d"],
+        help="Day to export up to (exclusive)",
+    ),
+    db: Optional[str] = typer.Option(
+        None,
+        "--db",
+        help="SQLAlchemy DB URL (or use SIMPLEFIN_DB_PATH env var)",
+    ),
+    batch_size: int = typer.Option(
+        DEFAULT_EXPORT_BATCH_SIZE,
+        "--batch-size",
+        help="Rows fetched and written per batch",
+    ),
+) -> None:
+    """Stream the archive to CSV, NDJSON or Parquet in constant memory."""
+    from simplefin_archiver import SimpleFIN_DB
+    from simplefin_archiver.archiver import init_logging, resolve_db_url
+    from simplefin_archiver.export import iter_export, validate_export
+
+    init_logging(False)
+    try:
+        validate_export(table, fmt)
+    except (ValueError, ImportError) as e:
+        typer.secho(str(e), fg=typer.colors.RED)
+        raise typer.Exit(code=2)
+    with SimpleFIN_DB(connection_str=resolve_db_url(db)) as db_conn:
+        with db_conn.engine.connect() as conn:
+            out = open(output, "wb") if output else sys.stdout.buffer
+            try:
+                for chunk in iter_export(conn, table, fmt, account_id, start, end, batch_size):
+                    out.write(chunk)
+            finally:
+                if output:
+                    out.close()
+                else:
+                    out.flush()
 
 
 if __name__ == "__main__":
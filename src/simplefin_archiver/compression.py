@@ -0,0 +1,213 @@
+import gzip
+import logging
+import os
+import tempfile
+from functools import cache
+
+from sqlalchemy import Connection, LargeBinary, bindparam, column, select, table, update
+from sqlalchemy.types import TypeDecorator
+
+from .defaults import CODECS, DEFAULT_RECOMPRESS_BATCH
+
+COMPRESSION_ENV = "SIMPLEFIN_COMPRESSION"
+
+# gzip and zstd frames start with these magic numbers, which double as the
+# codec marker; anything else is stored as plain utf-8
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# (table, primary key, payload column) for every compressible payload
+PAYLOAD_COLUMNS = (
+    ("query_log", "id", "raw_response"),
+    ("account", "id", "raw_json"),
+    ("balance", "id", "raw_json"),
+    ("transaction", "id", "raw_json"),
+)
+
+
+@cache
+def get_codec() -> str:
+    """
+    Codec for newly written payloads, from SIMPLEFIN_COMPRESSION (default none).
+    Read once and cached; reload_codec() re-reads it, which every new engine
+    does (see db.create_db_engine).
+    """
+    codec = os.getenv(COMPRESSION_ENV, "none").strip().lower() or "none"
+    if codec not in CODECS:
+        raise ValueError(f"{COMPRESSION_ENV} must be one of {', '.join(CODECS)}, got '{codec}'")
+    if codec == "zstd":
+        _zstd()  # fail early if no zstd implementation is installed
+    return codec
+
+
+def reload_codec() -> str:
+    """Drop the cached codec and read SIMPLEFIN_COMPRESSION again."""
+    get_codec.cache_clear()
+    return get_codec()
+
+
+def _zstd():
+    try:
+        from compression import zstd  # python >= 3.14
+
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+
+        return zstandard
+    except ImportError:
+        raise ImportError("zstd compression requires Python 3.14+ or the 'zstandard' package")
+
+
+def compress(text: str, codec: str) -> bytes:
+    data = text.encode("utf-8")
+    if codec == "gzip":
+        packed = gzip.compress(data, mtime=0)
+    elif codec == "zstd":
+        packed = _zstd().compress(data)
+    else:
+        return data
+    # tiny payloads grow once framed; keep those as plain utf-8
+    return packed if len(packed) < len(data) else data
+
+
+def is_compressed(data: bytes) -> bool:
+    return data.startswith(GZIP_MAGIC) or data.startswith(ZSTD_MAGIC)
+
+
+def decompress(data: bytes | str) -> str:
+    if isinstance(data, str):
+        return data
+    data = bytes(data)
+    if data.startswith(GZIP_MAGIC):
+        data = gzip.decompress(data)
+    elif data.startswith(ZSTD_MAGIC):
+        zstd = _zstd()
+        if zstd.__name__ == "zstandard":
+            # zstandard needs the content size in the frame for one-shot decompress
+            data = zstd.ZstdDecompressor().decompressobj().decompress(data)
+        else:
+            data = zstd.decompress(data)
+    return data.decode("utf-8")
+
+
+class CompressingSink:
+    """
+    Write-only file that encodes bytes as they are written, exactly as
+    CompressedText would store them, spilling to a temporary file past
+    `max_size`. Lets a streamed body be stored without ever holding it
+    uncompressed in memory; assign getvalue() to a CompressedText column.
+    """
+
+    def __init__(self, codec: str, max_size: int):
+        self.codec = codec
+        self.n_raw = 0
+        self._spool = tempfile.SpooledTemporaryFile(max_size=max_size)
+        self._gzip = gzip.GzipFile(fileobj=self._spool, mode="wb", mtime=0) if codec == "gzip" else None
+        self._zstd = None
+        if codec == "zstd":
+            zstd = _zstd()
+            # both implementations expose compress()/flush() on these
+            self._zstd = zstd.ZstdCompressor().compressobj() if zstd.__name__ == "zstandard" else zstd.ZstdCompressor()
+
+    def write(self, data: bytes) -> int:
+        self.n_raw += len(data)
+        if self._gzip is not None:
+            self._gzip.write(data)
+        elif self._zstd is not None:
+            self._spool.write(self._zstd.compress(data))
+        else:
+            self._spool.write(data)
+        return len(data)
+
+    def getvalue(self) -> bytes:
+        """The finished payload; call once, after the last write."""
+        if self._gzip is not None:
+            self._gzip.close()
+        elif self._zstd is not None:
+            self._spool.write(self._zstd.flush())
+        self._spool.seek(0)
+        data = self._spool.read()
+        # tiny payloads grow once framed; keep those as plain utf-8, like compress()
+        if self.codec != "none" and len(data) >= self.n_raw:
+            return decompress(data).encode("utf-8")
+        return data
+
+    def close(self) -> None:
+        self._spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text stored in a binary column. Values are compressed on write with the
+    configured codec and decoded transparently on read, whatever codec (if
+    any) they were written with.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            return value  # already encoded, e.g. by CompressingSink
+        return compress(value, get_codec())
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress(value)
+
+
+def recompress_payloads(
+    conn: Connection,
+    codec: str,
+    batch_size: int = DEFAULT_RECOMPRESS_BATCH,
+    logger: logging.Logger = None,
+) -> int:
+    """
+    Rewrite stored payloads that are not yet compressed using `codec`, walking
+    each table in primary-key order one batch at a time. Returns rows rewritten.
+    """
+    if not logger:
+        logger = logging.getLogger()
+    if codec == "none":
+        return 0
+
+    total = 0
+    for table_name, pk_name, col_name in PAYLOAD_COLUMNS:
+        tbl = table(table_name, column(pk_name), column(col_name, LargeBinary))
+        pk, col = tbl.c[pk_name], tbl.c[col_name]
+        last_id = None
+        n_table = 0
+        while True:
+            stmt = select(pk, col).order_by(pk).limit(batch_size)
+            if last_id is not None:
+                stmt = stmt.where(pk > last_id)
+            rows = conn.execute(stmt).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            changed = [
+                {"pk": row_id, "payload": compress(decompress(payload), codec)}
+                for row_id, payload in rows
+                if payload is not None and not is_compressed(bytes(payload))
+            ]
+            if changed:
+                conn.execute(
+                    update(tbl).where(pk == bindparam("pk")).values({col_name: bindparam("payload")}),
+                    changed,
+                )
+                n_table += len(changed)
+        logger.info(f"Compressed {n_table} {table_name}.{col_name} payloads with {codec}")
+        total += n_table
+    return total
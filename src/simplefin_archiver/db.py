@@ -1,12 +1,121 @@
 import os
+import base64
+import json
 import logging
+import uuid
+from datetime import datetime, timedelta
 from typing import Optional
 
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import Session
+from sqlalchemy import DateTime, Double, Engine, Select, and_, bindparam, create_engine, delete, func, insert, inspect
+from sqlalchemy import literal, or_, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, undefer
+
+from .compression import reload_codec
+from .models import Account, BackfillWindow, Balance, Job, JobLock, LatestBalance, QueryLog, Transaction
+from .models import QueryResult, TransactionRevision, TransactionRollup, VenmoCheckpoint, VenmoMessage
+from .rollups import GRANULARITIES, rebuild_rollups, refresh_rollups
+from .search import apply_search, rebuild_search_index
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+DEFAULT_BATCH_SIZE = 500
+# kept well under SQLite's historic 999 bound-parameter limit
+DEFAULT_LOOKUP_CHUNK_SIZE = 500
+# transaction columns that come from SimpleFIN, rewritten (and kept in
+# transaction_revision) when a transaction changes after it was archived
+REVISED_COLUMNS = (
+    "posted", "amount", "description", "raw_json", "payee", "memo",
+    "transacted_at", "extra_attrs", "content_hash",
+)
+# latest_balance columns compared when the same balance is seen again
+LATEST_BALANCE_VALUES = ("balance", "available_balance", "balance_date")
+
+ARCHIVE_JOB = "archive"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+# a running job refreshes its lock after every commit; one this stale is dead
+DEFAULT_JOB_LOCK_TTL = timedelta(minutes=30)
+
+# outcomes recorded in the Venmo message ledger
+VENMO_TRANSACTION = "transaction"
+VENMO_IGNORED = "ignored"
+VENMO_FAILED = "failed"
+
+# dialects with a native INSERT ... ON CONFLICT, used for bulk ingest
+UPSERT_DIALECTS = {
+    "sqlite": sqlite,
+    "postgresql": postgresql,
+}
+
+
+def _as_row(obj) -> dict:
+    """Column values of a mapped instance (or an already plain row), keyed by column name."""
+    if isinstance(obj, dict):
+        return obj
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(type(obj)).column_attrs}
+
+
+def encode_cursor(sort_value: datetime | float, row_id: str) -> str:
+    """Build an opaque keyset cursor from the last row of a page."""
+    if sort_value is None:
+        # would encode as "None" and be rejected when handed back; sort keys are NOT NULL
+        raise ValueError(f"Can't build a cursor on a null sort value (row {row_id})")
+    value = sort_value.isoformat() if isinstance(sort_value, datetime) else repr(sort_value)
+    raw = f"{value}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort_type: type = datetime) -> tuple[datetime | float, str]:
+    """Inverse of encode_cursor; raises ValueError on malformed input."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        sort_value, row_id = raw.split("|", 1)
+        if sort_type is datetime:
+            return datetime.fromisoformat(sort_value), row_id
+        return sort_type(sort_value), row_id
+    except Exception as ex:
+        raise ValueError(f"Invalid cursor: {cursor}") from ex
+
+
+# columns served by the list endpoints; the raw payloads are only loaded for detail views
+TRANSACTION_LIST_COLUMNS = (
+    Transaction.id,
+    Transaction.posted,
+    Transaction.amount,
+    Transaction.description,
+    Transaction.transacted_at,
+)
+BALANCE_LIST_COLUMNS = (
+    Balance.id,
+    Balance.balance,
+    Balance.balance_date,
+)
+ACCOUNT_LIST_COLUMNS = (
+    Account.id,
+    Account.bank,
+    Account.name,
+    Account.currency,
+)
+
+
+def _account_projection() -> list:
+    return [col.label(f"account_{col.key}") for col in ACCOUNT_LIST_COLUMNS]
+
+
+def _nest_account(row) -> dict:
+    """Flat projected row -> dict with the account columns nested under 'account'."""
+    data, account = {}, {}
+    for key, value in row._mapping.items():
+        if key.startswith("account_"):
+            account[key[len("account_"):]] = value
+        else:
+            data[key] = value
+    data["account"] = account
+    return data
 
-from .models import Account, Balance, Transaction
-from .models import QueryResult
 
 def get_db_connection_string(logger: logging.Logger = None) -> str:
     """
@@ -40,8 +149,30 @@ def get_db_connection_string(logger: logging.Logger = None) -> str:
     logger.info("Connecting to sqlite at default simplefin.db")
     return "sqlite:///simplefin.db"
 
+def create_db_engine(
+    connection_str: str,
+    conn_timeout: int = 10,
+    pool_size: Optional[int] = None,
+    pool_pre_ping: bool = False,
+) -> Engine:
+    """Engine with the connect args this project uses; pool options are optional."""
+    # a long-running process picks up a changed SIMPLEFIN_COMPRESSION here
+    reload_codec()
+    conn_args = {}
+    if connection_str.startswith("sqlite"):
+        conn_args["timeout"] = conn_timeout
+    pool_args = {}
+    if pool_size is not None:
+        pool_args["pool_size"] = pool_size
+    return create_engine(
+        connection_str, connect_args=conn_args, pool_pre_ping=pool_pre_ping, **pool_args
+    )
+
+
 class SimpleFIN_DB:
     conn_timeout: int
+    batch_size: int
+    lookup_chunk_size: int
     logger: logging.Logger
 
     def __init__(
@@ -50,28 +181,49 @@ class SimpleFIN_DB:
         db_path: Optional[str] = None,
         conn_timeout: int = 10,
         logger: logging.Logger = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        lookup_chunk_size: int = DEFAULT_LOOKUP_CHUNK_SIZE,
+        engine: Optional[Engine] = None,
+        session: Optional[Session] = None,
     ) -> None:
+        """
+        An injected engine and/or session is used as-is and left open on exit;
+        otherwise they are created on __enter__ and torn down on __exit__.
+        """
         self.logger = logger or logging.getLogger()
+        self._engine = engine or (session.get_bind() if session else None)
+        self._session = session
         if connection_str:
             self.connection_str = connection_str
+        elif self._engine is not None:
+            self.connection_str = self._engine.url.render_as_string(hide_password=False)
         elif db_path:
             self.connection_str = f"sqlite:///{db_path}"
         else:
             self.connection_str = get_db_connection_string()
         self.conn_timeout = conn_timeout
+        self.batch_size = batch_size
+        self.lookup_chunk_size = lookup_chunk_size
 
     def __enter__(self):
-        conn_args = {}
-        if self.connection_str.startswith("sqlite"):
-            conn_args["timeout"] = self.conn_timeout
-
-        self.engine = create_engine(self.connection_str, connect_args=conn_args)
-        self.session = Session(self.engine)
+        self.engine = self._engine or create_db_engine(self.connection_str, self.conn_timeout)
+        self.session = self._session or Session(self.engine)
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self.session.close()
-        self.engine.dispose()
+        if self._session is None:
+            self.session.close()
+        if self._engine is None:
+            self.engine.dispose()
+
+    def explain(self, stmt: Select) -> list[str]:
+        """Return the database's query plan for a statement, one line per row."""
+        compiled = stmt.compile(self.engine, compile_kwargs={"literal_binds": True})
+        if self.engine.dialect.name == "sqlite":
+            rows = self.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+            return [row[-1] for row in rows]
+        rows = self.session.execute(text(f"EXPLAIN {compiled}")).all()
+        return [row[0] for row in rows]
 
     def get_accounts(self) -> list[Account]:
         stmt = select(Account).order_by(Account.bank, Account.name)
@@ -88,14 +240,323 @@ class SimpleFIN_DB:
             self.session.rollback()
             raise
 
-    def get_transactions(self) -> list[Transaction]:
-        stmt = select(Transaction).order_by(Transaction.transacted_at.desc())
-        results = self.session.scalars(stmt).all()
-        return results
+    def get_sync_watermarks(self) -> dict[str, Optional[datetime]]:
+        """Newest archived `posted` per account (None for accounts without transactions)."""
+        stmt = (
+            select(Account.id, func.max(Transaction.posted))
+            .outerjoin(Transaction, Transaction.account_id == Account.id)
+            .group_by(Account.id)
+        )
+        return {acct_id: posted for acct_id, posted in self.session.execute(stmt)}
+
+    def get_account_coverage(self, since: Optional[datetime] = None) -> dict[str, tuple[datetime, Optional[str]]]:
+        """
+        {account_id: (query_date, key_id)} of the last logged query whose
+        response held each account, ignoring backfills. Only queries from
+        `since` on are read.
+        """
+        stmt = select(QueryLog.query_date, QueryLog.key_id, QueryLog.account_ids).where(
+            QueryLog.backfill.is_(False), QueryLog.account_ids.is_not(None)
+        )
+        if since:
+            stmt = stmt.where(QueryLog.query_date >= since)
+        coverage = {}
+        for query_date, key, account_ids in self.session.execute(stmt.order_by(QueryLog.query_date)):
+            for acct_id in json.loads(account_ids):
+                coverage[acct_id] = (query_date, key)
+        return coverage
+
+    def get_completed_windows(self, key_id: str) -> set[tuple[datetime, datetime]]:
+        """(window_start, window_end) of every backfill window checkpointed for key_id."""
+        stmt = select(BackfillWindow.window_start, BackfillWindow.window_end).where(
+            BackfillWindow.key_id == key_id
+        )
+        return {(start, end) for start, end in self.session.execute(stmt)}
+
+    def mark_window_complete(self, key_id: str, start: datetime, end: datetime, n_transactions: int) -> None:
+        self.session.merge(
+            BackfillWindow(
+                key_id=key_id,
+                window_start=start,
+                window_end=end,
+                completed_at=datetime.now(),
+                n_transactions=n_transactions,
+            )
+        )
+        try:
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def get_venmo_checkpoint(self, mailbox: str) -> Optional[VenmoCheckpoint]:
+        return self.session.get(VenmoCheckpoint, mailbox)
+
+    def get_processed_messages(self, mailbox: str, message_ids: list[str]) -> set[str]:
+        """
+        Which of `message_ids` are already in the Venmo ledger for `mailbox`.
+        Failed messages don't count, so they are retried.
+        """
+        processed = set()
+        stmt = select(VenmoMessage.message_id).where(
+            VenmoMessage.mailbox == mailbox,
+            VenmoMessage.outcome != VENMO_FAILED,
+            VenmoMessage.message_id.in_(bindparam("ids", expanding=True)),
+        )
+        for i in range(0, len(message_ids), self.lookup_chunk_size):
+            chunk = message_ids[i:i + self.lookup_chunk_size]
+            processed.update(self.session.scalars(stmt, {"ids": chunk}))
+        return processed
+
+    def get_failed_messages(self, mailbox: str, uid_validity: int) -> dict[int, str]:
+        """{uid: message_id} of ledger entries that failed under the current UIDVALIDITY."""
+        stmt = select(VenmoMessage.uid, VenmoMessage.message_id).where(
+            VenmoMessage.mailbox == mailbox,
+            VenmoMessage.uid_validity == uid_validity,
+            VenmoMessage.outcome == VENMO_FAILED,
+        )
+        return dict(self.session.execute(stmt).all())
+
+    def record_venmo_messages(
+        self,
+        mailbox: str,
+        uid_validity: int,
+        last_uid: int,
+        messages: list[VenmoMessage],
+        transactions: list[Transaction],
+    ) -> None:
+        """
+        Store the transactions parsed from Venmo emails, add the messages to
+        the ledger and advance the checkpoint, all in one commit: a message is
+        only ever marked processed together with its transaction.
+        """
+        try:
+            for tx in transactions:
+                self.session.merge(tx)
+            for msg in messages:
+                self.session.merge(msg)
+            self.session.merge(
+                VenmoCheckpoint(
+                    mailbox=mailbox,
+                    uid_validity=uid_validity,
+                    last_uid=last_uid,
+                    updated_at=datetime.now(),
+                )
+            )
+            if transactions:
+                self.session.flush()
+                refresh_rollups(self.session.connection(), transactions, self.lookup_chunk_size)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def acquire_job(
+        self,
+        kind: str = ARCHIVE_JOB,
+        trigger: str = "cli",
+        ttl: timedelta = DEFAULT_JOB_LOCK_TTL,
+    ) -> tuple[Job, bool]:
+        """
+        Start a job of `kind` unless one is already in flight, in this or any
+        other process. Returns (new job, True), or (in-flight job, False) so
+        concurrent triggers coalesce onto the running one. An expired lock is
+        taken over and its job marked failed.
+        """
+        for _ in range(3):
+            now = datetime.now()
+            job = Job(id=uuid.uuid4().hex, kind=kind, trigger=trigger, status=JOB_RUNNING, started_at=now)
+            lock = {"job_id": job.id, "acquired_at": now, "expires_at": now + ttl}
+            self.session.add(job)
+            try:
+                self.session.flush()
+                self.session.execute(insert(JobLock).values(kind=kind, **lock))
+                self.session.commit()
+                return job, True
+            except IntegrityError:
+                self.session.rollback()
+
+            # the lock is held; take it over if its holder stopped refreshing it
+            held = self.session.get(JobLock, kind)
+            if held is None:
+                continue  # released in the meantime
+            if held.expires_at < now:
+                stale_id = held.job_id
+                self.session.add(job)
+                self.session.flush()
+                taken = self.session.execute(
+                    update(JobLock)
+                    .where(JobLock.kind == kind, JobLock.job_id == stale_id)
+                    .values(**lock)
+                )
+                if taken.rowcount == 1:
+                    self.session.execute(
+                        update(Job)
+                        .where(Job.id == stale_id, Job.status == JOB_RUNNING)
+                        .values(status=JOB_FAILED, finished_at=now, message="Lock expired")
+                    )
+                    self.session.commit()
+                    self.logger.warning(f"Took over expired {kind} lock from job {stale_id}")
+                    return job, True
+                self.session.rollback()
+                continue
+            running = self.session.get(Job, held.job_id)
+            self.session.rollback()  # end the read transaction
+            return running, False
+        raise RuntimeError(f"Could not acquire the {kind} job lock")
+
+    def heartbeat_job(self, job_id: str, ttl: timedelta = DEFAULT_JOB_LOCK_TTL) -> None:
+        """Push back the expiry of the lock held by job_id."""
+        try:
+            self.session.execute(
+                update(JobLock).where(JobLock.job_id == job_id).values(expires_at=datetime.now() + ttl)
+            )
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def finish_job(
+        self,
+        job_id: str,
+        status: str,
+        n_accounts: Optional[int] = None,
+        n_transactions: Optional[int] = None,
+        message: Optional[str] = None,
+    ) -> None:
+        """Record the outcome of a job and release its lock."""
+        self.session.rollback()  # drop anything a failed run left pending
+        self.session.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(
+                status=status,
+                finished_at=datetime.now(),
+                n_accounts=n_accounts,
+                n_transactions=n_transactions,
+                message=message,
+            )
+        )
+        self.session.execute(delete(JobLock).where(JobLock.job_id == job_id))
+        self.session.commit()
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self.session.get(Job, job_id)
+
+    def transactions_query(
+        self,
+        account_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> Select:
+        """
+        Newest-first page of transactions, keyset-paginated on (transacted_at, id).
+        `start` is inclusive, `end` exclusive; `cursor` comes from encode_cursor.
+        """
+        stmt = select(*TRANSACTION_LIST_COLUMNS, *_account_projection()).join(Transaction.account)
+        if account_id:
+            stmt = stmt.where(Transaction.account_id == account_id)
+        if start:
+            stmt = stmt.where(Transaction.transacted_at >= start)
+        if end:
+            stmt = stmt.where(Transaction.transacted_at < end)
+        if cursor:
+            cur_ts, cur_id = decode_cursor(cursor)
+            stmt = stmt.where(
+                or_(
+                    Transaction.transacted_at < cur_ts,
+                    and_(Transaction.transacted_at == cur_ts, Transaction.id < cur_id),
+                )
+            )
+        stmt = stmt.order_by(Transaction.transacted_at.desc(), Transaction.id.desc())
+        return stmt.limit(min(limit, MAX_PAGE_SIZE))
+
+    def get_transactions(
+        self,
+        account_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> list[dict]:
+        """Projected rows (see TRANSACTION_LIST_COLUMNS) with the account nested."""
+        stmt = self.transactions_query(account_id, start, end, cursor, limit)
+        return [_nest_account(row) for row in self.session.execute(stmt)]
+
+    def search_transactions_query(
+        self,
+        q: str,
+        account_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> Select:
+        """
+        Best-first page of transactions whose description, payee or memo match
+        every word of `q` as a prefix, keyset-paginated on (rank, id). Lower
+        rank is a better match. Filters behave as in transactions_query.
+        """
+        stmt = select(
+            *TRANSACTION_LIST_COLUMNS,
+            Transaction.payee,
+            Transaction.memo,
+            *_account_projection(),
+        ).join(Transaction.account)
+        stmt, score = apply_search(stmt, self.engine.dialect.name, q)
+        stmt = stmt.add_columns(score.label("rank"))
+        if account_id:
+            stmt = stmt.where(Transaction.account_id == account_id)
+        if start:
+            stmt = stmt.where(Transaction.transacted_at >= start)
+        if end:
+            stmt = stmt.where(Transaction.transacted_at < end)
+        if cursor:
+            cur_rank, cur_id = decode_cursor(cursor, float)
+            cur_rank = literal(cur_rank, Double)
+            stmt = stmt.where(
+                or_(score > cur_rank, and_(score == cur_rank, Transaction.id > cur_id))
+            )
+        stmt = stmt.order_by(score, Transaction.id)
+        return stmt.limit(min(limit, MAX_PAGE_SIZE))
+
+    def search_transactions(
+        self,
+        q: str,
+        account_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> list[dict]:
+        """Projected matches with their rank and the account nested."""
+        stmt = self.search_transactions_query(q, account_id, start, end, cursor, limit)
+        return [_nest_account(row) for row in self.session.execute(stmt)]
+
+    def rebuild_search_index(self) -> None:
+        try:
+            rebuild_search_index(self.session.connection())
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def get_transaction(self, tx_id: str) -> Optional[Transaction]:
+        """Single transaction including its raw payloads."""
+        stmt = (
+            select(Transaction)
+            .where(Transaction.id == tx_id)
+            .options(undefer(Transaction.raw_json), undefer(Transaction.extra_attrs))
+        )
+        return self.session.scalar(stmt)
 
     def add_transaction(self, transaction: Transaction) -> Balance:
         merged_tx = self.session.merge(transaction)
         try:
+            self.session.flush()
+            refresh_rollups(self.session.connection(), [merged_tx], self.lookup_chunk_size)
             self.session.commit()
             # Refresh to load the relationship 'account' for the response schema
             self.session.refresh(merged_tx)
@@ -105,13 +566,163 @@ class SimpleFIN_DB:
             raise
 
 
-    def get_balances(self) -> list[Balance]:
-        stmt = select(Balance).order_by(Balance.balance_date.desc())
-        results = self.session.scalars(stmt).all()
-        return results
+    def balances_query(
+        self,
+        account_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> Select:
+        """
+        Newest-first page of balances, keyset-paginated on (balance_date, id).
+        `start` is inclusive, `end` exclusive; `cursor` comes from encode_cursor.
+        """
+        stmt = select(*BALANCE_LIST_COLUMNS, *_account_projection()).join(Balance.account)
+        if account_id:
+            stmt = stmt.where(Balance.account_id == account_id)
+        if start:
+            stmt = stmt.where(Balance.balance_date >= start)
+        if end:
+            stmt = stmt.where(Balance.balance_date < end)
+        if cursor:
+            cur_ts, cur_id = decode_cursor(cursor)
+            stmt = stmt.where(
+                or_(
+                    Balance.balance_date < cur_ts,
+                    and_(Balance.balance_date == cur_ts, Balance.id < cur_id),
+                )
+            )
+        stmt = stmt.order_by(Balance.balance_date.desc(), Balance.id.desc())
+        return stmt.limit(min(limit, MAX_PAGE_SIZE))
+
+    def get_balances(
+        self,
+        account_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> list[dict]:
+        """Projected rows (see BALANCE_LIST_COLUMNS) with the account nested."""
+        stmt = self.balances_query(account_id, start, end, cursor, limit)
+        return [_nest_account(row) for row in self.session.execute(stmt)]
+
+    def get_latest_balances(self) -> list[dict]:
+        """Current balance of every account, read from the latest_balance summary."""
+        stmt = (
+            select(
+                LatestBalance.balance_id,
+                LatestBalance.balance,
+                LatestBalance.available_balance,
+                LatestBalance.balance_date,
+                *_account_projection(),
+            )
+            .join(Account, Account.id == LatestBalance.account_id)
+            .order_by(Account.bank, Account.name)
+        )
+        return [_nest_account(row) for row in self.session.execute(stmt)]
+
+    def get_net_worth(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> list[dict]:
+        """
+        Net worth per currency on every day a balance changed within [start, end).
+        Each account carries its last known balance forward; balances from
+        before `start` seed the series through the (account_id, balance_date) index,
+        and the series opens with a point on `start` whenever they exist.
+        """
+        currencies = dict(self.session.execute(select(Account.id, Account.currency)).all())
+        current: dict[str, float] = {}
+        if start:
+            balance_before = (
+                select(Balance.balance)
+                .where(Balance.account_id == Account.id, Balance.balance_date < start)
+                .order_by(Balance.balance_date.desc(), Balance.id.desc())
+                .limit(1)
+                .scalar_subquery()
+            )
+            seed = select(Account.id, balance_before)
+            current.update(
+                (acct_id, amount) for acct_id, amount in self.session.execute(seed) if amount is not None
+            )
+
+        stmt = select(Balance.account_id, Balance.balance, Balance.balance_date)
+        if start:
+            stmt = stmt.where(Balance.balance_date >= start)
+        if end:
+            stmt = stmt.where(Balance.balance_date < end)
+        stmt = stmt.order_by(Balance.balance_date, Balance.id)
+
+        points: list[dict] = []
+
+        def emit(day) -> None:
+            totals: dict[str, float] = {}
+            for acct_id, amount in current.items():
+                currency = currencies.get(acct_id)
+                totals[currency] = totals.get(currency, 0.0) + amount
+            points.extend(
+                {"date": day, "currency": currency, "net_worth": round(total, 2)}
+                for currency, total in sorted(totals.items())
+            )
+
+        # seeded balances hold on `start` even when nothing changes in range
+        day = start.date() if current and (end is None or start < end) else None
+        for acct_id, amount, balance_date in self.session.execute(stmt):
+            if day is not None and balance_date.date() != day:
+                emit(day)
+            day = balance_date.date()
+            current[acct_id] = amount
+        if day is not None:
+            emit(day)
+        return points
+
+    def get_rollups(
+        self,
+        granularity: str = "month",
+        account_id: Optional[str] = None,
+        category: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> list[TransactionRollup]:
+        """Pre-aggregated totals for buckets starting in [start, end)."""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{granularity}', expected one of {GRANULARITIES}")
+        stmt = select(TransactionRollup).where(TransactionRollup.granularity == granularity)
+        if account_id:
+            stmt = stmt.where(TransactionRollup.account_id == account_id)
+        if category is not None:
+            stmt = stmt.where(TransactionRollup.category == category)
+        if start:
+            stmt = stmt.where(TransactionRollup.bucket_start >= start)
+        if end:
+            stmt = stmt.where(TransactionRollup.bucket_start < end)
+        stmt = stmt.order_by(
+            TransactionRollup.bucket_start, TransactionRollup.account_id, TransactionRollup.category
+        )
+        return self.session.scalars(stmt).all()
+
+    def rebuild_rollups(self) -> int:
+        """Recreate the rollup table from scratch; returns rows written."""
+        try:
+            n_rows = rebuild_rollups(self.session.connection(), self.logger)
+            self.session.commit()
+            return n_rows
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def get_balance(self, balance_id: str) -> Optional[Balance]:
+        """Single balance including its raw payload."""
+        stmt = select(Balance).where(Balance.id == balance_id).options(undefer(Balance.raw_json))
+        return self.session.scalar(stmt)
 
     def add_balance(self, balance: Balance) -> Balance:
         merged_balance = self.session.merge(balance)
+        # an explicit write replaces the balance even when the id already exists
+        self._update_latest_balances([balance])
         try:
             self.session.commit()
             # Refresh to load the relationship 'account' for the response schema
@@ -121,46 +732,232 @@ class SimpleFIN_DB:
             self.session.rollback()
             raise
 
-    def commit_query_result(self, query_result: QueryResult) -> None:
-        # Save query log
-        self.session.merge(query_result.querylog)
-
-        # Update accounts and overwrite existing ones
-        for acct in query_result.accounts:
-            self.session.merge(acct)
-
-        # Create a quick lookup map: { id: AccountObject }
-        acct_map = {acct.id: acct for acct in query_result.accounts}
-
-        # Save new balances only (don't want to overwrite)
-        incoming_bal_ids = [bal.id for bal in query_result.balances]
-        if incoming_bal_ids:
-            # Query the DB for which of these IDs already exist
-            stmt = select(Balance.id).where(Balance.id.in_(incoming_bal_ids))
-            existing_bal_ids = set(self.session.scalars(stmt).all())
-
-            # Add only the ones not found in the DB
-            for bal in query_result.balances:
-                if bal.id not in existing_bal_ids:
-                    bal.account = acct_map[bal.account_id]
-                    self.session.merge(bal)
-
-        # Save new transactions only (don't want to overwrite)
-        incoming_tx_ids = [tx.id for tx in query_result.transactions]
-        if incoming_tx_ids:
-            # Query the DB for which of these IDs already exist
-            stmt = select(Transaction.id).where(Transaction.id.in_(incoming_tx_ids))
-            existing_tx_ids = set(self.session.scalars(stmt).all())
-
-            # Add only the ones not found in the DB
-            for tx in query_result.transactions:
-                if tx.id not in existing_tx_ids:
-                    tx.account = acct_map[tx.account_id]
-                    self.session.merge(tx)
+    def commit_query_result(self, query_result: QueryResult, bulk: bool = True) -> None:
+        """
+        Persist a SimpleFIN query: accounts, balances and transactions are
+        inserted, or overwritten when their content_hash changed. A changed
+        transaction's previous version is kept in transaction_revision.
 
-        # Commit all changes
+        On SQLite and Postgres this runs as batched INSERT ... ON CONFLICT
+        statements; other dialects (or bulk=False) fall back to per-row merges.
+        """
         try:
+            if bulk and self.engine.dialect.name in UPSERT_DIALECTS:
+                self._bulk_commit(query_result)
+            else:
+                self._merge_commit(query_result)
             self.session.commit()
         except Exception:
             self.session.rollback()
             raise
+
+    def _insert(self, model: type):
+        """Dialect-specific INSERT construct that supports ON CONFLICT."""
+        dialect = UPSERT_DIALECTS[self.engine.dialect.name]
+        return dialect.insert(model.__table__)
+
+    def _execute_batched(self, stmt, rows: list[dict]) -> None:
+        # each batch is sent as a single executemany call
+        for i in range(0, len(rows), self.batch_size):
+            self.session.execute(stmt, rows[i:i + self.batch_size])
+
+    def _bulk_commit(self, query_result: QueryResult) -> None:
+        # Save query log
+        if query_result.querylog is not None:
+            self.session.add(query_result.querylog)
+
+        # Insert accounts and balances, overwriting existing rows only when their content changed
+        for model, items in (
+            (Account, query_result.accounts),
+            (Balance, query_result.balances),
+        ):
+            if items:
+                self._execute_batched(self._upsert_changed(model), [_as_row(item) for item in items])
+
+        # Insert new transactions and revise changed ones; unchanged rows cost only the hash lookup
+        touched: list[dict] = []
+        if query_result.transactions:
+            new, changed = self._diff_transactions([_as_row(tx) for tx in query_result.transactions])
+            if new:
+                stmt = self._insert(Transaction).on_conflict_do_nothing(index_elements=["id"])
+                self._execute_batched(stmt, new)
+            if changed:
+                touched.extend(self._revise_transactions(changed))
+            touched.extend(new + changed)
+
+        # Keep the latest-balance summary and rollups in step, in the same transaction
+        self._update_latest_balances(query_result.balances)
+        if touched:
+            self.session.flush()
+            refresh_rollups(self.session.connection(), touched, self.lookup_chunk_size)
+
+    def _upsert_changed(self, model: type):
+        """
+        INSERT ... ON CONFLICT that rewrites an existing row only when the
+        incoming content_hash differs, so re-archiving unchanged rows writes
+        nothing (no WAL or dead tuples).
+        """
+        stmt = self._insert(model)
+        new, cur = stmt.excluded, model.__table__.c
+        return stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={col.name: new[col.name] for col in model.__table__.columns if col.name != "id"},
+            where=cur.content_hash.is_distinct_from(new.content_hash),
+        )
+
+    def _update_latest_balances(self, balances: list[Balance]) -> None:
+        """
+        Fold balances into the latest_balance summary, keeping per account the
+        one with the greatest (balance_date, id). A balance whose id is already
+        the latest overwrites it when its values changed (e.g. later that day).
+        """
+        newest: dict[str, Balance] = {}
+        for bal in balances:
+            cur = newest.get(bal.account_id)
+            if cur is None or (bal.balance_date, bal.id) > (cur.balance_date, cur.id):
+                newest[bal.account_id] = bal
+        if not newest:
+            return
+        rows = [
+            {
+                "account_id": bal.account_id,
+                "balance_id": bal.id,
+                "balance": bal.balance,
+                "balance_date": bal.balance_date,
+                "available_balance": bal.available_balance,
+            }
+            for bal in newest.values()
+        ]
+
+        if self.engine.dialect.name in UPSERT_DIALECTS:
+            stmt = self._insert(LatestBalance)
+            new, cur = stmt.excluded, LatestBalance.__table__.c
+            # (balance_date, balance_id) >= the current one, skipping exact repeats
+            is_newer = or_(
+                new.balance_date > cur.balance_date,
+                and_(new.balance_date == cur.balance_date, new.balance_id > cur.balance_id),
+                and_(
+                    new.balance_id == cur.balance_id,
+                    or_(*(new[key].is_distinct_from(cur[key]) for key in LATEST_BALANCE_VALUES)),
+                ),
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["account_id"],
+                set_={key: new[key] for key in rows[0] if key != "account_id"},
+                where=is_newer,
+            )
+            self._execute_batched(stmt, rows)
+            return
+
+        for row in rows:
+            cur = self.session.get(LatestBalance, row["account_id"])
+            if cur is None:
+                self.session.add(LatestBalance(**row))
+            elif (row["balance_date"], row["balance_id"]) >= (cur.balance_date, cur.balance_id):
+                for key, value in row.items():
+                    setattr(cur, key, value)
+
+    def _existing_hashes(self, model: type, ids: list) -> dict:
+        """
+        {id: content_hash} of the rows of `model` already stored. Looked up in
+        fixed-size chunks so the IN list never exceeds the driver's parameter
+        limit and the (expanding) statement is compiled once and reused from
+        the cache.
+        """
+        existing = {}
+        stmt = select(model.id, model.content_hash).where(model.id.in_(bindparam("ids", expanding=True)))
+        for i in range(0, len(ids), self.lookup_chunk_size):
+            chunk = ids[i:i + self.lookup_chunk_size]
+            existing.update(self.session.execute(stmt, {"ids": chunk}).all())
+        return existing
+
+    def _diff_transactions(self, rows: list[dict]) -> tuple[list[dict], list[dict]]:
+        """
+        Split incoming transaction rows into (new, changed) by comparing
+        content hashes with the archive; unchanged rows are dropped. Rows
+        without a hash are only ever inserted.
+        """
+        stored = self._existing_hashes(Transaction, [row["id"] for row in rows])
+        new, changed = [], []
+        for row in rows:
+            if row["id"] not in stored:
+                new.append(row)
+            elif row.get("content_hash") is not None and stored[row["id"]] != row["content_hash"]:
+                changed.append(row)
+        return new, changed
+
+    def _revise_transactions(self, rows: list[dict]) -> list[dict]:
+        """
+        Overwrite archived transactions whose content changed with `rows`,
+        first copying each current version into transaction_revision (an
+        INSERT ... SELECT, so old payloads never leave the database). Columns
+        maintained by hand (category, tags, notes) are kept. Returns the
+        (account_id, transacted_at) of the superseded versions, whose rollup
+        buckets need refreshing too.
+        """
+        tx = Transaction.__table__
+        ids = bindparam("ids", expanding=True)
+        superseded_stmt = select(tx.c.account_id, tx.c.transacted_at).where(tx.c.id.in_(ids))
+        revision_stmt = insert(TransactionRevision.__table__).from_select(
+            ["transaction_id", "revised_at", "account_id", *REVISED_COLUMNS],
+            select(
+                tx.c.id, literal(datetime.now(), DateTime), tx.c.account_id,
+                *(tx.c[col] for col in REVISED_COLUMNS),
+            ).where(tx.c.id.in_(ids)),
+        )
+        superseded = []
+        for i in range(0, len(rows), self.lookup_chunk_size):
+            chunk = [row["id"] for row in rows[i:i + self.lookup_chunk_size]]
+            superseded.extend(row._asdict() for row in self.session.execute(superseded_stmt, {"ids": chunk}))
+            self.session.execute(revision_stmt, {"ids": chunk})
+
+        # every changed row in one executemany
+        stmt = update(tx).where(tx.c.id == bindparam("b_id")).values(
+            {col: bindparam(col) for col in REVISED_COLUMNS}
+        )
+        self._execute_batched(stmt, [
+            {"b_id": row["id"], **{col: row[col] for col in REVISED_COLUMNS}} for row in rows
+        ])
+        self.logger.info(f"Revised {len(rows)} changed transactions")
+        return superseded
+
+    def _merge_commit(self, query_result: QueryResult) -> None:
+        # Save query log
+        if query_result.querylog is not None:
+            self.session.merge(query_result.querylog)
+
+        # Save new accounts and overwrite existing ones whose content changed
+        stored_hashes = self._existing_hashes(Account, [acct.id for acct in query_result.accounts])
+        for acct in query_result.accounts:
+            if acct.id not in stored_hashes or stored_hashes[acct.id] != acct.content_hash:
+                self.session.merge(acct)
+
+        # Likewise for balances, so a balance that changed during the day is kept.
+        # Rows are linked by account_id alone: setting .account would cascade the
+        # merge and rewrite the account even when it is unchanged.
+        stored_hashes = self._existing_hashes(Balance, [bal.id for bal in query_result.balances])
+        for bal in query_result.balances:
+            if bal.id not in stored_hashes or stored_hashes[bal.id] != bal.content_hash:
+                self.session.merge(bal)
+
+        # Save new transactions and revise changed ones
+        touched: list[dict] = []
+        if query_result.transactions:
+            # plain rows only become ORM instances on this (non-bulk) path
+            transactions = [
+                Transaction(**tx) if isinstance(tx, dict) else tx for tx in query_result.transactions
+            ]
+            new, changed = self._diff_transactions([_as_row(tx) for tx in transactions])
+            new_ids = {row["id"] for row in new}
+            for tx in transactions:
+                if tx.id in new_ids:
+                    self.session.merge(tx)
+            if changed:
+                touched.extend(self._revise_transactions(changed))
+            touched.extend(new + changed)
+
+        # Keep the latest-balance summary and rollups in step, in the same transaction
+        self._update_latest_balances(query_result.balances)
+        if touched:
+            self.session.flush()
+            refresh_rollups(self.session.connection(), touched, self.lookup_chunk_size)
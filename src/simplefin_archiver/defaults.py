@@ -0,0 +1,25 @@
+# Defaults shared by the CLI options and the modules that implement them.
+# Kept free of third-party imports so the CLI can build its options without
+# loading SQLAlchemy or requests.
+
+# SimpleFIN client
+DEFAULT_DAYS_HISTORY = 14
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRIES = 3
+
+# archive runs
+DEFAULT_OVERLAP_DAYS = 3
+DEFAULT_TOKEN_WORKERS = 8
+RESULT_QUEUE_SIZE = 16  # fetched results awaiting commit, across all tokens
+
+# backfill
+DEFAULT_WINDOW_DAYS = 60
+DEFAULT_BACKFILL_WORKERS = 2
+DEFAULT_MIN_INTERVAL = 1.0
+
+# payload compression
+CODECS = ("none", "gzip", "zstd")
+DEFAULT_RECOMPRESS_BATCH = 500
+
+# export
+DEFAULT_EXPORT_BATCH_SIZE = 5000
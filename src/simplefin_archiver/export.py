@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import Connection, Select, select
+
+from .defaults import DEFAULT_EXPORT_BATCH_SIZE
+from .models import Balance, Transaction
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# (columns, date column) per exportable table; raw payloads are left out
+EXPORT_TABLES = {
+    "transactions": (
+        (
+            Transaction.id,
+            Transaction.account_id,
+            Transaction.posted,
+            Transaction.transacted_at,
+            Transaction.amount,
+            Transaction.description,
+            Transaction.payee,
+            Transaction.memo,
+            Transaction.category,
+            Transaction.tags,
+            Transaction.notes,
+        ),
+        Transaction.transacted_at,
+    ),
+    "balances": (
+        (
+            Balance.id,
+            Balance.account_id,
+            Balance.balance_date,
+            Balance.balance,
+            Balance.available_balance,
+        ),
+        Balance.balance_date,
+    ),
+}
+
+
+def validate_export(table: str, fmt: str) -> None:
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown export table '{table}', expected one of {tuple(EXPORT_TABLES)}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}', expected one of {EXPORT_FORMATS}")
+    if fmt == "parquet":
+        _pyarrow()  # fail before streaming starts
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+
+        return pyarrow
+    except ImportError:
+        raise ImportError("Parquet export requires the 'pyarrow' package")
+
+
+def export_query(
+    table: str,
+    account_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Select:
+    """Rows of `table` in (date, id) order; `start` inclusive, `end` exclusive."""
+    columns, date_col = EXPORT_TABLES[table]
+    model_id = columns[0]
+    stmt = select(*columns)
+    if account_id:
+        stmt = stmt.where(columns[1] == account_id)
+    if start:
+        stmt = stmt.where(date_col >= start)
+    if end:
+        stmt = stmt.where(date_col < end)
+    return stmt.order_by(date_col, model_id)
+
+
+def iter_row_batches(conn: Connection, stmt: Select, batch_size: int) -> Iterator[list]:
+    """
+    Fetch `stmt` batch_size rows at a time. yield_per streams from a
+    server-side cursor where the driver has one (psycopg2), so only one batch
+    is ever held in memory.
+    """
+    result = conn.execution_options(yield_per=batch_size).execute(stmt)
+    for batch in result.partitions():
+        yield batch
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _csv_chunks(keys: list[str], batches: Iterator[list]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(keys)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    # header only, when there were no rows
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(keys: list[str], batches: Iterator[list]) -> Iterator[bytes]:
+    for batch in batches:
+        lines = (json.dumps(dict(zip(keys, row)), default=_json_default) for row in batch)
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _parquet_chunks(columns: tuple, batches: Iterator[list]) -> Iterator[bytes]:
+    pa = _pyarrow()
+    arrow_types = {datetime: pa.timestamp("us"), float: pa.float64(), str: pa.string()}
+    schema = pa.schema([(col.key, arrow_types[col.type.python_type]) for col in columns])
+
+    sink = _ChunkSink()
+    # one row group per batch, flushed to the client as soon as it is written
+    with pa.parquet.ParquetWriter(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(pa.RecordBatch.from_pylist([row._asdict() for row in batch], schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_export(
+    conn: Connection,
+    table: str,
+    fmt: str,
+    account_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = DEFAULT_EXPORT_BATCH_SIZE,
+) -> Iterator[bytes]:
+    """Encoded chunks of `table` in `fmt`, one per fetched batch of rows."""
+    validate_export(table, fmt)
+    columns = EXPORT_TABLES[table][0]
+    batches = iter_row_batches(conn, export_query(table, account_id, start, end), batch_size)
+    if fmt == "csv":
+        return _csv_chunks([col.key for col in columns], batches)
+    if fmt == "ndjson":
+        return _ndjson_chunks([col.key for col in columns], batches)
+    return _parquet_chunks(columns, batches)
@@ -1,19 +1,106 @@
+import hashlib
 import logging
 from datetime import datetime
 from typing import Optional, NamedTuple
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
+from .compression import CompressedText
+
 reg = registry()
 
+
+def content_hash(*values) -> str:
+    """Digest of a row's column values, stored so unchanged rows can skip their write."""
+    digest = hashlib.sha256()
+    for value in values:
+        digest.update(repr(value).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
 @reg.mapped_as_dataclass
 class QueryLog:
     __tablename__ = "query_log"
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, init=False)
     query_date: Mapped[datetime]
     days_history: Mapped[int]
-    raw_response: Mapped[str] = mapped_column(repr=False)
+    raw_response: Mapped[str] = mapped_column(CompressedText, repr=False, deferred=True)
+    # backfill queries cover old windows, so they don't mark the archive as current
+    backfill: Mapped[bool] = mapped_column(default=False)
+    # token that ran the query (see archiver.key_id) and the accounts its
+    # response held (a JSON list); each account is current up to the last
+    # query that returned it
+    key_id: Mapped[Optional[str]] = mapped_column(default=None)
+    account_ids: Mapped[Optional[str]] = mapped_column(default=None, repr=False)
+
+
+@reg.mapped_as_dataclass
+class BackfillWindow:
+    """Checkpoint for one completed window of a historical backfill."""
+    __tablename__ = "backfill_window"
+    key_id: Mapped[str] = mapped_column(primary_key=True)  # see archiver.key_id
+    window_start: Mapped[datetime] = mapped_column(primary_key=True)
+    window_end: Mapped[datetime] = mapped_column(primary_key=True)
+    completed_at: Mapped[datetime]
+    n_transactions: Mapped[int]
+
+
+@reg.mapped_as_dataclass
+class VenmoCheckpoint:
+    """
+    Highest IMAP UID the Venmo importer has processed in a mailbox folder.
+    UIDs are only comparable while the folder's UIDVALIDITY is unchanged.
+    """
+    __tablename__ = "venmo_checkpoint"
+    mailbox: Mapped[str] = mapped_column(primary_key=True)  # address/folder
+    uid_validity: Mapped[int]
+    last_uid: Mapped[int]
+    updated_at: Mapped[datetime]
+
+
+@reg.mapped_as_dataclass
+class VenmoMessage:
+    """Ledger of Venmo emails already processed, keyed by Message-ID."""
+    __tablename__ = "venmo_message"
+    mailbox: Mapped[str] = mapped_column(primary_key=True)
+    message_id: Mapped[str] = mapped_column(primary_key=True)
+    uid_validity: Mapped[int]
+    uid: Mapped[int]
+    subject: Mapped[str]
+    outcome: Mapped[str]  # transaction, ignored or failed
+    processed_at: Mapped[datetime]
+    transaction_id: Mapped[Optional[str]] = mapped_column(default=None)
+    error: Mapped[Optional[str]] = mapped_column(default=None)
+
+
+@reg.mapped_as_dataclass
+class Job:
+    """One archive run, whether triggered from the API, cron, the CLI or a backfill."""
+    __tablename__ = "job"
+    id: Mapped[str] = mapped_column(primary_key=True)
+    kind: Mapped[str]
+    trigger: Mapped[str]  # api, cron, cli or backfill
+    status: Mapped[str]  # running, succeeded or failed
+    started_at: Mapped[datetime]
+    finished_at: Mapped[Optional[datetime]] = mapped_column(default=None)
+    n_accounts: Mapped[Optional[int]] = mapped_column(default=None)
+    n_transactions: Mapped[Optional[int]] = mapped_column(default=None)
+    message: Mapped[Optional[str]] = mapped_column(default=None)
+
+
+@reg.mapped_as_dataclass
+class JobLock:
+    """
+    Held by the one in-flight job of a kind; the primary key makes acquiring it
+    atomic across processes. A lock past expires_at belongs to a dead run.
+    """
+    __tablename__ = "job_lock"
+    kind: Mapped[str] = mapped_column(primary_key=True)
+    job_id: Mapped[str] = mapped_column(ForeignKey("job.id"))
+    acquired_at: Mapped[datetime]
+    expires_at: Mapped[datetime]
 
 
 @reg.mapped_as_dataclass
@@ -23,17 +110,23 @@ class Account:
     bank: Mapped[str]
     name: Mapped[str]
     currency: Mapped[str]
-    raw_json: Mapped[str] = mapped_column(repr=False)
+    raw_json: Mapped[str] = mapped_column(CompressedText, repr=False, deferred=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(default=None, repr=False)
 
 @reg.mapped_as_dataclass
 class Balance:
     __tablename__ = "balance"
+    __table_args__ = (
+        Index("ix_balance_account_id_balance_date", "account_id", "balance_date", "id"),
+        Index("ix_balance_balance_date_id", "balance_date", "id"),
+    )
     id: Mapped[str] = mapped_column(primary_key=True)
     account_id: Mapped[str] = mapped_column(ForeignKey("account.id"))
     balance: Mapped[float]
     balance_date: Mapped[datetime]
-    raw_json: Mapped[str] = mapped_column(repr=False)
+    raw_json: Mapped[str] = mapped_column(CompressedText, repr=False, deferred=True)
     available_balance: Mapped[Optional[float]] = mapped_column(default=None)
+    content_hash: Mapped[Optional[str]] = mapped_column(default=None, repr=False)
     account: Mapped["Account"] = relationship(
         default=None,
         init=False,
@@ -46,22 +139,43 @@ class Balance:
             self.available_balance = self.balance
 
 
+@reg.mapped_as_dataclass
+class LatestBalance:
+    """Newest balance per account, maintained alongside every balance write."""
+    __tablename__ = "latest_balance"
+    account_id: Mapped[str] = mapped_column(ForeignKey("account.id"), primary_key=True)
+    balance_id: Mapped[str]
+    balance: Mapped[float]
+    balance_date: Mapped[datetime]
+    available_balance: Mapped[Optional[float]] = mapped_column(default=None)
+
+
 @reg.mapped_as_dataclass
 class Transaction:
     __tablename__ = "transaction"
+    __table_args__ = (
+        Index("ix_transaction_account_id_transacted_at", "account_id", "transacted_at", "id"),
+        Index("ix_transaction_transacted_at_id", "transacted_at", "id"),
+        Index("ix_transaction_account_id_posted", "account_id", "posted"),
+        # covers the (id, content_hash) lookup that diffs each ingest against the archive
+        Index("ix_transaction_id_content_hash", "id", "content_hash"),
+    )
     id: Mapped[str] = mapped_column(primary_key=True)
     account_id: Mapped[str] = mapped_column(ForeignKey("account.id"))
     posted: Mapped[datetime]
     amount: Mapped[float]
     description: Mapped[str]
-    raw_json: Mapped[str] = mapped_column(repr=False)
+    raw_json: Mapped[str] = mapped_column(CompressedText, repr=False, deferred=True)
     payee: Mapped[Optional[str]] = mapped_column(default=None)
     memo: Mapped[Optional[str]] = mapped_column(default=None)
     category: Mapped[Optional[str]] = mapped_column(default=None)
     tags: Mapped[Optional[str]] = mapped_column(default=None)
     notes: Mapped[Optional[str]] = mapped_column(default=None)
-    transacted_at: Mapped[Optional[datetime]] = mapped_column(default=None)
-    extra_attrs: Mapped[Optional[str]] = mapped_column(default="")
+    # optional here only so __post_init__ can fill it from posted; NOT NULL in
+    # the schema, so the list endpoints' keyset cursor always has a value
+    transacted_at: Mapped[Optional[datetime]] = mapped_column(default=None, nullable=False)
+    extra_attrs: Mapped[Optional[str]] = mapped_column(default="", deferred=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(default=None, repr=False)
     account: Mapped["Account"] = relationship(
         default=None,
         init=False,
@@ -73,8 +187,49 @@ class Transaction:
             logging.debug(f"Auto-filling transacted_at for transaction {self.id}")
             self.transacted_at = self.posted
 
+
+@reg.mapped_as_dataclass
+class TransactionRevision:
+    """
+    Append-only history of transactions: one row per superseded version,
+    written when SimpleFIN reports an archived transaction with new content
+    (e.g. a pending charge that settled for a different amount).
+    """
+    __tablename__ = "transaction_revision"
+    __table_args__ = (
+        Index("ix_transaction_revision_transaction_id_id", "transaction_id", "id"),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, init=False)
+    transaction_id: Mapped[str] = mapped_column(ForeignKey("transaction.id"))
+    revised_at: Mapped[datetime]
+    account_id: Mapped[str]
+    posted: Mapped[datetime]
+    amount: Mapped[float]
+    description: Mapped[str]
+    raw_json: Mapped[str] = mapped_column(CompressedText, repr=False, deferred=True)
+    payee: Mapped[Optional[str]] = mapped_column(default=None)
+    memo: Mapped[Optional[str]] = mapped_column(default=None)
+    # optional here only so __post_init__ can fill it from posted; NOT NULL in
+    # the schema, so the list endpoints' keyset cursor always has a value
+    transacted_at: Mapped[Optional[datetime]] = mapped_column(default=None, nullable=False)
+    extra_attrs: Mapped[Optional[str]] = mapped_column(default="", deferred=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(default=None, repr=False)
+
+
+@reg.mapped_as_dataclass
+class TransactionRollup:
+    """Transaction totals per time bucket, account and category (see rollups.py)."""
+    __tablename__ = "transaction_rollup"
+    granularity: Mapped[str] = mapped_column(primary_key=True)  # day, week or month
+    bucket_start: Mapped[datetime] = mapped_column(primary_key=True)
+    account_id: Mapped[str] = mapped_column(ForeignKey("account.id"), primary_key=True)
+    category: Mapped[str] = mapped_column(primary_key=True)  # '' when uncategorized
+    total: Mapped[float]
+    tx_count: Mapped[int]
+
+
 class QueryResult(NamedTuple):
     accounts: list[Account]
     balances: list[Balance]
-    transactions: list[Transaction]
-    querylog: QueryLog
+    transactions: list[Transaction] | list[dict]  # column dicts from SimpleFIN(as_rows=True)
+    querylog: Optional[QueryLog]  # None for partial results from SimpleFIN.stream_accounts
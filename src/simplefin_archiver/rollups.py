@@ -0,0 +1,140 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import Connection, bindparam, delete, insert, select
+
+from .models import Transaction, TransactionRollup
+
+GRANULARITIES = ("day", "week", "month")
+NO_CATEGORY = ""  # rollup key for transactions without a category
+REBUILD_BATCH_SIZE = 1000
+LOOKUP_CHUNK_SIZE = 500  # bucket starts per IN list when clearing stale rollups
+
+_tx = Transaction.__table__
+_rollup = TransactionRollup.__table__
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    """Start of the day, ISO week (Monday) or month containing ts."""
+    day = datetime(ts.year, ts.month, ts.day)
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity '{granularity}', expected one of {GRANULARITIES}")
+
+
+def bucket_end(start: datetime, granularity: str) -> datetime:
+    """Exclusive end of the bucket beginning at start."""
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return (start + timedelta(days=32)).replace(day=1)
+    raise ValueError(f"Unknown granularity '{granularity}', expected one of {GRANULARITIES}")
+
+
+def _accumulate(totals: dict, row, granularity: str) -> None:
+    account_id, transacted_at, category, amount = row
+    key = (granularity, bucket_start(transacted_at, granularity), account_id, category or NO_CATEGORY)
+    total = totals.setdefault(key, [0.0, 0])
+    total[0] += amount
+    total[1] += 1
+
+
+def _as_rows(totals: dict) -> list[dict]:
+    return [
+        {
+            "granularity": granularity,
+            "bucket_start": start,
+            "account_id": account_id,
+            "category": category,
+            "total": round(total, 2),
+            "tx_count": count,
+        }
+        for (granularity, start, account_id, category), (total, count) in totals.items()
+    ]
+
+
+def refresh_rollups(
+    conn: Connection,
+    transactions: Iterable[Transaction | dict],
+    chunk_size: int = LOOKUP_CHUNK_SIZE,
+) -> int:
+    """
+    Recompute only the buckets touched by `transactions` from the transaction
+    table. Recomputing (rather than adding) keeps this idempotent when the same
+    transactions are ingested again. Stale rollup rows are cleared `chunk_size`
+    buckets at a time, so a long backfill never exceeds the driver's parameter
+    limit. Returns the number of rollup rows written.
+    """
+    # {account_id: {granularity: {bucket_start, ...}}}
+    affected: dict[str, dict[str, set[datetime]]] = {}
+    for tx in transactions:
+        if isinstance(tx, dict):
+            account_id, transacted_at = tx["account_id"], tx["transacted_at"]
+        else:
+            account_id, transacted_at = tx.account_id, tx.transacted_at
+        per_gran = affected.setdefault(account_id, {g: set() for g in GRANULARITIES})
+        for granularity in GRANULARITIES:
+            per_gran[granularity].add(bucket_start(transacted_at, granularity))
+
+    stale = delete(_rollup).where(
+        _rollup.c.granularity == bindparam("granularity"),
+        _rollup.c.account_id == bindparam("account_id"),
+        _rollup.c.bucket_start.in_(bindparam("starts", expanding=True)),
+    )
+    rows: list[dict] = []
+    for account_id, per_gran in affected.items():
+        # one scan per account covering every affected bucket
+        lo = min(min(buckets) for buckets in per_gran.values())
+        hi = max(bucket_end(max(buckets), g) for g, buckets in per_gran.items())
+        stmt = select(_tx.c.account_id, _tx.c.transacted_at, _tx.c.category, _tx.c.amount).where(
+            _tx.c.account_id == account_id,
+            _tx.c.transacted_at >= lo,
+            _tx.c.transacted_at < hi,
+        )
+        totals: dict = {}
+        for row in conn.execute(stmt):
+            for granularity in GRANULARITIES:
+                _accumulate(totals, row, granularity)
+
+        for granularity, buckets in per_gran.items():
+            starts = sorted(buckets)
+            for i in range(0, len(starts), chunk_size):
+                conn.execute(stale, {
+                    "granularity": granularity,
+                    "account_id": account_id,
+                    "starts": starts[i:i + chunk_size],
+                })
+        rows.extend(row for row in _as_rows(totals) if row["bucket_start"] in per_gran[row["granularity"]])
+
+    if rows:
+        conn.execute(insert(_rollup), rows)
+    return len(rows)
+
+
+def rebuild_rollups(conn: Connection, logger: logging.Logger = None) -> int:
+    """Recreate the whole rollup table from a streamed pass over every transaction."""
+    if not logger:
+        logger = logging.getLogger()
+    conn.execute(delete(_rollup))
+
+    totals: dict = {}
+    stmt = select(_tx.c.account_id, _tx.c.transacted_at, _tx.c.category, _tx.c.amount)
+    result = conn.execution_options(yield_per=REBUILD_BATCH_SIZE).execute(stmt)
+    n_tx = 0
+    for row in result:
+        n_tx += 1
+        for granularity in GRANULARITIES:
+            _accumulate(totals, row, granularity)
+
+    rows = _as_rows(totals)
+    for i in range(0, len(rows), REBUILD_BATCH_SIZE):
+        conn.execute(insert(_rollup), rows[i:i + REBUILD_BATCH_SIZE])
+    logger.info(f"Rebuilt {len(rows)} rollup rows from {n_tx} transactions")
+    return len(rows)
@@ -0,0 +1,175 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+# (low, high) of the minute, hour, day-of-month, month and day-of-week fields
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+CRON_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+MONTH_NAMES = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+DAY_NAMES = ("sun", "mon", "tue", "wed", "thu", "fri", "sat")
+# no valid expression needs more than a leap-year cycle to fire
+MAX_SEARCH_DAYS = 366 * 8
+
+
+def _parse_value(value: str, field: int) -> int:
+    names = {3: MONTH_NAMES, 4: DAY_NAMES}.get(field)
+    if names and value.lower() in names:
+        return names.index(value.lower()) + (1 if field == 3 else 0)
+    return int(value)
+
+
+def _parse_field(spec: str, field: int) -> set[int]:
+    low, high = CRON_FIELDS[field]
+    if field == 4:
+        high = 7  # 0 and 7 are both Sunday
+    values = set()
+    for part in spec.split(","):
+        rng, _, step = part.partition("/")
+        if rng == "*":
+            start, end = low, high
+        elif "-" in rng:
+            start, end = (_parse_value(v, field) for v in rng.split("-", 1))
+        else:
+            start = end = _parse_value(rng, field)
+            if step:
+                end = high  # "5/15" means every 15 starting at 5
+        n_step = int(step) if step else 1
+        if not (low <= start <= end <= high) or n_step < 1:
+            raise ValueError(f"Invalid cron field '{spec}'")
+        values.update(range(start, end + 1, n_step))
+    if field == 4:
+        values = {v % 7 for v in values}
+    return values
+
+
+class CronSchedule:
+    """
+    Standard five-field cron expression (minute hour day-of-month month
+    day-of-week) with ranges, steps, lists, month/day names and the @daily
+    style aliases. As in cron, when both day fields are restricted a day
+    matching either one fires.
+    """
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        fields = CRON_ALIASES.get(expr.strip().lower(), expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(fields)}: '{expr}'")
+        try:
+            parsed = [_parse_field(spec, i) for i, spec in enumerate(fields)]
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression '{expr}': {e}") from e
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (sorted(p) for p in parsed)
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, day: datetime) -> bool:
+        dom = day.day in self.days
+        dow = (day.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, after: datetime) -> datetime:
+        """First time strictly after `after` that the schedule fires."""
+        start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(MAX_SEARCH_DAYS):
+            if day.month in self.months and self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression '{self.expr}' never fires")
+
+
+class Scheduler:
+    """
+    Runs `job` on a cron schedule in a background thread of the current
+    process. A tick that arrives while the previous run is still going is
+    skipped rather than queued.
+    """
+
+    def __init__(
+        self,
+        schedule: CronSchedule,
+        job: Callable[[], object],
+        logger: logging.Logger = None,
+    ):
+        self.schedule = schedule
+        self.job = job
+        self.logger = logger or logging.getLogger()
+        self.next_run: Optional[datetime] = None
+        self.last_run: Optional[datetime] = None
+        self.last_finished: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._run_thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._run_thread is not None and self._run_thread.is_alive()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Scheduler started with '{self.schedule.expr}'")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop scheduling; a run in progress is left to finish (up to timeout)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._run_thread is not None:
+            self._run_thread.join(timeout)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.next_run = self.schedule.next_after(datetime.now())
+            # wake up early if stopped; re-check the clock after each wait
+            while not self._stop.is_set():
+                remaining = (self.next_run - datetime.now()).total_seconds()
+                if remaining <= 0:
+                    break
+                self._stop.wait(min(remaining, 60))
+            if self._stop.is_set():
+                break
+            if self.running:
+                self.logger.warning(f"Previous run started {self.last_run} still going; skipping tick")
+                continue
+            self.last_run = datetime.now()
+            self._run_thread = threading.Thread(target=self._run, name="scheduled-run", daemon=True)
+            self._run_thread.start()
+
+    def _run(self) -> None:
+        try:
+            self.job()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e) or type(e).__name__
+            self.logger.error(f"Scheduled run failed: {self.last_error}")
+        finally:
+            self.last_finished = datetime.now()
+
+    def status(self) -> dict:
+        return {
+            "schedule": self.schedule.expr,
+            "running": self.running,
+            "next_run": self.next_run,
+            "last_run": self.last_run,
+            "last_finished": self.last_finished,
+            "last_error": self.last_error,
+        }
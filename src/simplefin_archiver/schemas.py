@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
 
@@ -32,6 +32,24 @@ class TransactionSchema(TransactionBasicSchema):
     account: AccountSchema
 
 
+# Full-text search hit; lower rank is a better match
+class TransactionSearchSchema(TransactionSchema):
+    payee: Optional[str]
+    memo: Optional[str]
+    rank: float
+
+
+# Transaction including the raw payloads, for the detail endpoint
+class TransactionDetailSchema(TransactionSchema):
+    payee: Optional[str]
+    memo: Optional[str]
+    category: Optional[str]
+    tags: Optional[str]
+    notes: Optional[str]
+    raw_json: str
+    extra_attrs: Optional[str]
+
+
 # --- BALANCE ---
 # Base balance fields
 class BalanceBasicSchema(BaseSchema):
@@ -45,6 +63,38 @@ class BalanceSchema(BalanceBasicSchema):
     account: AccountSchema
 
 
+# Current balance of one account, from the latest_balance summary
+class LatestBalanceSchema(BaseSchema):
+    balance_id: str
+    balance: float
+    available_balance: Optional[float]
+    balance_date: datetime
+    account: AccountSchema
+
+
+# Net worth in one currency on one day
+class NetWorthPointSchema(BaseSchema):
+    date: date
+    currency: str
+    net_worth: float
+
+
+# --- REPORTS ---
+class RollupSchema(BaseSchema):
+    granularity: str
+    bucket_start: datetime
+    account_id: str
+    category: str
+    total: float
+    tx_count: int
+
+
+# Balance including the raw payload, for the detail endpoint
+class BalanceDetailSchema(BalanceSchema):
+    available_balance: Optional[float]
+    raw_json: str
+
+
 class BalanceCreateSchema(BaseSchema):
     id: str
     account_id: str
@@ -57,4 +107,34 @@ class BalanceCreateSchema(BaseSchema):
 class QueryLogSchema(BaseSchema):
     id: str
     query_time: datetime
-    days_history: int
\ No newline at end of file
+    days_history: int
+
+
+# --- JOBS ---
+class JobSchema(BaseSchema):
+    id: str
+    kind: str
+    trigger: str
+    status: str
+    started_at: datetime
+    finished_at: Optional[datetime]
+    n_accounts: Optional[int]
+    n_transactions: Optional[int]
+    message: Optional[str]
+
+
+# Response to a trigger; coalesced when it joined a run already in flight
+class JobTriggerSchema(BaseSchema):
+    job: JobSchema
+    coalesced: bool
+
+
+# In-process scheduler state; only "enabled" is set when it is off
+class SchedulerSchema(BaseSchema):
+    enabled: bool
+    schedule: Optional[str] = None
+    running: bool = False
+    next_run: Optional[datetime] = None
+    last_run: Optional[datetime] = None
+    last_finished: Optional[datetime] = None
+    last_error: Optional[str] = None
@@ -0,0 +1,121 @@
+import logging
+import re
+
+from sqlalchemy import Connection, Double, Select, bindparam, cast, column, func, literal_column, table, text
+from sqlalchemy.sql.elements import ColumnElement
+
+SEARCH_TABLE = "transaction_fts"
+# stable FTS5 rowid per transaction id (the FTS table can't be indexed on id)
+DOCID_TABLE = "transaction_fts_docid"
+SEARCH_COLUMNS = ("description", "payee", "memo")
+
+# Postgres indexes this expression directly (no extra column); queries must
+# repeat it verbatim so the planner can use the GIN index
+PG_DOCUMENT = (
+    "to_tsvector('simple', "
+    + " || ' ' || ".join(f'coalesce("transaction".{col}, \'\')' for col in SEARCH_COLUMNS)
+    + ")"
+)
+PG_INDEX = "ix_transaction_search"
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def create_search_index(conn: Connection) -> None:
+    """
+    The index as revision 9c4d7a1e3f20 creates it, which calls this; keep it
+    building that layout. SQLite gets an FTS5 table over the transaction
+    rowids, kept in step by triggers (b5e8c3f1a027 re-keys it on docids);
+    Postgres gets a GIN index on PG_DOCUMENT. Other databases get no index,
+    and searching them fails with NotImplementedError.
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        cols = ", ".join(SEARCH_COLUMNS)
+        new = ", ".join(f"new.{col}" for col in SEARCH_COLUMNS)
+        old = ", ".join(f"old.{col}" for col in SEARCH_COLUMNS)
+        delete_old = (
+            f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, {cols}) "
+            f"VALUES ('delete', old.rowid, {old});"
+        )
+        insert_new = f"INSERT INTO {SEARCH_TABLE} (rowid, {cols}) VALUES (new.rowid, {new});"
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            f"{cols}, content='transaction', content_rowid='rowid', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(f'CREATE TRIGGER {SEARCH_TABLE}_ai AFTER INSERT ON "transaction" BEGIN {insert_new} END'))
+        conn.execute(text(f'CREATE TRIGGER {SEARCH_TABLE}_ad AFTER DELETE ON "transaction" BEGIN {delete_old} END'))
+        conn.execute(text(
+            f'CREATE TRIGGER {SEARCH_TABLE}_au AFTER UPDATE OF {cols} ON "transaction" '
+            f"BEGIN {delete_old} {insert_new} END"
+        ))
+        conn.execute(text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('rebuild')"))
+    elif dialect == "postgresql":
+        conn.execute(text(f'CREATE INDEX {PG_INDEX} ON "transaction" USING gin ({PG_DOCUMENT})'))
+    else:
+        logging.warning(f"Full-text search is not supported on {dialect}; not creating the search index")
+
+
+def drop_search_index(conn: Connection) -> None:
+    """Inverse of create_search_index, for downgrading 9c4d7a1e3f20."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{suffix}"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+    elif dialect == "postgresql":
+        conn.execute(text(f"DROP INDEX IF EXISTS {PG_INDEX}"))
+
+
+def rebuild_search_index(conn: Connection) -> None:
+    """
+    Re-read every transaction into the FTS5 table (created, with the triggers
+    that keep it current, by the migrations). No-op on Postgres, whose index
+    is always consistent.
+    """
+    if conn.dialect.name == "sqlite":
+        cols = ", ".join(SEARCH_COLUMNS)
+        conn.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+        conn.execute(text(f"DELETE FROM {DOCID_TABLE}"))
+        conn.execute(text(f'INSERT INTO {DOCID_TABLE} (id) SELECT id FROM "transaction"'))
+        conn.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, id, {cols}) "
+            f"SELECT d.docid, t.id, {', '.join(f't.{col}' for col in SEARCH_COLUMNS)} "
+            f'FROM "transaction" t JOIN {DOCID_TABLE} d ON d.id = t.id'
+        ))
+
+
+def parse_terms(q: str) -> list[str]:
+    """Words of a search string; each is matched as a prefix."""
+    terms = [term.lower() for term in _TERM.findall(q)]
+    if not terms:
+        raise ValueError(f"Search query has no searchable terms: '{q}'")
+    return terms
+
+
+def apply_search(stmt: Select, dialect: str, q: str) -> tuple[Select, ColumnElement]:
+    """
+    Restrict a select over Transaction to rows matching every term of `q` as a
+    prefix. Returns the statement and a score where lower is a better match.
+    """
+    terms = parse_terms(q)
+    if dialect == "sqlite":
+        fts = table(SEARCH_TABLE, column("id"))
+        stmt = stmt.join(fts, fts.c.id == literal_column('"transaction".id')).where(
+            literal_column(SEARCH_TABLE).op("MATCH")(" ".join(f'"{term}"*' for term in terms))
+        )
+        # bm25() is already lower-is-better
+        return stmt, literal_column(f"bm25({SEARCH_TABLE})")
+    if dialect == "postgresql":
+        document = literal_column(PG_DOCUMENT)
+        query = func.to_tsquery(
+            literal_column("'simple'"),
+            bindparam("search_terms", " & ".join(f"{term}:*" for term in terms)),
+        )
+        stmt = stmt.where(document.op("@@")(query))
+        # ts_rank is float4, which doesn't survive the round trip through a
+        # cursor; as float8 it compares exactly against the decoded value
+        return stmt, -cast(func.ts_rank(document, query), Double)
+    raise NotImplementedError(f"Full-text search is not supported on {dialect}")
+
@@ -1,14 +1,27 @@
+import codecs
 import json
 import logging
+import re
+import random
+import threading
+import time
 from datetime import datetime, timedelta
+from typing import IO, Iterator, NamedTuple, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from .models import Account, Balance, QueryLog, Transaction
+from .compression import CompressingSink, get_codec
+from .defaults import DEFAULT_DAYS_HISTORY, DEFAULT_RETRIES, DEFAULT_TIMEOUT  # noqa: F401
+from .models import Account, Balance, QueryLog, Transaction, content_hash
 from .models import QueryResult
 
-DEFAULT_DAYS_HISTORY = 14
-DEFAULT_TIMEOUT = 30
+DEFAULT_BACKOFF = 1.0  # seconds; doubled per attempt, capped at MAX_BACKOFF
+MAX_BACKOFF = 30.0
+DEFAULT_POOL_SIZE = 4
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_SPOOL_SIZE = 8 * 1024 * 1024  # raw response spills to disk past this
 
 ACCT_DUMP_EXLUDES = {  # keys to exclude from raw_json dump
     "balance",
@@ -26,6 +39,150 @@ BALANCE_DUMP_EXLUDES = {  # keys to exclude from raw_json dump
     "holdings",
 }
 
+# transaction keys with their own column; the rest go to extra_attrs
+TX_KNOWN_KEYS = {"id", "amount", "description", "posted", "transacted_at", "payee", "memo"}
+
+# json.dumps with default options, minus the per-call keyword dispatch; it
+# runs twice per transaction
+_json_encode = json.JSONEncoder().encode
+
+_JSON_WS = re.compile(r"\s*")
+_JSON_DECODER = json.JSONDecoder()
+
+
+class JSONArrayStream:
+    """
+    Incrementally walks a top-level JSON object read from an iterator of text
+    chunks, yielding the elements of one of its array members one at a time.
+    Other members are decoded and discarded. Only a single element (plus the
+    unread part of the current chunk) is held in memory at once.
+    """
+
+    def __init__(self, chunks: Iterator[str]):
+        self._chunks = chunks
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, min_size: int = 0) -> bool:
+        """Append chunks until the unread buffer is at least min_size long."""
+        self._buf = self._buf[self._pos:]
+        self._pos = 0
+        read_any = False
+        while not self._eof:
+            try:
+                self._buf += next(self._chunks)
+                read_any = True
+            except StopIteration:
+                self._eof = True
+                break
+            if len(self._buf) >= min_size:
+                break
+        return read_any
+
+    def _peek(self) -> str:
+        while True:
+            self._pos = _JSON_WS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in JSON stream, found '{found}'")
+        self._pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(self._buf, self._pos)
+                # a bare number at the buffer edge may continue in the next chunk
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # double the buffer before retrying so large values decode in O(n)
+            self._fill(min_size=2 * (len(self._buf) - self._pos))
+
+    def iter_array(self, key: str) -> Iterator:
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            name = self._value()
+            self._expect(":")
+            if name == key:
+                self._expect("[")
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        sep = self._peek()
+                        self._pos += 1
+                        if sep == "]":
+                            break
+                        if sep != ",":
+                            raise ValueError(f"Expected ',' or ']' in JSON stream, found '{sep}'")
+            else:
+                self._value()
+            sep = self._peek()
+            self._pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise ValueError(f"Expected ',' or '}}' in JSON stream, found '{sep}'")
+
+
+def _tee_text(byte_chunks: Iterator[bytes], sink: IO[bytes] | CompressingSink) -> Iterator[str]:
+    """Copy raw byte chunks to sink while yielding them as decoded text."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in byte_chunks:
+        sink.write(chunk)
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+class RateLimiter:
+    """Spaces out calls to wait() by at least `min_interval` seconds, across threads."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RequestAttempt(NamedTuple):
+    attempt: int
+    status: Optional[int]  # None when the request raised before a response
+    error: Optional[str]
+    ttfb: float  # seconds until response headers arrived (bridge + network)
+    total: float  # seconds including the body, unless streamed
+
+
+def build_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Keep-alive session with a connection pool sized for concurrent requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
+
+
 class SimpleFIN:
     __API_URL: str
     __api_user: str
@@ -33,6 +190,11 @@ class SimpleFIN:
     _timeout: int
     debug: bool
     logger: logging.Logger
+    session: requests.Session
+    retries: int
+    backoff: float
+    as_rows: bool
+    attempts: list[RequestAttempt]
 
     def __init__(
         self,
@@ -40,31 +202,121 @@ class SimpleFIN:
         debug: bool = False,
         timeout: int = DEFAULT_TIMEOUT,
         logger: logging.Logger = None,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        session: Optional[requests.Session] = None,
+        as_rows: bool = False,
     ):
         self.__API_URL = "https://beta-bridge.simplefin.org/simplefin"
         self.__api_user = api_token.split(":")[0]
         self.__api_passwd = api_token.split(":")[1]
         self.debug = debug
         self._timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        # an injected session is shared, so credentials go on each request
+        self.session = session or build_session(pool_size)
+        # emit transactions as plain column dicts for Core bulk inserts
+        self.as_rows = as_rows
+        self.attempts = []
 
         self.logger = logger or logging.getLogger()
 
-    def query_accounts(self, days_history: int = 7) -> QueryResult:
-        start_date = datetime.now() - timedelta(days=days_history)
+    def _get(self, url: str, params: dict, stream: bool = False) -> requests.Response:
+        """
+        GET with jittered exponential backoff on connection errors, timeouts
+        and retryable statuses. Every attempt is logged and kept in
+        self.attempts with its time-to-first-byte and total latency.
+        """
+        for attempt in range(1, self.retries + 2):
+            started = time.monotonic()
+            resp, error = None, None
+            try:
+                resp = self.session.get(
+                    url=url,
+                    auth=(self.__api_user, self.__api_passwd),
+                    params=params,
+                    timeout=self._timeout,
+                    stream=stream,
+                )
+            except (requests.ConnectionError, requests.Timeout) as ex:
+                error = ex
+            total = time.monotonic() - started
+            ttfb = resp.elapsed.total_seconds() if resp is not None else total
+            record = RequestAttempt(
+                attempt=attempt,
+                status=resp.status_code if resp is not None else None,
+                error=repr(error) if error else None,
+                ttfb=ttfb,
+                total=total,
+            )
+            self.attempts.append(record)
+            self.logger.info(
+                f"Attempt {attempt}: {record.status or record.error} "
+                f"(first byte {ttfb:.2f}s, total {total:.2f}s)"
+            )
+
+            retryable = error is not None or resp.status_code in RETRY_STATUSES
+            if not retryable or attempt > self.retries:
+                if error is not None:
+                    raise error
+                return resp
+
+            delay = random.uniform(0, min(MAX_BACKOFF, self.backoff * 2 ** (attempt - 1)))
+            retry_after = resp.headers.get("Retry-After") if resp is not None else None
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, min(MAX_BACKOFF, float(retry_after)))
+            if resp is not None:
+                resp.close()
+            self.logger.warning(f"Retrying request in {delay:.1f}s")
+            time.sleep(delay)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _request_accounts(
+        self,
+        days_history: int,
+        stream: bool = False,
+        account_ids: Optional[list[str]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> requests.Response:
+        if not start_date:
+            start_date = datetime.now() - timedelta(days=days_history)
         self.logger.info(f"start_date is {start_date.isoformat(timespec='hours')}")
+        params = {"start-date": f"{int(start_date.timestamp())}"}
+        if end_date:
+            self.logger.info(f"end_date is {end_date.isoformat(timespec='hours')}")
+            params["end-date"] = f"{int(end_date.timestamp())}"
+        if account_ids:
+            # the bridge only returns the listed accounts
+            params["account"] = account_ids
 
         self.logger.info(f"Initiating request to {self.__API_URL}/accounts...")
-        resp = requests.get(
-            url=f"{self.__API_URL}/accounts",
-            auth=(self.__api_user, self.__api_passwd),
-            params={"start-date": f"{int(start_date.timestamp())}"},
-            timeout=self._timeout,
-        )
+        resp = self._get(f"{self.__API_URL}/accounts", params, stream=stream)
         if resp.status_code != 200:
             if self.debug:
                 raise Exception(f"Request error: {resp.text}")
             else:
                 raise Exception(f"Request error: {resp.status_code}")
+        return resp
+
+    def query_accounts(
+        self,
+        days_history: int = 7,
+        account_ids: Optional[list[str]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> QueryResult:
+        """
+        Query accounts with `days_history` days of transactions, or the explicit
+        [start_date, end_date) range when given.
+        """
+        resp = self._request_accounts(
+            days_history, account_ids=account_ids, start_date=start_date, end_date=end_date
+        )
 
         if self.debug:
             self.logger.debug(f"Request successful\n{resp.text}\nParsing account data...")
@@ -85,54 +337,116 @@ class SimpleFIN:
         balances: list[Balance] = []
         transactions: list[Transaction] = []
         for acct_raw in accts_raw:
-            # get account name
-            acct_name: str = acct_raw["name"]
-            # get the org name
-            bank: str = acct_raw["org"].get("name")
-            if not bank:  # if org name is missing, org domain is required by simpleFIN
-                bank = acct_raw["org"].get("domain")
-                self.logger.info(f"Defaulted '{acct_name}' org name to domain '{bank}'")
-            # generate raw json without temporal data
-            acct_raw_json = json.dumps(
-                {k: v for k, v in acct_raw.items() if k not in ACCT_DUMP_EXLUDES}
-            )
-
-            acct = Account(
-                id=acct_raw["id"],
-                bank=bank,
-                name=acct_name,
-                currency=acct_raw["currency"],
-                raw_json=acct_raw_json,
-            )
-            if self.debug:
-                self.logger.debug(f"Loaded account: {acct}")
+            acct, balance, txs = self._parse_account(acct_raw)
             accounts.append(acct)
-
-            # balance
-            if self.debug:
-                self.logger.debug(f"Loading balance for account {acct.id}...")
-            balance = SimpleFIN._get_balance(acct_raw, self.debug, self.logger)
             balances.append(balance)
-
-            # transactions
-            if self.debug:
-                self.logger.debug(f"Loading transactions for account {acct.id}...")
-            txs = SimpleFIN._get_transactions(acct_raw, self.debug, self.logger)
-            self.logger.info(f"Loaded {len(txs):>3} transactions for account {acct.name}")
             transactions.extend(txs)
 
-
         # create query log
         q_log = QueryLog(
             query_date=datetime.now(),
             days_history=days_history,
             raw_response=resp.text,
+            account_ids=json.dumps([acct.id for acct in accounts]),
         )
         if self.debug:
             self.logger.debug(f"Created query log: {q_log}")
 
         return QueryResult(accounts, balances, transactions, q_log)
 
+    def stream_accounts(
+        self,
+        days_history: int = 7,
+        account_ids: Optional[list[str]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Iterator[QueryResult]:
+        """
+        Streaming variant of query_accounts. The response body is read in
+        chunks and each account is parsed as soon as it has been received, so
+        only one account's payload is in memory at a time.
+
+        Yields one QueryResult per account (with querylog=None), then a final
+        QueryResult holding only the QueryLog once the whole body has been read.
+        The raw body is compressed with the configured codec while it streams
+        and spooled to a temporary file, so it is never held in memory as text;
+        the log's raw_response holds the encoded bytes.
+        """
+        resp = self._request_accounts(
+            days_history, stream=True, account_ids=account_ids,
+            start_date=start_date, end_date=end_date,
+        )
+        self.logger.info("Request successful; streaming account data...")
+
+        # the raw body is compressed as it arrives (when a codec is configured)
+        with resp, CompressingSink(get_codec(), STREAM_SPOOL_SIZE) as spool:
+            chunks = _tee_text(resp.iter_content(chunk_size=STREAM_CHUNK_SIZE), spool)
+            acct_ids: list[str] = []
+            for acct_raw in JSONArrayStream(chunks).iter_array("accounts"):
+                if self.debug:
+                    self.logger.debug(acct_raw)
+                acct, balance, txs = self._parse_account(acct_raw)
+                del acct_raw
+                acct_ids.append(acct.id)
+                yield QueryResult([acct], [balance], txs, None)
+            # drain anything after the accounts array into the spool
+            for _ in chunks:
+                pass
+            if not acct_ids:
+                raise Exception("No accounts found.")
+
+            q_log = QueryLog(
+                query_date=datetime.now(),
+                days_history=days_history,
+                raw_response=spool.getvalue(),
+                account_ids=json.dumps(acct_ids),
+            )
+        if self.debug:
+            self.logger.debug(f"Created query log: {q_log}")
+
+        yield QueryResult([], [], [], q_log)
+
+    def _parse_account(self, acct_raw: dict) -> tuple[Account, Balance, list[Transaction] | list[dict]]:
+        # get account name
+        acct_name: str = acct_raw["name"]
+        # get the org name
+        bank: str = acct_raw["org"].get("name")
+        if not bank:  # if org name is missing, org domain is required by simpleFIN
+            bank = acct_raw["org"].get("domain")
+            self.logger.info(f"Defaulted '{acct_name}' org name to domain '{bank}'")
+        # generate raw json without temporal data
+        acct_raw_json = json.dumps(
+            {k: v for k, v in acct_raw.items() if k not in ACCT_DUMP_EXLUDES}
+        )
+
+        acct = Account(
+            id=acct_raw["id"],
+            bank=bank,
+            name=acct_name,
+            currency=acct_raw["currency"],
+            raw_json=acct_raw_json,
+            # bank, name and currency all come from the payload, so it alone is hashed
+            content_hash=content_hash(acct_raw_json),
+        )
+        if self.debug:
+            self.logger.debug(f"Loaded account: {acct}")
+
+        # balance
+        if self.debug:
+            self.logger.debug(f"Loading balance for account {acct.id}...")
+        balance = SimpleFIN._get_balance(acct_raw, self.debug, self.logger)
+
+        # transactions
+        if self.debug:
+            self.logger.debug(f"Loading transactions for account {acct.id}...")
+        if self.as_rows:
+            txs = SimpleFIN._get_transaction_rows(acct_raw, self.debug, self.logger)
+        else:
+            txs = SimpleFIN._get_transactions(acct_raw, self.debug, self.logger)
+        self.logger.info(f"Loaded {len(txs):>3} transactions for account {acct.name}")
+
+        return acct, balance, txs
+
     @staticmethod
     def _get_balance(
         acct_raw: dict,
@@ -184,6 +498,8 @@ class SimpleFIN:
             balance_date=balance_date,
             available_balance=available_balance,
             raw_json=balance_raw_json,
+            # the columns are all parsed from the payload, so it alone is hashed
+            content_hash=content_hash(balance_raw_json),
         )
         if debug:
             logger.debug(f"Loaded balance: {balance}")
@@ -199,12 +515,33 @@ class SimpleFIN:
         if not logger:
             logger = logging.getLogger()
         txs: list[Transaction] = []
+        for row in SimpleFIN._get_transaction_rows(acct_raw, logger=logger):
+            tx: Transaction = Transaction(**row)
+            if debug:
+                logger.debug(f"Loaded transaction: {tx}")
+            txs.append(tx)
+
+        return txs
+
+    @staticmethod
+    def _get_transaction_rows(
+        acct_raw: dict,
+        debug: bool = False,
+        logger: logging.Logger = None,
+    ) -> list[dict]:
+        """
+        Transactions as dicts keyed by column name, ready for a Core
+        executemany insert; no ORM instances are built.
+        """
+        if not logger:
+            logger = logging.getLogger()
+        rows: list[dict] = []
         txs_raw: list[dict] = acct_raw.get("transactions")
+        account_id = acct_raw["id"]
         for tx_raw in txs_raw:
             tx_id: str = tx_raw["id"]
             # extra dict of data we're not explicitly pulling
-            known_keys = ["id", "amount", "description", "posted", "transacted_at", "payee", "memo"]
-            extra: dict = {k: v for k, v in tx_raw.items() if k not in known_keys}
+            extra: dict = {k: v for k, v in tx_raw.items() if k not in TX_KNOWN_KEYS}
 
             # posted date
             try:
@@ -218,30 +555,34 @@ class SimpleFIN:
             except Exception as ex:
                 raise Exception(f"Could not get amount for {tx_id}: {ex}")
 
-            # date transacted
+            # date transacted, falling back to the posted date
+            tx_at: datetime | None = None
             try:
-                tx_at: datetime = tx_raw.get("transacted_at")
-                if tx_at is not None:
-                    tx_at: float | None = datetime.fromtimestamp(int(tx_at))
+                if tx_raw.get("transacted_at") is not None:
+                    tx_at = datetime.fromtimestamp(int(tx_raw["transacted_at"]))
             except Exception as ex:
                 logger.info(f"Couldn't get transacted date for {tx_id}: {ex}")
-                tx_at: float | None = None
-
-            tx: Transaction = Transaction(
-                id=tx_id,
-                account_id=acct_raw["id"],
-                posted=posted_date,
-                amount=amount,
-                description=tx_raw["description"],
-                raw_json=json.dumps(tx_raw),
-                payee=tx_raw.get("payee"),
-                memo=tx_raw.get("memo"),
-                transacted_at=tx_at,
-                extra_attrs=json.dumps(extra),
-            )
-            if debug:
-                logger.debug(f"Loaded transaction: {tx}")
 
-            txs.append(tx)
+            # every column is derived from the raw payload, so hashing it covers them all
+            tx_raw_json = _json_encode(tx_raw)
+            row = {
+                "id": tx_id,
+                "account_id": account_id,
+                "posted": posted_date,
+                "amount": amount,
+                "description": tx_raw["description"],
+                "raw_json": tx_raw_json,
+                "payee": tx_raw.get("payee"),
+                "memo": tx_raw.get("memo"),
+                "category": None,
+                "tags": None,
+                "notes": None,
+                "transacted_at": tx_at or posted_date,
+                "extra_attrs": _json_encode(extra),
+                "content_hash": content_hash(tx_raw_json),
+            }
+            if debug:
+                logger.debug(f"Loaded transaction row: {row}")
+            rows.append(row)
 
-        return txs
+        return rows
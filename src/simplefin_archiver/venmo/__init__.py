@@ -1,5 +1,14 @@
-from .venmo_txs import get_venmo_txs
+from importlib import import_module
 
+# bs4, imap_tools and regex are only imported once get_venmo_txs is used
 __all__ = [
     "get_venmo_txs",
 ]
+
+
+def __getattr__(name: str):
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(".venmo_txs", __name__), name)
+    globals()[name] = value
+    return value
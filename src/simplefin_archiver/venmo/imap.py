@@ -1,23 +1,85 @@
 import datetime
+import logging
+from typing import Callable, Iterator, Optional
 
-from imap_tools import AND, MailBox, MailMessage
+from imap_tools import AND, MailBox, MailMessage, U
 
+IMAP_HOST = "imap.gmail.com"
+VENMO_SENDER = "venmo@venmo.com"
+HEADER_BATCH_SIZE = 500
+DEFAULT_BODY_BATCH_SIZE = 50
 
-def get_emails(email_addr: str, imap_passwd: str, start_date: datetime.date) -> list[MailMessage]:
+
+def open_mailbox(email_addr: str, imap_passwd: str) -> MailBox:
+    return MailBox(IMAP_HOST).login(email_addr, imap_passwd)
+
+
+def get_uid_status(mailbox: MailBox) -> tuple[int, int]:
     """
-    Connects to the specified IMAP server and fetches Venmo emails.
+    (UIDVALIDITY, UIDNEXT) of the selected folder. When UIDVALIDITY changes,
+    earlier UIDs mean nothing; every message arriving later gets a UID of at
+    least UIDNEXT.
     """
-    msgs = []
+    status = mailbox.folder.status(options=["UIDVALIDITY", "UIDNEXT"])
+    return int(status["UIDVALIDITY"]), int(status["UIDNEXT"])
+
+
+def venmo_criteria(start_date: Optional[datetime.date] = None, min_uid: Optional[int] = None):
+    """Search for Venmo emails by UID (from min_uid up) or else by date."""
+    if min_uid is not None:
+        return AND(from_=VENMO_SENDER, uid=U(min_uid, "*"))
+    return AND(from_=VENMO_SENDER, date_gte=start_date)
+
+
+def message_id(msg: MailMessage) -> str:
+    """Message-ID header, which, unlike the UID, survives a UIDVALIDITY change."""
+    values = msg.headers.get("message-id")
+    return values[0].strip() if values else ""
+
+
+def fetch_headers(mailbox: MailBox, criteria) -> Iterator[MailMessage]:
+    return mailbox.fetch(criteria, mark_seen=False, headers_only=True, bulk=HEADER_BATCH_SIZE)
 
+
+def fetch_messages(
+    mailbox: MailBox,
+    uids: list[str],
+    batch_size: int = DEFAULT_BODY_BATCH_SIZE,
+) -> Iterator[MailMessage]:
+    """Full messages for `uids`, one FETCH per batch, yielded as each batch arrives."""
+    for i in range(0, len(uids), batch_size):
+        yield from mailbox.fetch(uid_list=uids[i:i + batch_size], mark_seen=False, bulk=True)
+
+
+def iter_emails(
+    email_addr: str,
+    imap_passwd: str,
+    start_date: datetime.date,
+    subject_filter: Optional[Callable[[str], bool]] = None,
+    batch_size: int = DEFAULT_BODY_BATCH_SIZE,
+) -> Iterator[MailMessage]:
+    """
+    Yields Venmo emails as they are fetched. Headers are pulled first, in
+    bulk, and full messages are then fetched `batch_size` at a time, only for
+    those whose subject passes `subject_filter`.
+    """
     try:
-        with MailBox("imap.gmail.com").login(email_addr, imap_passwd) as mailbox:
-            criteria = AND(
-                from_="venmo@venmo.com",
-                date_gte=start_date,
-            )
-            for msg in mailbox.fetch(criteria, mark_seen=False):
-                msgs.append(msg)
+        with open_mailbox(email_addr, imap_passwd) as mailbox:
+            n_headers = 0
+            uids: list[str] = []
+            for msg in fetch_headers(mailbox, venmo_criteria(start_date=start_date)):
+                n_headers += 1
+                if subject_filter is None or subject_filter(msg.subject):
+                    uids.append(msg.uid)
+            logging.info(f"Fetching {len(uids)} of {n_headers} emails...")
+
+            yield from fetch_messages(mailbox, uids, batch_size)
     except Exception as e:
         raise Exception(f"Failed to fetch emails for {email_addr}: {e}")
 
-    return msgs
+
+def get_emails(email_addr: str, imap_passwd: str, start_date: datetime.date) -> list[MailMessage]:
+    """
+    Connects to the specified IMAP server and fetches Venmo emails.
+    """
+    return list(iter_emails(email_addr, imap_passwd, start_date))
@@ -21,10 +21,23 @@ def get_value_after_label(soup, label_text, tag_name="h2") -> str:
     return value_tag.text.strip()
 
 
-def parse_payment_tx(email: MailMessage) -> Optional[Transaction]:
-    # init soup cursor
-    soup = BeautifulSoup(email.html, "html.parser")
+def is_payment_subject(subject: str) -> bool:
+    return " paid you" in subject or subject.startswith("You paid ")
+
+
+def is_transfer_subject(subject: str) -> bool:
+    return "transfer has been initiated" in subject
+
+
+def is_tx_subject(subject: str) -> bool:
+    """
+    Whether an email may hold a payment or transfer, judged on the subject
+    alone, so the body only needs fetching for these.
+    """
+    return is_payment_subject(subject) or is_transfer_subject(subject)
 
+
+def parse_payment_tx(email: MailMessage) -> Optional[Transaction]:
     # -- PARSE PAYEE --
     if " paid you" in email.subject:
         logging.info("Email identified as an incoming transaction.")
@@ -37,6 +50,8 @@ def parse_payment_tx(email: MailMessage) -> Optional[Transaction]:
     else:
         logging.info(f"Email is not a payment: {email.subject}")
         return None
+    # init soup cursor, only once the subject matched
+    soup = BeautifulSoup(email.html, "html.parser")
     # regex pattern to match the payee
     search_result: regex.Match = regex.search(payee_regex, email.subject)
     # if no matches, can't proceed
@@ -87,12 +102,12 @@ def parse_payment_tx(email: MailMessage) -> Optional[Transaction]:
 
 
 def parse_transfer_tx(email: MailMessage) -> Optional[Transaction]:
-    # init soup cursor
-    soup = BeautifulSoup(email.html, "html.parser")
     # unhappy path
-    if "transfer has been initiated" not in email.subject:
+    if not is_transfer_subject(email.subject):
         logging.info(f"Email is not a transfer: {email.subject}")
         return None
+    # init soup cursor
+    soup = BeautifulSoup(email.html, "html.parser")
 
     # -- PARSE TRANSFER AMOUNT --
     tx_amt_text: str = get_value_after_label(soup, "Transfer Amount", "h2")
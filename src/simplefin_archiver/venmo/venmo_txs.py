@@ -1,34 +1,103 @@
 import logging
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 from typing import Optional
 
-from simplefin_archiver import Transaction
+from imap_tools import MailMessage
 
-from .imap import get_emails
-from .parse_email import email_to_tx
+from simplefin_archiver import SimpleFIN_DB, Transaction
+from simplefin_archiver.db import VENMO_FAILED, VENMO_IGNORED, VENMO_TRANSACTION
+from simplefin_archiver.models import VenmoMessage
+
+from .imap import fetch_headers, fetch_messages, get_uid_status, message_id, open_mailbox, venmo_criteria
+from .parse_email import email_to_tx, is_tx_subject
+
+
+def _ledger_id(msg: MailMessage, uid_validity: int) -> str:
+    # the UID only identifies a message while UIDVALIDITY holds
+    return message_id(msg) or f"uid:{uid_validity}:{msg.uid}"
 
 
 def get_venmo_txs(
     email_addr: str,
     imap_passwd: str,
     start_date: Optional[date] = None,
+    db: Optional[SimpleFIN_DB] = None,
+    account_id: Optional[str] = None,
 ) -> list[Transaction]:
+    """
+    Parse Venmo payment and transfer emails into transactions.
+
+    With `db` the run is checkpointed and the transactions are stored under
+    `account_id`: only mail above the last processed UID is searched (by date
+    from `start_date` when there is no checkpoint yet or the folder's
+    UIDVALIDITY changed), messages already in the ledger are skipped, and
+    earlier failures are retried. The transactions, ledger and checkpoint
+    are committed together, so a message is never marked processed without
+    its transaction.
+    """
+    if db and not account_id:
+        raise ValueError("account_id is required to store Venmo transactions")
     if not start_date:
         start_date = date.today() - timedelta(days=30)
-    logging.info(f"Fetching Venmo emails from {start_date}...")
 
-    messages = get_emails(email_addr, imap_passwd, start_date)
-    logging.info(f"Found {len(messages)} emails. Beginning parsing...")
+    with open_mailbox(email_addr, imap_passwd) as mailbox:
+        mailbox_key = f"{email_addr}/{mailbox.folder.get()}"
+        uid_validity, uid_next = get_uid_status(mailbox)
+        checkpoint = db.get_venmo_checkpoint(mailbox_key) if db else None
+        by_uid = checkpoint is not None and checkpoint.uid_validity == uid_validity
+        if by_uid:
+            logging.info(f"Fetching Venmo emails after UID {checkpoint.last_uid}...")
+            last_uid = checkpoint.last_uid
+            criteria = venmo_criteria(min_uid=last_uid + 1)
+        else:
+            if checkpoint:
+                logging.warning(f"UIDVALIDITY of {mailbox_key} changed; falling back to a date search")
+            logging.info(f"Fetching Venmo emails from {start_date}...")
+            # anything below UIDNEXT is either found by the date search or older than start_date
+            last_uid = uid_next - 1
+            criteria = venmo_criteria(start_date=start_date)
+
+        # "N:*" always matches the newest message, even when its UID is below N
+        headers = [msg for msg in fetch_headers(mailbox, criteria) if not by_uid or int(msg.uid) > last_uid]
+        last_uid = max([last_uid] + [int(msg.uid) for msg in headers])
+
+        # {uid: ledger id} of payment/transfer candidates not processed before
+        candidates = {msg.uid: _ledger_id(msg, uid_validity) for msg in headers if is_tx_subject(msg.subject)}
+        if db and candidates:
+            processed = db.get_processed_messages(mailbox_key, list(candidates.values()))
+            candidates = {uid: ledger_id for uid, ledger_id in candidates.items() if ledger_id not in processed}
+        if by_uid:
+            # failures below the checkpoint, retried until they parse (e.g. after a parser fix)
+            for uid, ledger_id in db.get_failed_messages(mailbox_key, uid_validity).items():
+                candidates.setdefault(str(uid), ledger_id)
+        logging.info(f"Found {len(headers)} emails, {len(candidates)} to process. Beginning parsing...")
 
-    valid_transactions: list[Transaction] = []
-    for msg in messages:
-        try:
-            tx = email_to_tx(msg)
-            if tx:
-                valid_transactions.append(tx)
-        except Exception as e:
-            logging.error(f"Failed to process email '{msg.subject}': {e}")
-            continue
+        valid_transactions: list[Transaction] = []
+        ledger: list[VenmoMessage] = []
+        for msg in fetch_messages(mailbox, list(candidates)):
+            entry = VenmoMessage(
+                mailbox=mailbox_key,
+                message_id=candidates[msg.uid],
+                uid_validity=uid_validity,
+                uid=int(msg.uid),
+                subject=msg.subject,
+                outcome=VENMO_IGNORED,
+                processed_at=datetime.now(),
+            )
+            ledger.append(entry)
+            try:
+                tx = email_to_tx(msg)
+                if tx:
+                    if account_id:
+                        tx.account_id = account_id
+                    valid_transactions.append(tx)
+                    entry.outcome, entry.transaction_id = VENMO_TRANSACTION, tx.id
+            except Exception as e:
+                logging.error(f"Failed to process email '{msg.subject}': {e}")
+                entry.outcome, entry.error = VENMO_FAILED, str(e)
 
+    # steady state (no new mail) writes nothing
+    if db and (ledger or not by_uid or last_uid != checkpoint.last_uid):
+        db.record_venmo_messages(mailbox_key, uid_validity, last_uid, ledger, valid_transactions)
     logging.info(f"Successfully parsed {len(valid_transactions)} venmo transactions.")
     return valid_transactions
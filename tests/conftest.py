@@ -0,0 +1,144 @@
+import io
+import json
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+import requests
+from alembic import command
+from alembic.config import Config
+
+from simplefin_archiver import SimpleFIN, SimpleFIN_DB
+
+ROOT = Path(__file__).resolve().parent.parent
+TOKEN = "user:secret"
+NOW = datetime(2026, 1, 1)
+
+
+@pytest.fixture(scope="session")
+def migrated_db(tmp_path_factory) -> Path:
+    """A SQLite file at the Alembic head, built once and copied per test."""
+    path = tmp_path_factory.mktemp("template") / "simplefin.db"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.delenv("POSTGRES_PASSWORD", raising=False)
+        mp.setenv("SIMPLEFIN_DB_PATH", str(path))
+        command.upgrade(Config(str(ROOT / "alembic.ini")), "head")
+    return path
+
+
+@pytest.fixture
+def db_url(migrated_db, tmp_path) -> str:
+    path = tmp_path / "simplefin.db"
+    shutil.copy(migrated_db, path)
+    return f"sqlite:///{path}"
+
+
+@pytest.fixture
+def db(db_url):
+    with SimpleFIN_DB(connection_str=db_url) as db_conn:
+        yield db_conn
+
+
+def make_tx(tx_id: str, day: int, amount: float = -10.0, **fields) -> dict:
+    """A raw SimpleFIN transaction `day` days before NOW."""
+    ts = int((NOW - timedelta(days=day)).timestamp())
+    return {
+        "id": tx_id,
+        "posted": ts,
+        "amount": f"{amount:.2f}",
+        "description": f"PURCHASE {tx_id}",
+        "payee": "Coffee Shop",
+        "memo": "",
+        "transacted_at": ts,
+        **fields,
+    }
+
+
+def make_account(acct_id: str = "ACT-1", transactions: list[dict] = (), balance: float = 100.0,
+                 balance_date: datetime = NOW) -> dict:
+    return {
+        "org": {"domain": "bank.example.com", "name": "Bank", "sfin-url": "https://bank.example.com"},
+        "id": acct_id,
+        "name": f"Checking {acct_id}",
+        "currency": "USD",
+        "balance": f"{balance:.2f}",
+        "available-balance": f"{balance:.2f}",
+        "balance-date": int(balance_date.timestamp()),
+        "transactions": list(transactions),
+        "holdings": [],
+    }
+
+
+def make_payload(*accounts: dict) -> dict:
+    return {"errors": [], "accounts": list(accounts)}
+
+
+def make_response(body: dict | str | bytes, status: int = 200, headers: dict = None) -> requests.Response:
+    """A real requests.Response over an in-memory body, so streaming works too."""
+    if isinstance(body, dict):
+        body = json.dumps(body)
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    resp = requests.Response()
+    resp.status_code = status
+    resp.raw = io.BytesIO(body)
+    resp.headers.update(headers or {})
+    resp.elapsed = timedelta(0)
+    resp.encoding = "utf-8"
+    return resp
+
+
+class FakeSession:
+    """Stands in for requests.Session: replays `responses` (or raises them) in order."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls: list[dict] = []
+
+    def get(self, url, **kwargs):
+        self.calls.append({"url": url, **kwargs})
+        item = self.responses.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def simplefin():
+    """Build a SimpleFIN client whose HTTP session replays the given responses."""
+    def build(*responses, **kwargs) -> SimpleFIN:
+        return SimpleFIN(TOKEN, session=FakeSession(*responses), **kwargs)
+    return build
+
+
+@pytest.fixture
+def ingest(db, simplefin):
+    """Parse `payload` with the real client and commit it, as an archive run does."""
+    def run(payload: dict, bulk: bool = True, as_rows: bool = True, days_history: int = 30):
+        qr = simplefin(make_response(payload), as_rows=as_rows).query_accounts(days_history)
+        db.commit_query_result(qr, bulk=bulk)
+        return qr
+    return run
+
+
+API_KEY = "test-api-key"
+
+
+@pytest.fixture
+def client(db_url, monkeypatch):
+    """TestClient for the API over the per-test DB, with its lifespan running."""
+    from fastapi.testclient import TestClient
+
+    from simplefin_archiver.api.api import app
+
+    monkeypatch.delenv("POSTGRES_PASSWORD", raising=False)
+    monkeypatch.delenv("IN_PROCESS_SCHEDULER", raising=False)
+    monkeypatch.setenv("SIMPLEFIN_DB_PATH", db_url.removeprefix("sqlite:///"))
+    monkeypatch.setenv("ARCHIVER_API_KEY_FILE", "/nonexistent")
+    monkeypatch.setenv("ARCHIVER_API_KEY", API_KEY)
+    with TestClient(app, headers={"X-API-Key": API_KEY}) as test_client:
+        yield test_client
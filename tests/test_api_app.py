@@ -0,0 +1,31 @@
+from sqlalchemy import event
+
+from simplefin_archiver.api.api import app
+
+from conftest import make_account, make_payload, make_tx
+
+
+def test_requests_share_one_engine(client, ingest):
+    ingest(make_payload(make_account("ACT-1", [make_tx("TX-1", day=1)])))
+    engine = app.state.engine
+    connects = []
+
+    def on_connect(*args):
+        connects.append(1)
+
+    event.listen(engine, "connect", on_connect)
+    try:
+        for _ in range(5):
+            assert client.get("/transactions").status_code == 200
+            assert client.get("/accounts").status_code == 200
+    finally:
+        event.remove(engine, "connect", on_connect)
+    assert app.state.engine is engine
+    # the pool hands the same connection back each time, and it is returned after every request
+    assert len(connects) <= 1
+    assert engine.pool.checkedout() == 0
+
+
+def test_auth_is_required(client):
+    assert client.get("/health_check", headers={"X-API-Key": ""}).status_code == 200
+    assert client.get("/accounts", headers={"X-API-Key": "wrong"}).status_code == 401
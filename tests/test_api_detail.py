@@ -0,0 +1,42 @@
+import json
+
+from sqlalchemy import select
+
+from conftest import make_account, make_payload, make_tx
+from simplefin_archiver.models import Transaction
+
+
+def test_listing_does_not_select_payloads(db, ingest):
+    ingest(make_payload(make_account("ACT-1", [make_tx("TX-1", day=1)])))
+    sql = str(db.transactions_query().compile(db.engine))
+    assert "raw_json" not in sql and "extra_attrs" not in sql
+
+    # raw_json stays deferred on plain entity loads too
+    tx = db.session.scalar(select(Transaction))
+    assert "raw_json" not in tx.__dict__
+
+
+def test_list_endpoints_omit_payloads(client, ingest):
+    ingest(make_payload(make_account("ACT-1", [make_tx("TX-1", day=1)])))
+    for path in ("/transactions", "/balances"):
+        rows = client.get(path).json()
+        assert rows and all("raw_json" not in row for row in rows)
+
+
+def test_detail_endpoints_include_payloads(client, ingest):
+    ingest(make_payload(make_account("ACT-1", [make_tx("TX-1", day=1, memo="lunch")])))
+
+    tx = client.get("/transactions/TX-1").json()
+    assert json.loads(tx["raw_json"])["id"] == "TX-1"
+    assert tx["memo"] == "lunch"
+    assert tx["account"]["id"] == "ACT-1"
+
+    balance_id = client.get("/balances").json()[0]["id"]
+    bal = client.get(f"/balances/{balance_id}").json()
+    assert json.loads(bal["raw_json"])
+    assert bal["available_balance"] == 100.0
+
+
+def test_detail_endpoints_404(client):
+    assert client.get("/transactions/missing").status_code == 404
+    assert client.get("/balances/missing").status_code == 404
@@ -0,0 +1,240 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+import requests
+import typer
+from sqlalchemy import func, select, update
+
+from simplefin_archiver import SimpleFIN, archiver
+from simplefin_archiver.archiver import iter_token_results, key_id, resolve_incremental_window, run_archiver_backend
+from simplefin_archiver.db import JOB_FAILED, JOB_SUCCEEDED
+from simplefin_archiver.models import Job, QueryLog, QueryResult, Transaction
+
+from conftest import FakeSession, make_account, make_payload, make_response, make_tx
+
+FULL_DAYS = 90
+
+
+def _tx_at(tx_id: str, when: datetime) -> dict:
+    ts = int(when.timestamp())
+    return make_tx(tx_id, day=0, posted=ts, transacted_at=ts)
+
+
+def _set_last_query(db, when: datetime) -> None:
+    db.session.execute(update(QueryLog).values(query_date=when))
+    db.session.commit()
+
+
+def test_empty_archive_queries_full_window(db):
+    assert resolve_incremental_window(db, FULL_DAYS, 3) == (FULL_DAYS, set())
+
+
+def test_window_starts_at_oldest_watermark_minus_overlap(db, ingest):
+    now = datetime.now()
+    ingest(make_payload(
+        make_account("ACT-1", [_tx_at("TX-1", now - timedelta(days=4.5))]),
+        make_account("ACT-2", [_tx_at("TX-2", now - timedelta(days=1.5))]),
+    ))
+    _set_last_query(db, now - timedelta(days=10))
+    days, known = resolve_incremental_window(db, FULL_DAYS, 3)
+    assert days == 8  # 4.5 days since ACT-1's newest transaction, plus the overlap, rounded up
+    assert known == {"ACT-1", "ACT-2"}
+
+
+def test_dormant_account_is_floored_at_last_query(db, ingest):
+    now = datetime.now()
+    ingest(make_payload(
+        make_account("ACT-1", [_tx_at("TX-1", now - timedelta(days=60))]),
+        make_account("ACT-2", [_tx_at("TX-2", now - timedelta(days=0.5))]),
+    ))
+    _set_last_query(db, now - timedelta(days=1.5))
+    days, _ = resolve_incremental_window(db, FULL_DAYS, 3)
+    assert days == 5
+
+
+def test_account_without_transactions_uses_last_query(db, ingest):
+    now = datetime.now()
+    ingest(make_payload(make_account("ACT-1")))
+    _set_last_query(db, now - timedelta(days=3.5))
+    assert resolve_incremental_window(db, FULL_DAYS, 1)[0] == 5
+
+
+def test_account_missing_from_a_response_keeps_its_floor(db, ingest):
+    now = datetime.now()
+    accounts = [make_account(acct_id, [_tx_at(f"TX-{acct_id}", now - timedelta(days=60))])
+                for acct_id in ("ACT-1", "ACT-2")]
+    ingest(make_payload(*accounts))
+    _set_last_query(db, now - timedelta(days=6.5))
+    # e.g. a bank connection error: ACT-1 is left out of the next response
+    ingest(make_payload(accounts[1]))
+    days, known = resolve_incremental_window(db, FULL_DAYS, 1)
+    assert days == 8
+    assert known == {"ACT-1", "ACT-2"}
+
+
+def test_window_is_capped_at_full_days(db, ingest):
+    ingest(make_payload(make_account("ACT-1", [_tx_at("TX-1", datetime.now() - timedelta(days=400))])))
+    _set_last_query(db, datetime.now() - timedelta(days=400))
+    # not seen within the window: unknown, so re-queried in full if it returns
+    assert resolve_incremental_window(db, FULL_DAYS, 3) == (FULL_DAYS, set())
+
+
+class _Client:
+    """Records the (days, account_ids) of each query and returns one account per id."""
+
+    def __init__(self, account_ids: list[str]):
+        self.account_ids = account_ids
+        self.calls = []
+
+    def query_accounts(self, days_history, account_ids=None):
+        self.calls.append((days_history, account_ids))
+        ids = account_ids or self.account_ids
+        accounts = [type("Acct", (), {"id": acct_id})() for acct_id in ids]
+        return QueryResult(accounts, [], [], None)
+
+
+@pytest.mark.parametrize("known, expected_calls", [
+    ({"ACT-1", "ACT-2"}, [(7, None)]),
+    ({"ACT-1"}, [(7, None), (FULL_DAYS, ["ACT-2"])]),
+])
+def test_new_accounts_are_requeried_with_full_history(known, expected_calls):
+    client = _Client(["ACT-1", "ACT-2"])
+    list(iter_token_results(client, 7, FULL_DAYS, known))
+    assert client.calls == expected_calls
+
+
+@pytest.fixture
+def tokens(tmp_path, monkeypatch):
+    """
+    Write a key file for the given {token: payload or exception} and route
+    each token's client to a session replaying its response.
+    """
+    sessions: dict[str, FakeSession] = {}
+
+    def setup(responses: dict) -> Path:
+        def client(token, session=None, **kwargs):
+            item = responses[token]
+            reply = item if isinstance(item, Exception) else make_response(item)
+            sessions[token] = FakeSession(reply)
+            return SimpleFIN(token, session=sessions[token], **kwargs)
+
+        monkeypatch.setattr(archiver, "SimpleFIN", client)
+        key_file = tmp_path / "keys"
+        key_file.write_text("".join(f"key{i} {token}\n" for i, token in enumerate(responses)))
+        return key_file
+    # the last session of each token, to inspect its requests
+    setup.sessions = sessions
+    return setup
+
+
+def _archive(db_url, key_file, **kwargs):
+    options = {"days_history": 7, "incremental": False, "retries": 0, **kwargs}
+    return run_archiver_backend(simplefin_key_file=key_file, db=db_url, **options)
+
+
+def _token_payload(n: int) -> dict:
+    return make_payload(make_account(f"ACT-{n}", [make_tx(f"TX-{n}-{i}", day=i) for i in range(3)]))
+
+
+def test_tokens_are_archived_together(db, db_url, tokens):
+    key_file = tokens({f"user{n}:secret": _token_payload(n) for n in range(3)})
+    assert _archive(db_url, key_file) == "Saved 3 accounts with 9 transactions."
+    assert db.session.scalar(select(func.count()).select_from(Transaction)) == 9
+    job = db.session.scalars(select(Job)).one()
+    assert (job.status, job.n_accounts, job.n_transactions) == (JOB_SUCCEEDED, 3, 9)
+
+
+def test_failed_token_does_not_block_the_others(db, db_url, tokens):
+    key_file = tokens({"user0:secret": _token_payload(0), "user1:secret": requests.ConnectionError("down")})
+    with pytest.raises(typer.Exit):
+        _archive(db_url, key_file)
+    assert db.session.scalars(select(Transaction.account_id).distinct()).all() == ["ACT-0"]
+    job = db.session.scalars(select(Job)).one()
+    assert job.status == JOB_FAILED and "key1" in job.message
+
+
+def test_single_token_failure_reraises(db_url, tokens):
+    key_file = tokens({"user0:secret": requests.ConnectionError("down")})
+    with pytest.raises(requests.ConnectionError):
+        _archive(db_url, key_file)
+
+
+def test_results_queue_is_bounded(db, db_url, tokens, monkeypatch):
+    monkeypatch.setattr(archiver, "RESULT_QUEUE_SIZE", 1)
+    key_file = tokens({f"user{n}:secret": _token_payload(n) for n in range(4)})
+    seen_sizes = []
+    real_queue = archiver.Queue
+
+    def queue(maxsize=0):
+        seen_sizes.append(maxsize)
+        return real_queue(maxsize)
+
+    monkeypatch.setattr(archiver, "Queue", queue)
+    # streamed: several results per token contend for the single slot
+    assert _archive(db_url, key_file, stream=True) == "Saved 4 accounts with 12 transactions."
+    assert seen_sizes == [1]
+
+
+def test_consumer_abort_releases_blocked_fetchers(db_url, tokens, monkeypatch):
+    monkeypatch.setattr(archiver, "RESULT_QUEUE_SIZE", 1)
+    key_file = tokens({f"user{n}:secret": _token_payload(n) for n in range(4)})
+
+    def interrupted(self, part, *args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(archiver.SimpleFIN_DB, "commit_query_result", interrupted)
+    # returns (rather than hanging on the pool shutdown) with fetchers still queued
+    with pytest.raises(KeyboardInterrupt):
+        _archive(db_url, key_file, stream=True)
+
+
+def test_run_is_skipped_while_another_holds_the_lock(db, db_url, tokens):
+    key_file = tokens({"user0:secret": _token_payload(0)})
+    running, _ = db.acquire_job()
+    assert _archive(db_url, key_file) == f"Archive job {running.id} is already running; skipping."
+    assert db.session.scalar(select(func.count()).select_from(Transaction)) == 0
+
+
+def test_heartbeat_failure_only_warns(db, db_url, tokens, monkeypatch, caplog):
+    key_file = tokens({"user0:secret": _token_payload(0)})
+
+    def broken(self, job_id, *args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(archiver.SimpleFIN_DB, "heartbeat_job", broken)
+    assert _archive(db_url, key_file) == "Saved 1 accounts with 3 transactions."
+    assert "Failed to refresh the archive job lock" in caplog.text
+    assert db.session.scalars(select(Job.status)).one() == JOB_SUCCEEDED
+
+
+def _requested_days(session: FakeSession) -> int:
+    start = int(session.calls[0]["params"]["start-date"])
+    return round((datetime.now().timestamp() - start) / 86400)
+
+
+def test_failed_token_is_caught_up_from_its_own_last_query(db, db_url, tokens):
+    now = datetime.now()
+    ids = {"user0:secret": "ACT-0", "user1:secret": "ACT-1"}
+    # dormant accounts: only the logged queries bound their windows
+    payloads = {
+        token: make_payload(make_account(acct_id, [_tx_at(f"TX-{acct_id}", now - timedelta(days=20))]))
+        for token, acct_id in ids.items()
+    }
+
+    def archive(responses: dict):
+        return _archive(db_url, tokens(responses), days_history=30, incremental=True, overlap_days=1)
+
+    archive(payloads)
+    _set_last_query(db, datetime.now() - timedelta(days=8))
+
+    # user1 fails while user0 keeps archiving
+    with pytest.raises(typer.Exit):
+        archive({**payloads, "user1:secret": requests.ConnectionError("down")})
+
+    archive(payloads)
+    # a day since user0's last run, plus the overlap (rounded up)
+    assert _requested_days(tokens.sessions["user0:secret"]) == 2
+    # user1 goes back to its own last success, not to user0's
+    assert _requested_days(tokens.sessions["user1:secret"]) == 10
+    assert set(db.session.scalars(select(QueryLog.key_id))) == {key_id(token) for token in ids}
@@ -0,0 +1,122 @@
+import threading
+from datetime import datetime
+
+import pytest
+import typer
+from sqlalchemy import func, select
+
+from simplefin_archiver import SimpleFIN, archiver
+from simplefin_archiver.archiver import key_id, run_backfill_backend, split_windows
+from simplefin_archiver.db import ARCHIVE_JOB, JOB_SUCCEEDED
+from simplefin_archiver.models import Job, QueryLog, Transaction
+
+from conftest import make_account, make_payload, make_response, make_tx
+
+START, END = datetime(2025, 1, 1), datetime(2025, 3, 2)  # 60 days: three 20-day windows
+
+
+class WindowSession:
+    """Answers each /accounts request with one transaction dated at its start-date."""
+
+    def __init__(self, fail_starts: set[int] = frozenset()):
+        self.fail_starts = fail_starts
+        self.starts: list[int] = []
+        self._lock = threading.Lock()
+
+    def get(self, url, params, **kwargs):
+        start = int(params["start-date"])
+        with self._lock:
+            self.starts.append(start)
+        if start in self.fail_starts:
+            return make_response("bridge error", status=500)
+        tx = make_tx(f"TX-{start}", day=0, posted=start, transacted_at=start)
+        return make_response(make_payload(make_account("ACT-1", [tx])))
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def bridge(monkeypatch):
+    """Route run_backfill_backend's client through a WindowSession."""
+    session = WindowSession()
+
+    def client(token, **kwargs):
+        kwargs.pop("pool_size", None)
+        return SimpleFIN(token, session=session, retries=0, **kwargs)
+
+    monkeypatch.setattr(archiver, "SimpleFIN", client)
+    return session
+
+
+def _backfill(db_url, key="user:secret", **kwargs):
+    return run_backfill_backend(
+        START, END, window_days=20, workers=2, min_interval=0, simplefin_key=key, db=db_url, **kwargs
+    )
+
+
+def test_split_windows_cover_range_anchored_at_start():
+    windows = split_windows(START, END, 25)
+    assert windows[0][0] == START and windows[-1][1] == END
+    assert all(a[1] == b[0] for a, b in zip(windows, windows[1:]))
+    assert [(end - start).days for start, end in windows] == [25, 25, 10]
+
+
+def test_backfill_checkpoints_windows_per_key(db, db_url, bridge):
+    _backfill(db_url)
+    assert len(bridge.starts) == 3
+    assert db.session.scalar(select(func.count()).select_from(Transaction)) == 3
+    assert len(db.get_completed_windows(key_id("user:secret"))) == 3
+
+    # resumed: nothing left to fetch for this token
+    _backfill(db_url)
+    assert len(bridge.starts) == 3
+
+    # another token has its own checkpoints
+    _backfill(db_url, key="other:secret")
+    assert len(bridge.starts) == 6
+
+
+def test_backfill_does_not_mark_accounts_current(db, db_url, bridge):
+    _backfill(db_url)
+    assert db.session.scalar(select(func.count()).select_from(QueryLog)) == 3
+    assert db.get_account_coverage() == {}
+
+
+def test_failed_windows_are_retried_on_rerun(db, db_url, bridge):
+    bridge.fail_starts = {int(START.timestamp())}
+    with pytest.raises(typer.Exit):
+        _backfill(db_url)
+    assert len(db.get_completed_windows(key_id("user:secret"))) == 2
+
+    bridge.fail_starts = set()
+    _backfill(db_url)
+    assert bridge.starts[-1] == int(START.timestamp())
+    assert len(db.get_completed_windows(key_id("user:secret"))) == 3
+
+
+def test_every_token_in_a_key_file_is_backfilled(db, db_url, bridge, tmp_path):
+    key_file = tmp_path / "keys"
+    key_file.write_text("household-a user:secret\nhousehold-b other:secret\n")
+    _backfill(db_url, key=None, simplefin_key_file=key_file)
+    assert len(bridge.starts) == 6
+    for token in ("user:secret", "other:secret"):
+        assert len(db.get_completed_windows(key_id(token))) == 3
+
+    # each token resumes from its own checkpoints
+    _backfill(db_url, key="user:secret")
+    assert len(bridge.starts) == 6
+
+
+def test_backfill_runs_under_archive_lock(db, db_url, bridge):
+    # a running archive (or backfill) holds the lock; they'd contend for the DB
+    running, acquired = db.acquire_job(ARCHIVE_JOB, "cron")
+    assert acquired
+    assert "already running" in _backfill(db_url)
+    assert bridge.starts == []
+
+    db.finish_job(running.id, JOB_SUCCEEDED)
+    _backfill(db_url)
+    jobs = db.session.scalars(select(Job).where(Job.kind == ARCHIVE_JOB).order_by(Job.started_at)).all()
+    assert [(job.trigger, job.status) for job in jobs] == [("cron", JOB_SUCCEEDED), ("backfill", JOB_SUCCEEDED)]
+    assert jobs[-1].n_transactions == 3
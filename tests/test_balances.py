@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+
+from conftest import NOW, make_account, make_payload
+
+
+def _latest(db) -> dict[str, tuple[str, float]]:
+    return {row["account"]["id"]: (row["balance_id"], row["balance"]) for row in db.get_latest_balances()}
+
+
+def test_latest_balance_keeps_the_newest(db, ingest):
+    ingest(make_payload(make_account("ACT-1", balance=100), make_account("ACT-2", balance=50)))
+    # an older balance arriving later (e.g. a backfill) doesn't displace it
+    ingest(make_payload(make_account("ACT-1", balance=10, balance_date=NOW - timedelta(days=5))))
+    assert _latest(db) == {"ACT-1": ("ACT-1_2026-01-01", 100.0), "ACT-2": ("ACT-2_2026-01-01", 50.0)}
+
+    # a new value for the same day overwrites it
+    ingest(make_payload(make_account("ACT-1", balance=120)))
+    assert _latest(db)["ACT-1"] == ("ACT-1_2026-01-01", 120.0)
+
+
+def test_net_worth_carries_balances_forward(db, ingest):
+    for day, (a, b) in enumerate([(100, 0), (110, 20), (130, 20)]):
+        when = NOW - timedelta(days=2 - day)
+        ingest(make_payload(make_account("ACT-1", balance=a, balance_date=when),
+                            make_account("ACT-2", balance=b, balance_date=when)))
+    # ACT-2 stops reporting; its last balance still counts
+    ingest(make_payload(make_account("ACT-1", balance=200, balance_date=NOW + timedelta(days=1))))
+
+    points = db.get_net_worth()
+    assert [(p["date"], p["net_worth"]) for p in points] == [
+        (date(2025, 12, 30), 100.0),
+        (date(2025, 12, 31), 130.0),
+        (date(2026, 1, 1), 150.0),
+        (date(2026, 1, 2), 220.0),
+    ]
+    assert {p["currency"] for p in points} == {"USD"}
+
+
+def test_net_worth_opens_at_start(db, ingest):
+    ingest(make_payload(make_account("ACT-1", balance=100, balance_date=NOW - timedelta(days=10))))
+    ingest(make_payload(make_account("ACT-1", balance=150, balance_date=NOW)))
+
+    start = NOW - timedelta(days=3)
+    points = db.get_net_worth(start)
+    assert [(p["date"], p["net_worth"]) for p in points] == [(start.date(), 100.0), (NOW.date(), 150.0)]
+
+    # nothing changes within the range, the seeded balance still holds on start
+    points = db.get_net_worth(start, NOW - timedelta(days=1))
+    assert [(p["date"], p["net_worth"]) for p in points] == [(start.date(), 100.0)]
+    assert db.get_net_worth(NOW - timedelta(days=20), NOW - timedelta(days=15)) == []
+
+
+def test_balance_endpoints(client, ingest):
+    ingest(make_payload(make_account("ACT-1", balance=100)))
+    rows = client.get("/balances/latest").json()
+    assert [(row["account"]["id"], row["balance"]) for row in rows] == [("ACT-1", 100.0)]
+    points = client.get("/net_worth").json()
+    assert points == [{"date": "2026-01-01", "currency": "USD", "net_worth": 100.0}]
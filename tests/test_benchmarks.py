@@ -0,0 +1,98 @@
+import importlib.util
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+
+@pytest.fixture(scope="module")
+def bench():
+    """benchmarks/bench.py as a module (it isn't part of the package)."""
+    sys.path.insert(0, str(ROOT / "benchmarks"))
+    try:
+        spec = importlib.util.spec_from_file_location("bench", ROOT / "benchmarks" / "bench.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        yield module
+    finally:
+        sys.path.remove(str(ROOT / "benchmarks"))
+
+
+def test_payload_is_deterministic(bench):
+    from payload import balance_snapshots, make_payload
+
+    payload = make_payload(2, days=3, per_day=4)
+    assert payload == make_payload(2, days=3, per_day=4)
+    assert [len(acct["transactions"]) for acct in payload["accounts"]] == [12, 12]
+    snapshots = balance_snapshots(payload, days=3)
+    assert len(snapshots) == 2
+    assert all(not acct["transactions"] for snap in snapshots for acct in snap["accounts"])
+
+
+def test_parse_stages(bench):
+    from payload import make_payload
+
+    results = bench.bench_parse(make_payload(2, days=3, per_day=4), days=3, repeat=1)
+    assert set(results) == {"parse_transactions", "parse_tx_rows", "parse_balance"}
+    assert results["parse_transactions"]["rows"] == results["parse_tx_rows"]["rows"] == 24
+    assert results["parse_balance"]["rows"] == 2 + 2 * 2
+
+
+def _stage(rows_per_s, peak_mib):
+    return {"seconds": 1.0, "rows": 1, "rows_per_s": rows_per_s, "peak_mib": peak_mib}
+
+
+def test_compare_flags_regressions(bench):
+    baseline = {
+        "reference": {"ops_per_s": 5000},
+        "backends": {"sqlite": {"commit_cold": _stage(1000, 10), "api_balances": _stage(1000, 10)}},
+    }
+    results = {
+        "reference": {"ops_per_s": 5000},
+        "backends": {"sqlite": {
+            "commit_cold": _stage(700, 10),    # 30% slower
+            "api_balances": _stage(900, 30),   # within tolerance, but 3x the memory
+            "commit_warm": _stage(1, 1000),    # not in the baseline
+        }},
+    }
+    problems = bench.compare(results, baseline, tolerance=0.25)
+    assert len(problems) == 2
+    assert problems[0].startswith("sqlite/commit_cold: 700 rows/s vs 1000 expected")
+    assert problems[1].startswith("sqlite/api_balances: peak 30.0 MiB")
+
+
+def test_compare_scales_by_machine_speed(bench):
+    baseline = {"reference": {"ops_per_s": 5000}, "backends": {"parse": {"parse_balance": _stage(1000, 1)}}}
+
+    # a machine half as fast, and the stage half as fast: no regression
+    slower = {"reference": {"ops_per_s": 2500}, "backends": {"parse": {"parse_balance": _stage(500, 1)}}}
+    assert bench.compare(slower, baseline, tolerance=0.25) == []
+
+    # a machine twice as fast, but the stage only as fast as before: a regression
+    faster = {"reference": {"ops_per_s": 10000}, "backends": {"parse": {"parse_balance": _stage(1000, 1)}}}
+    assert bench.compare(faster, baseline, tolerance=0.25) == [
+        "parse/parse_balance: 1000 rows/s vs 2000 expected (baseline 1000 at machine speed 2.00)"
+    ]
+
+
+def test_reference_stage(bench, monkeypatch):
+    from payload import make_payload
+
+    monkeypatch.setattr(bench, "REFERENCE_OPS", 10)
+    result = bench.bench_reference(make_payload(1, days=1, per_day=1), repeat=1)
+    assert result["ops_per_s"] > 0
+
+
+def test_sqlite_stages(bench, tmp_path, monkeypatch):
+    from payload import make_payload
+
+    monkeypatch.delenv("IN_PROCESS_SCHEDULER", raising=False)
+    backend = bench.Backend("sqlite", {"SIMPLEFIN_DB_PATH": str(tmp_path / "bench.db"), "POSTGRES_PASSWORD": ""})
+    results = bench.bench_backend(backend, make_payload(2, days=3, per_day=4), days=3, repeat=1)
+    assert set(results) == {
+        "commit_cold_rows", "commit_cold", "commit_warm", "api_transactions", "api_balances",
+    }
+    assert results["commit_cold"]["rows"] == 24 + 2
+    assert results["api_transactions"]["rows"] == 24
+    assert results["api_balances"]["rows"] == 2 * 3
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+# loaded by the commands that need them, never by `import simplefin_archiver.cli`
+LAZY_MODULES = ("sqlalchemy", "requests", "fastapi", "bs4", "imap_tools", "regex")
+
+
+def _run(code: str) -> str:
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+    return proc.stdout.strip()
+
+
+@pytest.mark.parametrize("module", ["simplefin_archiver", "simplefin_archiver.cli"])
+def test_import_leaves_heavy_modules_unloaded(module):
+    loaded = _run(
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    assert loaded == ""
+
+
+def test_help_leaves_heavy_modules_unloaded():
+    loaded = _run(
+        "import sys\n"
+        "from typer.testing import CliRunner\n"
+        "from simplefin_archiver.cli import app\n"
+        "result = CliRunner().invoke(app, ['--help'])\n"
+        "assert result.exit_code == 0, result.output\n"
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    assert loaded == ""
+
+
+def test_package_attributes_load_on_access():
+    loaded = _run(
+        "import sys, simplefin_archiver; simplefin_archiver.SimpleFIN_DB; print('sqlalchemy' in sys.modules)"
+    )
+    assert loaded == "True"
+
+
+def test_moved_helpers_are_still_importable_from_the_cli():
+    loaded = _run(
+        "import sys\n"
+        "from simplefin_archiver.cli import resolve_simplefin_key, run_archiver_backend, run_backfill_backend\n"
+        "from simplefin_archiver import archiver\n"
+        "assert run_archiver_backend is archiver.run_archiver_backend\n"
+        "print('sqlalchemy' in sys.modules)"
+    )
+    assert loaded == "True"
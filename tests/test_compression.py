@@ -0,0 +1,99 @@
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import LargeBinary, inspect, select, text
+
+from simplefin_archiver import compression
+from simplefin_archiver.compression import CompressingSink, compress, decompress, is_compressed, recompress_payloads
+from simplefin_archiver.db import create_db_engine
+from simplefin_archiver.models import Transaction
+
+from conftest import ROOT, make_account, make_payload, make_tx
+
+TEXT = '{"description": "café", "memo": "' + "x" * 500 + '"}'
+
+
+def test_gzip_round_trip():
+    packed = compress(TEXT, "gzip")
+    assert is_compressed(packed) and len(packed) < len(TEXT)
+    assert decompress(packed) == TEXT
+
+
+def test_tiny_payloads_stay_plain():
+    assert compress("{}", "gzip") == b"{}"
+    assert decompress(b"{}") == "{}"
+
+
+def test_legacy_text_values_decode():
+    assert decompress(TEXT) == TEXT
+
+
+@pytest.mark.parametrize("codec", ["none", "gzip"])
+def test_sink_matches_compress(codec):
+    with CompressingSink(codec, max_size=64) as sink:
+        data = TEXT.encode("utf-8")
+        for i in range(0, len(data), 10):
+            sink.write(data[i:i + 10])
+        packed = sink.getvalue()
+    assert decompress(packed) == TEXT
+    assert is_compressed(packed) == (codec == "gzip")
+
+
+def test_unknown_codec_is_rejected(monkeypatch):
+    monkeypatch.setenv(compression.COMPRESSION_ENV, "lz4")
+    compression.get_codec.cache_clear()
+    try:
+        with pytest.raises(ValueError):
+            compression.get_codec()
+    finally:
+        compression.get_codec.cache_clear()
+
+
+def test_codec_is_reread_for_each_engine(monkeypatch):
+    try:
+        for codec in ("gzip", "none"):
+            monkeypatch.setenv(compression.COMPRESSION_ENV, codec)
+            create_db_engine("sqlite://").dispose()
+            assert compression.get_codec() == codec
+    finally:
+        compression.get_codec.cache_clear()
+
+
+def test_recompress_existing_payloads(db, ingest):
+    ingest(make_payload(make_account("ACT-1", [make_tx(f"TX-{i}", day=i, memo="m" * 300) for i in range(5)])))
+    stored = db.session.execute(text('SELECT raw_json FROM "transaction"')).scalars().all()
+    assert not any(is_compressed(bytes(raw)) for raw in stored)
+    before = db.session.scalars(select(Transaction.raw_json).order_by(Transaction.id)).all()
+
+    with db.engine.begin() as conn:
+        assert recompress_payloads(conn, "gzip", batch_size=2) > 0
+        # already-compressed rows are left alone
+        assert recompress_payloads(conn, "gzip", batch_size=2) == 0
+
+    db.session.expire_all()
+    stored = db.session.execute(text('SELECT raw_json FROM "transaction"')).scalars().all()
+    assert all(is_compressed(bytes(raw)) for raw in stored)
+    assert db.session.scalars(select(Transaction.raw_json).order_by(Transaction.id)).all() == before
+
+
+def test_payload_columns_are_declared_binary(db):
+    inspector = inspect(db.engine)
+    for table_name, _, col_name in compression.PAYLOAD_COLUMNS:
+        declared = {col["name"]: col["type"] for col in inspector.get_columns(table_name)}[col_name]
+        assert isinstance(declared, LargeBinary), (table_name, declared)
+
+
+def test_downgrade_restores_text_payloads(db, db_url, ingest, monkeypatch):
+    ingest(make_payload(make_account("ACT-1", [make_tx("TX-1", day=1, memo="m" * 300)])))
+    with db.engine.begin() as conn:
+        recompress_payloads(conn, "gzip")
+    db.session.close()
+    db.engine.dispose()
+
+    monkeypatch.delenv("POSTGRES_PASSWORD", raising=False)
+    monkeypatch.setenv("SIMPLEFIN_DB_PATH", db_url.removeprefix("sqlite:///"))
+    command.downgrade(Config(str(ROOT / "alembic.ini")), "3f1c9a7d2b64")
+
+    with db.engine.connect() as conn:
+        kind, raw = conn.execute(text('SELECT typeof(raw_json), raw_json FROM "transaction"')).one()
+    assert kind == "text" and "m" * 300 in raw
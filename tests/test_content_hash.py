@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import event, select
+
+from conftest import make_account, make_payload, make_tx
+from simplefin_archiver.models import Account, Balance
+
+WRITES = ("INSERT", "UPDATE", "DELETE")
+
+
+def _payload(balance: float = 100.0, name: str = None) -> dict:
+    acct = make_account("ACT-1", [make_tx(f"TX-{i}", day=i) for i in range(5)], balance=balance)
+    if name:
+        acct["name"] = name
+    return make_payload(acct, make_account("ACT-2", balance=50.0))
+
+
+@pytest.fixture
+def written_rows(db):
+    """{table: rows written} for every write statement run while it is active."""
+    counts: dict[str, int] = {}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        verb, _, rest = statement.lstrip().partition(" ")
+        if verb in WRITES and cursor.rowcount > 0:
+            table = rest.split()[1] if verb in ("INSERT", "DELETE") else rest.split()[0]
+            counts[table.strip('"')] = counts.get(table.strip('"'), 0) + cursor.rowcount
+
+    event.listen(db.engine, "after_cursor_execute", on_execute)
+    yield counts
+    event.remove(db.engine, "after_cursor_execute", on_execute)
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_unchanged_ingest_writes_nothing(ingest, written_rows, bulk):
+    ingest(_payload(), bulk=bulk)
+    assert {"account", "balance", "transaction"} <= set(written_rows)
+    written_rows.clear()
+
+    ingest(_payload(), bulk=bulk)
+    # only the run's own query log entry
+    assert written_rows == {"query_log": 1}
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_changed_rows_are_rewritten(db, ingest, written_rows, bulk):
+    ingest(_payload(), bulk=bulk)
+    written_rows.clear()
+
+    # the same-day balance changed, and the account was renamed
+    ingest(_payload(balance=125.0, name="Renamed"), bulk=bulk)
+    assert written_rows.get("account") == 1
+    assert written_rows.get("balance") == 1
+    assert "transaction" not in written_rows
+
+    db.session.expire_all()
+    assert db.session.get(Account, "ACT-1").name == "Renamed"
+    assert db.session.scalars(select(Balance.balance).where(Balance.account_id == "ACT-1")).all() == [125.0]
+    latest = {row["account"]["id"]: row["balance"] for row in db.get_latest_balances()}
+    assert latest == {"ACT-1": 125.0, "ACT-2": 50.0}
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+
+import pytest
+
+from conftest import make_account, make_payload, make_tx
+from simplefin_archiver.export import iter_export
+
+
+@pytest.fixture
+def seeded(ingest):
+    txs = [make_tx(f"TX-{i}", day=i, amount=-(i + 1)) for i in range(5)]
+    ingest(make_payload(make_account("ACT-1", txs[:3]), make_account("ACT-2", txs[3:])))
+
+
+def test_csv_is_streamed_per_batch(db, seeded):
+    with db.engine.connect() as conn:
+        chunks = list(iter_export(conn, "transactions", "csv", batch_size=2))
+    assert len(chunks) == 3
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    # oldest first, raw payloads left out
+    assert [row["id"] for row in rows] == ["TX-4", "TX-3", "TX-2", "TX-1", "TX-0"]
+    assert "raw_json" not in rows[0]
+
+
+def test_ndjson_filters(db, seeded):
+    with db.engine.connect() as conn:
+        body = b"".join(iter_export(conn, "transactions", "ndjson", account_id="ACT-2", batch_size=1))
+    rows = [json.loads(line) for line in body.decode().splitlines()]
+    assert [(row["id"], row["amount"]) for row in rows] == [("TX-4", -5.0), ("TX-3", -4.0)]
+
+
+def test_empty_csv_has_a_header(db):
+    with db.engine.connect() as conn:
+        body = b"".join(iter_export(conn, "balances", "csv"))
+    assert body.decode().strip() == "id,account_id,balance_date,balance,available_balance"
+
+
+def test_export_endpoint(client, seeded):
+    resp = client.get("/export/transactions", params={"format": "ndjson", "batch_size": 2})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="transactions.ndjson"' in resp.headers["content-disposition"]
+    assert len(resp.text.splitlines()) == 5
+
+    resp = client.get("/export/balances")
+    assert resp.headers["content-type"].startswith("text/csv")
+    assert len(resp.text.splitlines()) == 3
+
+
+def test_bad_exports_are_rejected(client):
+    assert client.get("/export/accounts").status_code == 400
+    assert client.get("/export/transactions", params={"format": "xml"}).status_code == 400
+    assert client.get("/export/transactions", params={"batch_size": 0}).status_code == 422
+
+
+def test_parquet_without_pyarrow(client, monkeypatch):
+    import builtins
+
+    real_import = builtins.__import__
+
+    def no_pyarrow(name, *args, **kwargs):
+        if name.startswith("pyarrow"):
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_pyarrow)
+    resp = client.get("/export/transactions", params={"format": "parquet"})
+    assert resp.status_code == 501
+    assert "pyarrow" in resp.json()["detail"]
+
+
+def test_parquet_roundtrip(db, seeded):
+    pq = pytest.importorskip("pyarrow.parquet")
+    with db.engine.connect() as conn:
+        body = b"".join(iter_export(conn, "transactions", "parquet", batch_size=2))
+    table = pq.read_table(io.BytesIO(body))
+    assert table.num_rows == 5
+    assert table.column("id").to_pylist()[0] == "TX-4"
@@ -0,0 +1,115 @@
+import json
+import re
+
+import pytest
+from sqlalchemy import event, func, select
+
+from simplefin_archiver import SimpleFIN, SimpleFIN_DB
+from simplefin_archiver.models import Account, Balance, Transaction
+
+from conftest import make_account, make_payload, make_response, make_tx
+
+IN_LIST = re.compile(r" IN \(([^)]*)\)")
+
+
+def _payload(n_tx: int = 12, amount: float = -10.0) -> dict:
+    txs = [make_tx(f"TX-{i:03d}", day=i, amount=amount) for i in range(n_tx)]
+    return make_payload(make_account("ACT-1", txs[::2]), make_account("ACT-2", txs[1::2]))
+
+
+def _snapshot(db) -> dict:
+    return {
+        "accounts": db.session.execute(select(Account.id, Account.name).order_by(Account.id)).all(),
+        "balances": db.session.execute(select(Balance.id, Balance.balance).order_by(Balance.id)).all(),
+        "transactions": db.session.execute(
+            select(Transaction.id, Transaction.account_id, Transaction.amount, Transaction.posted)
+            .order_by(Transaction.id)
+        ).all(),
+    }
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_ingest_is_idempotent(db, ingest, bulk):
+    ingest(_payload(), bulk=bulk)
+    first = _snapshot(db)
+    ingest(_payload(), bulk=bulk)
+    assert _snapshot(db) == first
+    assert len(first["transactions"]) == 12
+    assert db.session.scalar(select(func.count()).select_from(Balance)) == 2
+
+
+def test_bulk_and_merge_paths_agree(db_url, simplefin):
+    snapshots = []
+    for bulk, as_rows in ((True, True), (True, False), (False, False), (False, True)):
+        with SimpleFIN_DB(connection_str=db_url) as db:
+            db.session.execute(Transaction.__table__.delete())
+            db.session.execute(Balance.__table__.delete())
+            db.session.commit()
+            qr = simplefin(make_response(_payload()), as_rows=as_rows).query_accounts(30)
+            db.commit_query_result(qr, bulk=bulk)
+            snapshots.append(_snapshot(db))
+    assert all(snapshot == snapshots[0] for snapshot in snapshots)
+
+
+def test_ingest_rolls_back_on_error(db, simplefin, monkeypatch):
+    qr = simplefin(make_response(_payload())).query_accounts(30)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(db, "_update_latest_balances", fail)
+    with pytest.raises(RuntimeError):
+        db.commit_query_result(qr)
+    assert db.session.scalar(select(func.count()).select_from(Transaction)) == 0
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_existence_checks_are_chunked(db_url, simplefin, bulk):
+    n_tx, chunk = 23, 5
+    with SimpleFIN_DB(connection_str=db_url, lookup_chunk_size=chunk, batch_size=4) as db:
+        db.commit_query_result(simplefin(make_response(_payload(n_tx))).query_accounts(30), bulk=bulk)
+
+        in_lists: list[int] = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            in_lists.extend(group.count("?") for group in IN_LIST.findall(statement))
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            # a changed amount sends every transaction through the lookups again
+            db.commit_query_result(simplefin(make_response(_payload(n_tx, -11.0))).query_accounts(30), bulk=bulk)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+        assert in_lists and max(in_lists) == chunk
+        amounts = db.session.scalars(select(Transaction.amount).distinct()).all()
+        assert amounts == [-11.0]
+
+
+def test_rows_match_orm_transactions():
+    acct = make_account("ACT-1", [
+        make_tx("TX-1", day=1, pending=True),
+        {**make_tx("TX-2", day=2), "transacted_at": None},
+    ])
+    rows = SimpleFIN._get_transaction_rows(acct)
+    txs = SimpleFIN._get_transactions(acct)
+    columns = [col.key for col in Transaction.__table__.columns]
+    assert rows == [{key: getattr(tx, key) for key in columns} for tx in txs]
+
+    assert json.loads(rows[0]["extra_attrs"]) == {"pending": True}
+    assert rows[1]["transacted_at"] == rows[1]["posted"]  # falls back to posted
+
+
+def test_bulk_rows_build_no_orm_transactions(db, ingest):
+    built = []
+
+    def on_init(target, args, kwargs):
+        built.append(target)
+
+    event.listen(Transaction, "init", on_init)
+    try:
+        ingest(_payload(), bulk=True, as_rows=True)
+    finally:
+        event.remove(Transaction, "init", on_init)
+    assert built == []
+    assert db.session.scalar(select(func.count()).select_from(Transaction)) == 12
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from simplefin_archiver.api import api
+from simplefin_archiver.db import ARCHIVE_JOB, JOB_FAILED, JOB_RUNNING, JOB_SUCCEEDED
+from simplefin_archiver.models import JobLock
+
+
+def test_second_trigger_is_coalesced(db):
+    job, acquired = db.acquire_job(ARCHIVE_JOB, "cli")
+    again, acquired_again = db.acquire_job(ARCHIVE_JOB, "api")
+    assert acquired and not acquired_again
+    assert again.id == job.id
+
+    # other kinds have their own lock
+    assert db.acquire_job("other")[1]
+
+
+def test_finishing_releases_the_lock(db):
+    job, _ = db.acquire_job(ARCHIVE_JOB)
+    db.finish_job(job.id, JOB_SUCCEEDED, n_accounts=2, n_transactions=5)
+    assert db.session.get(JobLock, ARCHIVE_JOB) is None
+    done = db.get_job(job.id)
+    assert (done.status, done.n_accounts, done.n_transactions) == (JOB_SUCCEEDED, 2, 5)
+    assert done.finished_at is not None
+
+    second, acquired = db.acquire_job(ARCHIVE_JOB)
+    assert acquired and second.id != job.id
+
+
+def test_expired_lock_is_taken_over(db):
+    stale, _ = db.acquire_job(ARCHIVE_JOB, ttl=timedelta(seconds=-1))
+    job, acquired = db.acquire_job(ARCHIVE_JOB)
+    assert acquired and job.id != stale.id
+    db.session.expire_all()
+    assert db.get_job(stale.id).status == JOB_FAILED
+    assert db.session.get(JobLock, ARCHIVE_JOB).job_id == job.id
+
+
+def test_heartbeat_extends_the_lock(db):
+    job, _ = db.acquire_job(ARCHIVE_JOB, ttl=timedelta(seconds=-1))
+    db.heartbeat_job(job.id)
+    assert not db.acquire_job(ARCHIVE_JOB)[1]
+
+
+def test_trigger_endpoint_coalesces(client, monkeypatch):
+    runs = []
+    monkeypatch.setattr(api, "run_archiver_backend", lambda **kwargs: runs.append(kwargs))
+
+    first = client.post("/trigger_update")
+    assert first.status_code == 202
+    assert first.json()["coalesced"] is False
+    # the background run above never finished, so the lock is still held
+    second = client.post("/trigger_update").json()
+    assert second["coalesced"] is True
+    assert second["job"]["id"] == first.json()["job"]["id"]
+    assert [run["job_id"] for run in runs] == [first.json()["job"]["id"]]
+
+    job = client.get(f"/jobs/{second['job']['id']}").json()
+    assert (job["status"], job["trigger"]) == (JOB_RUNNING, "api")
+    assert client.get("/jobs/missing").status_code == 404
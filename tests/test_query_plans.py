@@ -0,0 +1,25 @@
+import pytest
+
+
+def _plan(db, stmt) -> str:
+    return "\n".join(db.explain(stmt))
+
+
+@pytest.mark.parametrize("account_id, index", [
+    ("ACT-1", "ix_transaction_account_id_transacted_at"),
+    (None, "ix_transaction_transacted_at_id"),
+])
+def test_transactions_query_uses_index(db, account_id, index):
+    plan = _plan(db, db.transactions_query(account_id))
+    assert index in plan
+    assert "TEMP B-TREE" not in plan  # the index supplies the order
+
+
+@pytest.mark.parametrize("account_id, index", [
+    ("ACT-1", "ix_balance_account_id_balance_date"),
+    (None, "ix_balance_balance_date_id"),
+])
+def test_balances_query_uses_index(db, account_id, index):
+    plan = _plan(db, db.balances_query(account_id))
+    assert index in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,64 @@
+import json
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from conftest import NOW, make_account, make_payload, make_tx
+from simplefin_archiver.models import Transaction, TransactionRevision, TransactionRollup
+
+
+def _ingest_tx(ingest, bulk: bool, **fields) -> None:
+    txs = [make_tx("TX-1", day=1, **fields), make_tx("TX-2", day=2)]
+    ingest(make_payload(make_account("ACT-1", txs)), bulk=bulk)
+
+
+def _revisions(db) -> list[TransactionRevision]:
+    stmt = select(TransactionRevision).order_by(TransactionRevision.id)
+    return db.session.scalars(stmt).all()
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_changed_transaction_keeps_its_old_version(db, ingest, bulk):
+    _ingest_tx(ingest, bulk, amount=-10.0, pending=True)
+    _ingest_tx(ingest, bulk, amount=-10.0, pending=True)
+    assert _revisions(db) == []
+
+    _ingest_tx(ingest, bulk, amount=-12.5)
+    _ingest_tx(ingest, bulk, amount=-12.75)
+    revisions = _revisions(db)
+    assert [(rev.transaction_id, rev.amount) for rev in revisions] == [("TX-1", -10.0), ("TX-1", -12.5)]
+    assert json.loads(revisions[0].raw_json)["pending"] is True
+    assert revisions[0].account_id == "ACT-1"
+
+    db.session.expire_all()
+    assert db.session.get(Transaction, "TX-1").amount == -12.75
+    assert db.session.get(Transaction, "TX-2").amount == -10.0
+
+
+def test_revision_keeps_hand_edited_columns(db, ingest):
+    _ingest_tx(ingest, True)
+    db.session.execute(
+        update(Transaction).where(Transaction.id == "TX-1").values(category="food", notes="team lunch")
+    )
+    db.session.commit()
+
+    _ingest_tx(ingest, True, amount=-20.0)
+    db.session.expire_all()
+    tx = db.session.get(Transaction, "TX-1")
+    assert (tx.amount, tx.category, tx.notes) == (-20.0, "food", "team lunch")
+
+
+def test_revision_moves_rollups(db, ingest):
+    _ingest_tx(ingest, True)
+    # the transaction settles with a different date and amount
+    moved = int((NOW - timedelta(days=5)).timestamp())
+    _ingest_tx(ingest, True, amount=-30.0, transacted_at=moved)
+
+    rows = db.session.execute(
+        select(TransactionRollup.bucket_start, TransactionRollup.total)
+        .where(TransactionRollup.granularity == "day")
+        .order_by(TransactionRollup.bucket_start)
+    ).all()
+    days = [(NOW - timedelta(days=d)).replace(hour=0) for d in (5, 2)]
+    assert rows == [(days[0], -30.0), (days[1], -10.0)]
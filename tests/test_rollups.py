@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from sqlalchemy import event, select
+
+from conftest import make_account, make_payload, make_tx
+from simplefin_archiver.models import TransactionRollup
+from simplefin_archiver.rollups import bucket_start
+
+
+def _snapshot(db) -> set[tuple]:
+    rows = db.session.scalars(select(TransactionRollup)).all()
+    return {(r.granularity, r.bucket_start, r.account_id, r.category, r.total, r.tx_count) for r in rows}
+
+
+def test_bucket_start():
+    ts = datetime(2026, 1, 15, 13, 30)  # a Thursday
+    assert bucket_start(ts, "day") == datetime(2026, 1, 15)
+    assert bucket_start(ts, "week") == datetime(2026, 1, 12)
+    assert bucket_start(ts, "month") == datetime(2026, 1, 1)
+
+
+def test_incremental_refresh_matches_rebuild(db, ingest):
+    txs = [make_tx(f"TX-{i:02d}", day=i * 3, amount=-(i + 1)) for i in range(20)]
+    ingest(make_payload(make_account("ACT-1", txs[:12]), make_account("ACT-2", txs[12:])), days_history=90)
+    # re-ingest with a changed amount and a new transaction
+    txs[3] = make_tx("TX-03", day=9, amount=-50)
+    txs.append(make_tx("TX-NEW", day=1, amount=5))
+    ingest(make_payload(make_account("ACT-1", txs[:12] + txs[-1:])), days_history=90)
+
+    incremental = _snapshot(db)
+    db.rebuild_rollups()
+    db.session.expire_all()
+    assert _snapshot(db) == incremental
+
+    day = {(r[1], r[2]): r[4] for r in incremental if r[0] == "day"}
+    assert day[(datetime(2025, 12, 23), "ACT-1")] == -50.0
+
+
+def test_stale_buckets_are_cleared_in_chunks(db, ingest):
+    db.lookup_chunk_size = 4
+    deletes: list[int] = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("DELETE FROM transaction_rollup"):
+            deletes.append(len(parameters))
+
+    event.listen(db.engine, "before_cursor_execute", on_execute)
+    try:
+        txs = [make_tx(f"TX-{i:02d}", day=i) for i in range(10)]
+        ingest(make_payload(make_account("ACT-1", txs)))
+    finally:
+        event.remove(db.engine, "before_cursor_execute", on_execute)
+
+    # 10 day buckets need 3 deletes of at most 4 starts (+ granularity and account)
+    assert len(deletes) >= 3 and max(deletes) <= 4 + 2
+    assert sum(1 for r in _snapshot(db) if r[0] == "day") == 10
+
+
+def test_rollup_report(client, ingest):
+    ingest(make_payload(make_account("ACT-1", [make_tx("TX-1", day=1, amount=-5), make_tx("TX-2", day=1)])))
+    rows = client.get("/reports/rollup", params={"granularity": "day"}).json()
+    assert [(row["total"], row["tx_count"]) for row in rows] == [(-15.0, 2)]
+    assert client.get("/reports/rollup", params={"granularity": "year"}).status_code == 400
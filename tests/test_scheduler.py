@@ -0,0 +1,112 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from simplefin_archiver.scheduler import CronSchedule, Scheduler
+
+
+@pytest.mark.parametrize("expr, after, expected", [
+    ("*/15 * * * *", datetime(2026, 1, 1, 10, 7, 30), datetime(2026, 1, 1, 10, 15)),
+    ("0 6 * * *", datetime(2026, 1, 1, 6, 0), datetime(2026, 1, 2, 6, 0)),  # strictly after
+    ("@daily", datetime(2026, 1, 1, 23, 59), datetime(2026, 1, 2, 0, 0)),
+    ("30 8 * * mon-fri", datetime(2026, 1, 2, 9, 0), datetime(2026, 1, 5, 8, 30)),  # Fri -> Mon
+    ("0 0 * * 7", datetime(2026, 1, 1), datetime(2026, 1, 4)),  # 7 is Sunday too
+    ("0 0 1 feb *", datetime(2026, 1, 15), datetime(2026, 2, 1)),
+    ("0 0 29 2 *", datetime(2026, 1, 1), datetime(2028, 2, 29)),
+    # both day fields restricted: either one fires
+    ("0 0 13 * fri", datetime(2026, 1, 1), datetime(2026, 1, 2)),
+])
+def test_next_after(expr, after, expected):
+    assert CronSchedule(expr).next_after(after) == expected
+
+
+@pytest.mark.parametrize("expr", ["* * * *", "60 * * * *", "* * * * mon-", "*/0 * * * *", "0 0 * foo *"])
+def test_invalid_expressions(expr):
+    with pytest.raises(ValueError):
+        CronSchedule(expr)
+
+
+def test_impossible_date_never_fires():
+    with pytest.raises(ValueError, match="never fires"):
+        CronSchedule("0 0 30 2 *").next_after(datetime(2026, 1, 1))
+
+
+class EveryFewMs:
+    """Stands in for CronSchedule, firing every `ms` milliseconds."""
+
+    expr = "test"
+
+    def __init__(self, ms: int = 10):
+        self.interval = timedelta(milliseconds=ms)
+
+    def next_after(self, after: datetime) -> datetime:
+        return after + self.interval
+
+
+def _wait_for(condition, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_overlapping_ticks_are_skipped():
+    release = threading.Event()
+    calls = []
+
+    def job():
+        calls.append(datetime.now())
+        release.wait(5)
+
+    scheduler = Scheduler(EveryFewMs(), job)
+    scheduler.start()
+    try:
+        _wait_for(lambda: scheduler.running)
+        time.sleep(0.1)  # several ticks pass while the run is blocked
+        assert len(calls) == 1
+        assert scheduler.status()["running"] is True
+    finally:
+        release.set()
+        scheduler.stop(timeout=5)
+    assert not scheduler.running
+    assert scheduler.last_finished is not None
+
+
+def test_failed_run_is_recorded():
+    scheduler = Scheduler(EveryFewMs(), lambda: 1 / 0)
+    scheduler.start()
+    try:
+        _wait_for(lambda: scheduler.last_finished is not None)
+    finally:
+        scheduler.stop(timeout=5)
+    assert scheduler.last_error == "division by zero"
+
+
+def test_scheduler_endpoint_when_disabled(client):
+    assert client.get("/scheduler").json() == {
+        "enabled": False, "schedule": None, "running": False, "next_run": None,
+        "last_run": None, "last_finished": None, "last_error": None,
+    }
+
+
+def test_scheduler_endpoint_when_enabled(db_url, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from conftest import API_KEY
+    from simplefin_archiver.api.api import app
+
+    monkeypatch.delenv("POSTGRES_PASSWORD", raising=False)
+    monkeypatch.setenv("SIMPLEFIN_DB_PATH", db_url.removeprefix("sqlite:///"))
+    monkeypatch.setenv("ARCHIVER_API_KEY", API_KEY)
+    monkeypatch.setenv("IN_PROCESS_SCHEDULER", "true")
+    monkeypatch.setenv("CRON_SCHEDULE", "@yearly")
+    with TestClient(app, headers={"X-API-Key": API_KEY}) as client:
+        scheduler = app.state.scheduler
+        _wait_for(lambda: scheduler.next_run is not None)
+        status = client.get("/scheduler").json()
+    assert status["enabled"] is True and status["schedule"] == "@yearly"
+    assert status["running"] is False and status["last_run"] is None
+    assert datetime.fromisoformat(status["next_run"]).strftime("%m-%d %H:%M") == "01-01 00:00"
+    assert not scheduler._thread.is_alive()  # stopped with the app
@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import select, text
+
+from simplefin_archiver import db as db_module
+from simplefin_archiver.models import Transaction
+from simplefin_archiver.search import apply_search, create_search_index, drop_search_index
+
+from conftest import make_account, make_payload, make_tx
+
+
+def _ids(rows) -> list[str]:
+    return sorted(row["id"] for row in rows)
+
+
+def _seed(ingest) -> None:
+    ingest(make_payload(make_account("ACT-1", [
+        make_tx("TX-1", day=1, description="STARBUCKS STORE 123", payee="Starbucks"),
+        make_tx("TX-2", day=2, description="AMAZON MKTPLACE", payee="Amazon", memo="birthday gift"),
+        make_tx("TX-3", day=3, description="STARLINK SATELLITE", payee="Starlink"),
+    ])))
+
+
+def test_every_term_matches_as_a_prefix(db, ingest):
+    _seed(ingest)
+    assert _ids(db.search_transactions("star")) == ["TX-1", "TX-3"]
+    assert _ids(db.search_transactions("STAR sat")) == ["TX-3"]
+    assert _ids(db.search_transactions("gift")) == ["TX-2"]  # memo
+    assert db.search_transactions("walmart") == []
+
+
+def test_index_follows_changes(db, ingest):
+    _seed(ingest)
+    changed = make_tx("TX-1", day=1, description="PEETS COFFEE", payee="Peets")
+    ingest(make_payload(make_account("ACT-1", [changed])))
+    assert _ids(db.search_transactions("starbucks")) == []
+    assert _ids(db.search_transactions("peets")) == ["TX-1"]
+
+    db.session.execute(text("DELETE FROM \"transaction\" WHERE id = 'TX-3'"))
+    db.session.commit()
+    assert _ids(db.search_transactions("star")) == []
+
+
+def test_index_survives_vacuum_and_rebuild(db, ingest):
+    _seed(ingest)
+    # VACUUM may renumber implicit rowids; the index is keyed on its own docids
+    db.session.execute(text("DELETE FROM \"transaction\" WHERE id = 'TX-1'"))
+    db.session.commit()
+    with db.engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    ingest(make_payload(make_account("ACT-1", [make_tx("TX-4", day=4, description="STARBUCKS RESERVE")])))
+    assert _ids(db.search_transactions("starbucks")) == ["TX-4"]
+
+    db.rebuild_search_index()
+    assert _ids(db.search_transactions("star")) == ["TX-3", "TX-4"]
+
+
+def test_search_pages_are_unique(client, ingest):
+    ingest(make_payload(make_account("ACT-1", [
+        make_tx(f"TX-{i:02d}", day=i % 5, description=f"COFFEE {'COFFEE ' * (i % 3)}SHOP") for i in range(11)
+    ])))
+    rows, cursor = [], None
+    while True:
+        params = {"q": "coffee", "limit": 3, **({"cursor": cursor} if cursor else {})}
+        resp = client.get("/transactions/search", params=params)
+        assert resp.status_code == 200, resp.text
+        rows += resp.json()
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len({row["id"] for row in rows}) == len(rows) == 11
+    keys = [(row["rank"], row["id"]) for row in rows]
+    assert keys == sorted(keys)
+
+
+def test_bad_queries_are_rejected(client, ingest):
+    _seed(ingest)
+    assert client.get("/transactions/search", params={"q": "!!!"}).status_code == 400
+    assert client.get("/transactions/search", params={"q": "star", "cursor": "junk"}).status_code == 400
+    assert client.get("/transactions/search").status_code == 422
+
+
+class _OtherDialect:
+    """A connection to a database without full-text search support."""
+
+    class dialect:
+        name = "mysql"
+
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, stmt):
+        self.executed.append(stmt)
+
+
+def test_unsupported_databases_skip_the_index_and_reject_searches(client, monkeypatch, caplog):
+    conn = _OtherDialect()
+    create_search_index(conn)
+    drop_search_index(conn)
+    assert conn.executed == []
+    assert "not supported on mysql" in caplog.text
+
+    with pytest.raises(NotImplementedError):
+        apply_search(select(Transaction.id), "mysql", "coffee")
+
+    monkeypatch.setattr(db_module, "apply_search", lambda stmt, dialect, q: apply_search(stmt, "mysql", q))
+    assert client.get("/transactions/search", params={"q": "coffee"}).status_code == 501
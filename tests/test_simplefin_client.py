@@ -0,0 +1,68 @@
+import pytest
+import requests
+
+from simplefin_archiver.simplefin import MAX_BACKOFF, build_session
+
+from conftest import make_account, make_payload, make_response
+
+PAYLOAD = make_payload(make_account("ACT-1"))
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays: list[float] = []
+    monkeypatch.setattr("simplefin_archiver.simplefin.time.sleep", delays.append)
+    return delays
+
+
+def test_retryable_status_is_retried(simplefin, sleeps):
+    client = simplefin(make_response("", 503), make_response("", 502), make_response(PAYLOAD), retries=3)
+    qr = client.query_accounts(7)
+    assert [acct.id for acct in qr.accounts] == ["ACT-1"]
+    assert [attempt.status for attempt in client.attempts] == [503, 502, 200]
+    assert len(sleeps) == 2
+
+
+def test_backoff_grows_and_is_capped(simplefin, sleeps, monkeypatch):
+    monkeypatch.setattr("simplefin_archiver.simplefin.random.uniform", lambda lo, hi: hi)
+    responses = [make_response("", 503) for _ in range(8)] + [make_response(PAYLOAD)]
+    simplefin(*responses, retries=8, backoff=1.0).query_accounts(7)
+    assert sleeps == [1, 2, 4, 8, 16, MAX_BACKOFF, MAX_BACKOFF, MAX_BACKOFF]
+
+
+def test_retry_after_is_honoured(simplefin, sleeps):
+    client = simplefin(make_response("", 429, {"Retry-After": "7"}), make_response(PAYLOAD), backoff=0.01)
+    client.query_accounts(7)
+    assert sleeps == [7.0]
+
+
+def test_connection_errors_are_retried_then_raised(simplefin, sleeps):
+    client = simplefin(*(requests.ConnectionError("reset") for _ in range(3)), retries=2)
+    with pytest.raises(requests.ConnectionError):
+        client.query_accounts(7)
+    assert [attempt.status for attempt in client.attempts] == [None, None, None]
+    assert all("reset" in attempt.error for attempt in client.attempts)
+    assert len(sleeps) == 2
+
+
+def test_client_errors_are_not_retried(simplefin, sleeps):
+    client = simplefin(make_response("forbidden", 403), retries=3)
+    with pytest.raises(Exception, match="403"):
+        client.query_accounts(7)
+    assert len(client.attempts) == 1 and sleeps == []
+
+
+def test_credentials_go_on_each_request(simplefin):
+    client = simplefin(make_response(PAYLOAD), make_response(PAYLOAD))
+    client.query_accounts(7, account_ids=["ACT-1"])
+    client.query_accounts(7)
+    calls = client.session.calls
+    assert [call["auth"] for call in calls] == [("user", "secret")] * 2
+    assert calls[0]["params"]["account"] == ["ACT-1"] and "account" not in calls[1]["params"]
+
+
+def test_build_session_pools_connections():
+    session = build_session(pool_size=6)
+    adapter = session.get_adapter("https://bridge.example.com")
+    assert adapter._pool_maxsize == 6
+    assert adapter.max_retries.total == 0  # retries are ours, with logging and backoff
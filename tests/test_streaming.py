@@ -0,0 +1,100 @@
+import json
+
+import pytest
+from sqlalchemy import select
+
+from simplefin_archiver import compression
+from simplefin_archiver.models import QueryLog
+from simplefin_archiver.simplefin import JSONArrayStream
+
+from conftest import make_account, make_payload, make_response, make_tx
+
+DOC = {
+    "errors": ["a \"quoted\" note", {"nested": [1, 2, {"x": "]}"}]}],
+    "accounts": [
+        {"id": "A", "name": "café ☃", "balance": "12.50", "n": 1234567890123},
+        {"id": "B", "name": "back\\slash", "list": [], "obj": {}},
+        {"id": "C", "values": [1.5e-3, -0.0, True, None]},
+    ],
+    "trailer": 42,
+}
+
+
+def _chunks(text: str, size: int):
+    return iter(text[i:i + size] for i in range(0, len(text), size))
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10**6])
+def test_array_elements_survive_any_chunking(size):
+    text = json.dumps(DOC, ensure_ascii=False)
+    assert list(JSONArrayStream(_chunks(text, size)).iter_array("accounts")) == DOC["accounts"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"accounts": []}', []),
+    ('{}', []),
+    ('{"other": 1}', []),
+    ('  {"accounts" :[ 7 , 8 ]}  ', [7, 8]),
+])
+def test_array_edge_cases(text, expected):
+    assert list(JSONArrayStream(_chunks(text, 2)).iter_array("accounts")) == expected
+
+
+@pytest.mark.parametrize("text", [
+    '{"accounts": [1, 2',
+    '{"accounts": [1; 2]}',
+    '["accounts"]',
+    '{"accounts": [1}',
+])
+def test_malformed_stream_raises(text):
+    with pytest.raises(ValueError):
+        list(JSONArrayStream(_chunks(text, 3)).iter_array("accounts"))
+
+
+@pytest.fixture
+def codec(request, monkeypatch):
+    monkeypatch.setenv(compression.COMPRESSION_ENV, request.param)
+    compression.get_codec.cache_clear()
+    yield request.param
+    compression.get_codec.cache_clear()
+
+
+def _payload() -> dict:
+    return make_payload(
+        make_account("ACT-1", [make_tx(f"TX-{i}", day=i, description="café über") for i in range(30)]),
+        make_account("ACT-2", [make_tx("TX-X", day=1)]),
+    )
+
+
+@pytest.mark.parametrize("codec", ["none", "gzip"], indirect=True)
+def test_stream_matches_buffered_parse(simplefin, monkeypatch, codec):
+    # small chunks, so accounts and multi-byte characters straddle them
+    monkeypatch.setattr("simplefin_archiver.simplefin.STREAM_CHUNK_SIZE", 37)
+    body = json.dumps(_payload(), ensure_ascii=False)
+    full = simplefin(make_response(body)).query_accounts(30)
+    parts = list(simplefin(make_response(body)).stream_accounts(30))
+
+    *accounts, last = parts
+    assert [part.querylog for part in accounts] == [None, None]
+    assert [a.id for part in accounts for a in part.accounts] == [a.id for a in full.accounts]
+    streamed = [(t.id, t.amount, t.description) for part in accounts for t in part.transactions]
+    assert streamed == [(t.id, t.amount, t.description) for t in full.transactions]
+
+    raw = last.querylog.raw_response
+    assert isinstance(raw, bytes)
+    assert raw.startswith(compression.GZIP_MAGIC) == (codec == "gzip")
+    assert compression.decompress(raw) == body
+
+
+@pytest.mark.parametrize("codec", ["gzip"], indirect=True)
+def test_streamed_query_log_round_trips(db, simplefin, codec):
+    body = json.dumps(_payload())
+    for part in simplefin(make_response(body)).stream_accounts(30):
+        db.commit_query_result(part)
+    db.session.expire_all()
+    assert db.session.scalars(select(QueryLog.raw_response)).one() == body
+
+
+def test_stream_without_accounts_raises(simplefin):
+    with pytest.raises(Exception, match="No accounts found"):
+        list(simplefin(make_response({"errors": [], "accounts": []})).stream_accounts(30))
@@ -0,0 +1,213 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+
+from simplefin_archiver import db as db_module
+from simplefin_archiver.db import VENMO_FAILED, VENMO_TRANSACTION
+from simplefin_archiver.models import Transaction, VenmoMessage
+from simplefin_archiver.venmo import imap, venmo_txs
+from simplefin_archiver.venmo.venmo_txs import get_venmo_txs
+
+ADDRESS = "me@example.com"
+
+
+@dataclass
+class FakeMessage:
+    """The parts of imap_tools.MailMessage the importer reads."""
+
+    uid: str
+    subject: str
+    html: str = ""
+    date: datetime = datetime(2026, 1, 1, 12)
+    headers: dict = field(default_factory=dict)
+
+
+def payment(uid: int, tx_id: int, amount: str = "12.50", message_id: str = None) -> FakeMessage:
+    html = (
+        "<p>Dinner</p><p>See transaction</p>"
+        f"<h3>Transaction ID</h3><p>{tx_id}</p>"
+    )
+    headers = {"message-id": (f"<{message_id or uid}@venmo.com>",)}
+    return FakeMessage(str(uid), f"Alice paid you ${amount}", html, headers=headers)
+
+
+def newsletter(uid: int) -> FakeMessage:
+    return FakeMessage(str(uid), "New Venmo features", headers={"message-id": (f"<news-{uid}@venmo.com>",)})
+
+
+class FakeFolder:
+    def __init__(self, mailbox: "FakeMailBox"):
+        self.mailbox = mailbox
+
+    def get(self) -> str:
+        return "INBOX"
+
+    def status(self, options=None) -> dict:
+        uid_next = max((int(msg.uid) for msg in self.mailbox.messages), default=0) + 1
+        return {"UIDVALIDITY": self.mailbox.uid_validity, "UIDNEXT": uid_next}
+
+
+class FakeMailBox:
+    """
+    Stands in for imap_tools.MailBox, serving `messages` and recording each
+    fetch as ("headers", criteria) or ("bodies", [uid, ...]).
+    """
+
+    def __init__(self, *messages: FakeMessage, uid_validity: int = 1):
+        self.messages = list(messages)
+        self.uid_validity = uid_validity
+        self.folder = FakeFolder(self)
+        self.fetches: list[tuple] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _search(self, criteria) -> list[FakeMessage]:
+        by_uid = re.search(r"UID (\d+):\*", str(criteria))
+        if by_uid:
+            # like a server, "N:*" always includes the newest message
+            min_uid, newest = int(by_uid.group(1)), self.messages[-1:]
+            return [msg for msg in self.messages if int(msg.uid) >= min_uid or msg in newest]
+        assert "SINCE" in str(criteria)
+        return list(self.messages)
+
+    def fetch(self, criteria=None, mark_seen=True, headers_only=False, bulk=False, uid_list=None):
+        assert mark_seen is False
+        if uid_list is not None:
+            self.fetches.append(("bodies", list(uid_list)))
+            return iter([msg for msg in self.messages if msg.uid in uid_list])
+        assert headers_only
+        self.fetches.append(("headers", str(criteria)))
+        return iter(self._search(criteria))
+
+    def bodies(self) -> list[str]:
+        return [uid for kind, uids in self.fetches if kind == "bodies" for uid in uids]
+
+
+@pytest.fixture
+def mailbox(monkeypatch):
+    """Route the importer to the given FakeMailBox."""
+    def use(box: FakeMailBox) -> FakeMailBox:
+        monkeypatch.setattr(imap, "open_mailbox", lambda addr, passwd: box)
+        monkeypatch.setattr(venmo_txs, "open_mailbox", lambda addr, passwd: box)
+        return box
+    return use
+
+
+def test_bodies_are_fetched_only_for_transactions(mailbox):
+    box = mailbox(FakeMailBox(
+        payment(1, 101), newsletter(2), payment(3, 103), payment(4, 104), newsletter(5), payment(6, 106),
+    ))
+    msgs = list(imap.iter_emails(ADDRESS, "pw", date(2025, 12, 1), venmo_txs.is_tx_subject, batch_size=3))
+    assert [msg.uid for msg in msgs] == ["1", "3", "4", "6"]
+    # one header search, then the candidates' bodies in batches
+    assert box.fetches == [
+        ("headers", '(SINCE 1-Dec-2025 FROM "venmo@venmo.com")'),
+        ("bodies", ["1", "3", "4"]),
+        ("bodies", ["6"]),
+    ]
+
+
+def test_transactions_are_parsed_without_a_db(mailbox):
+    mailbox(FakeMailBox(payment(1, 101, "1,234.56"), newsletter(2)))
+    txs = get_venmo_txs(ADDRESS, "pw", date(2025, 12, 1))
+    assert [(tx.id, tx.amount, tx.payee, tx.description) for tx in txs] == [("101", 1234.56, "Alice", "Dinner")]
+
+
+@pytest.fixture
+def venmo(db, mailbox):
+    """Run the checkpointed import of `box` into the test DB."""
+    def run(box: FakeMailBox, **kwargs):
+        mailbox(box)
+        return get_venmo_txs(ADDRESS, "pw", date(2025, 12, 1), db=db, account_id="VENMO", **kwargs)
+    return run
+
+
+def _ledger(db) -> dict[str, str]:
+    return {msg.message_id: msg.outcome for msg in db.session.scalars(select(VenmoMessage))}
+
+
+def test_account_id_is_required(db):
+    with pytest.raises(ValueError):
+        get_venmo_txs(ADDRESS, "pw", db=db)
+
+
+def test_first_run_checkpoints_and_stores(db, venmo):
+    box = FakeMailBox(payment(1, 101), newsletter(2), payment(3, 103))
+    assert len(venmo(box)) == 2
+    assert "SINCE" in box.fetches[0][1]
+
+    checkpoint = db.get_venmo_checkpoint(f"{ADDRESS}/INBOX")
+    assert (checkpoint.uid_validity, checkpoint.last_uid) == (1, 3)
+    assert _ledger(db) == {"<1@venmo.com>": VENMO_TRANSACTION, "<3@venmo.com>": VENMO_TRANSACTION}
+    stored = db.session.scalars(select(Transaction).order_by(Transaction.id)).all()
+    assert [(tx.id, tx.account_id) for tx in stored] == [("101", "VENMO"), ("103", "VENMO")]
+
+
+def test_later_runs_search_above_the_checkpoint(db, venmo):
+    box = FakeMailBox(payment(1, 101), newsletter(2))
+    venmo(box)
+    updated_at = db.get_venmo_checkpoint(f"{ADDRESS}/INBOX").updated_at
+
+    # no new mail: "3:*" still returns UID 2, which is filtered out, and nothing is written
+    box.fetches.clear()
+    assert venmo(box) == []
+    assert box.fetches == [("headers", '(FROM "venmo@venmo.com" UID 3:*)')]
+    db.session.expire_all()
+    assert db.get_venmo_checkpoint(f"{ADDRESS}/INBOX").updated_at == updated_at
+
+    box.messages.append(payment(3, 103))
+    box.fetches.clear()
+    assert [tx.id for tx in venmo(box)] == ["103"]
+    assert box.bodies() == ["3"]
+    db.session.expire_all()
+    assert db.get_venmo_checkpoint(f"{ADDRESS}/INBOX").last_uid == 3
+
+
+def test_uidvalidity_change_falls_back_to_a_date_search(db, venmo):
+    venmo(FakeMailBox(payment(1, 101), payment(2, 102)))
+
+    # the folder was rebuilt: same mail under new UIDs, plus one new message
+    box = FakeMailBox(payment(7, 101, message_id="1"), payment(8, 102, message_id="2"), payment(9, 109),
+                      uid_validity=2)
+    assert [tx.id for tx in venmo(box)] == ["109"]
+    assert "SINCE" in box.fetches[0][1]
+    # the Message-ID ledger kept the old mail from being fetched again
+    assert box.bodies() == ["9"]
+    checkpoint = db.get_venmo_checkpoint(f"{ADDRESS}/INBOX")
+    assert (checkpoint.uid_validity, checkpoint.last_uid) == (2, 9)
+
+
+def test_failed_messages_are_retried(db, venmo):
+    broken = payment(1, 101)
+    broken.html = "<p>no transaction id</p>"
+    box = FakeMailBox(broken, payment(2, 102))
+    assert [tx.id for tx in venmo(box)] == ["102"]
+    assert _ledger(db)["<1@venmo.com>"] == VENMO_FAILED
+
+    # e.g. after a parser fix: the failure below the checkpoint is fetched again
+    box.messages[0] = payment(1, 101)
+    box.fetches.clear()
+    assert [tx.id for tx in venmo(box)] == ["101"]
+    assert box.bodies() == ["1"]
+    db.session.expire_all()
+    assert _ledger(db) == {"<1@venmo.com>": VENMO_TRANSACTION, "<2@venmo.com>": VENMO_TRANSACTION}
+
+
+def test_ledger_is_committed_with_the_transactions(db, venmo, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(db_module, "refresh_rollups", fail)
+    with pytest.raises(RuntimeError):
+        venmo(FakeMailBox(payment(1, 101)))
+    # nothing is marked processed without its transaction
+    assert db.session.scalars(select(Transaction)).all() == []
+    assert _ledger(db) == {}
+    assert db.get_venmo_checkpoint(f"{ADDRESS}/INBOX") is None